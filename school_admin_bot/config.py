@@ -13,12 +13,17 @@ CLAUDE_API_KEY = os.getenv("CLAUDE_API_KEY")
 # Database URL (PostgreSQL)
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Connection pool size (max should cover Drive sync workers plus concurrent handlers)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "16"))
+
 # File storage path
 STORAGE_PATH = os.getenv("STORAGE_PATH", "./data/uploads")
 
 # Super admin Telegram IDs (comma-separated in env)
 SUPER_ADMIN_IDS_STR = os.getenv("SUPER_ADMIN_IDS", "")
-SUPER_ADMIN_IDS = [int(id.strip()) for id in SUPER_ADMIN_IDS_STR.split(",") if id.strip()]
+SUPER_ADMIN_IDS_LIST = [int(id.strip()) for id in SUPER_ADMIN_IDS_STR.split(",") if id.strip()]  # Config order
+SUPER_ADMIN_IDS = frozenset(SUPER_ADMIN_IDS_LIST)  # For membership checks
 
 # Daily code settings
 DAILY_CODE_LENGTH = 4  # Number of digits in code
@@ -76,6 +81,16 @@ GOOGLE_SERVICE_ACCOUNT_JSON = os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON", "")
 APPS_SCRIPT_URL = os.getenv("APPS_SCRIPT_URL", "")
 APPS_SCRIPT_SECRET = os.getenv("APPS_SCRIPT_SECRET", "")
 
+# Webhook mode (optional — Telegram updates and Drive change notifications are pushed instead of polled)
+# WEBHOOK_URL is this service's public base URL; Telegram posts to WEBHOOK_URL + "/telegram",
+# Drive to WEBHOOK_URL + "/drive". Without it the bot long-polls Telegram.
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_PORT = int(os.getenv("PORT", "8080"))
+# Echoed back by Telegram (X-Telegram-Bot-Api-Secret-Token); Drive channels get a per-channel HMAC of it
+# (X-Goog-Channel-Token). Required with WEBHOOK_URL: without it anyone could post forged updates.
+# Telegram only accepts A-Z, a-z, 0-9, _ and -
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+
 # Daily sync schedule per folder: folder_name -> (hour, minute) Singapore time
 # Relief Committee: 6 pm, Relief Timetable / Weekly Bulletin: 7:45 am
 # Today's Event: 7 am - only PDFs named dd_mm_yy_eventname.pdf where date matches today
@@ -87,6 +102,16 @@ SYNC_SCHEDULE = {
     "Today's Event": (7, 0),       # 7:00 AM - events dropped night before or by 7 am
 }
 
+# Max Drive folders synced at once by /sync (keep within the Drive API quota)
+DRIVE_SYNC_CONCURRENCY = int(os.getenv("DRIVE_SYNC_CONCURRENCY", "5"))
+
+# Sizes the shared file pool: DRIVE_SYNC_CONCURRENCY x DRIVE_FILE_WORKERS files downloaded/analysed at
+# once across all syncs (a single folder can use all of them). Drive allows ~10 requests/sec per user.
+DRIVE_FILE_WORKERS = int(os.getenv("DRIVE_FILE_WORKERS", "4"))
+
+# Claude vision calls in flight at once across all syncs (files, PDF pages and embedded images)
+CLAUDE_MAX_CONCURRENCY = int(os.getenv("CLAUDE_MAX_CONCURRENCY", "6"))
+
 # Validate required environment variables
 if not TELEGRAM_TOKEN:
     raise ValueError("TELEGRAM_TOKEN environment variable is required")
@@ -99,3 +124,6 @@ if not DATABASE_URL:
 
 if not SUPER_ADMIN_IDS:
     raise ValueError("SUPER_ADMIN_IDS environment variable is required")
+
+if WEBHOOK_URL and not WEBHOOK_SECRET:
+    raise ValueError("WEBHOOK_SECRET environment variable is required when WEBHOOK_URL is set")
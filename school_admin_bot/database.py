@@ -3,11 +3,15 @@ import json
 import logging
 import random
 import string
+import time
+import threading
+from collections import defaultdict
 from datetime import datetime, date
 from pathlib import Path
 import psycopg
 from psycopg.rows import dict_row
-from config import DATABASE_URL, STORAGE_PATH, DAILY_CODE_LENGTH
+from psycopg_pool import ConnectionPool
+from config import DATABASE_URL, STORAGE_PATH, DAILY_CODE_LENGTH, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE
 
 ANIMALS = [
     "LION",
@@ -22,264 +26,337 @@ ANIMALS = [
     "PHOENIX",
 ]
 
+# Seconds a get_user() lookup is served from memory before re-reading the users table
+USER_CACHE_TTL = 60
+
+
+# Insert today's entry for a Drive file, or replace it (see idx_daily_entries_date_drive_file_id_unique)
+DRIVE_ENTRY_UPSERT = """
+    INSERT INTO daily_entries (date, tag, content, uploaded_by, drive_file_id)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (date, drive_file_id) WHERE drive_file_id IS NOT NULL
+    DO UPDATE SET content = EXCLUDED.content, tag = EXCLUDED.tag, timestamp = CURRENT_TIMESTAMP
+"""
+
 
 class Database:
     def __init__(self):
         self.db_url = DATABASE_URL
         self.storage_path = Path(STORAGE_PATH)
         self.storage_path.mkdir(parents=True, exist_ok=True)
+        self._user_cache = {}  # telegram_id -> (fetched_at, user dict or None)
+        # Bumped by every invalidation, so a fetch that raced one isn't cached (handlers and sync
+        # worker threads both read and invalidate users)
+        self._user_cache_generation = 0
+        self._user_cache_lock = threading.Lock()
+        self._webhook_cache = {}  # channel_id -> active webhook dict (kept current by the webhook writers below)
+        # Shared by the bot handlers and the Drive sync worker threads
+        self.pool = ConnectionPool(
+            self.db_url,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            check=ConnectionPool.check_connection,
+            open=True,
+        )
         self.init_database()
 
     def get_connection(self):
-        """Get database connection"""
-        return psycopg.connect(self.db_url)
+        """
+        Borrow a connection from the pool: `with db.get_connection() as conn:`. Leaving the block
+        commits (or rolls back on an exception) and returns the connection, however it exits.
+        """
+        return self.pool.connection()
 
     def init_database(self):
         """Initialize database tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        # Users table
-        cursor.execute(
+            # Users table
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS users (
+                    telegram_id BIGINT PRIMARY KEY,
+                    display_name TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    added_by BIGINT,
+                    added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
             """
-            CREATE TABLE IF NOT EXISTS users (
-                telegram_id BIGINT PRIMARY KEY,
-                display_name TEXT NOT NULL,
-                role TEXT NOT NULL,
-                added_by BIGINT,
-                added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-        """
-        )
 
-        # Daily entries table
-        cursor.execute(
+            # Daily entries table
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS daily_entries (
+                    id SERIAL PRIMARY KEY,
+                    date DATE NOT NULL,
+                    tag TEXT NOT NULL,
+                    content JSONB NOT NULL,
+                    uploaded_by BIGINT NOT NULL,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    drive_file_id TEXT,
+                    FOREIGN KEY (uploaded_by) REFERENCES users(telegram_id)
+                )
             """
-            CREATE TABLE IF NOT EXISTS daily_entries (
-                id SERIAL PRIMARY KEY,
-                date DATE NOT NULL,
-                tag TEXT NOT NULL,
-                content JSONB NOT NULL,
-                uploaded_by BIGINT NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                drive_file_id TEXT,
-                FOREIGN KEY (uploaded_by) REFERENCES users(telegram_id)
             )
-        """
-        )
 
-        # Add drive_file_id column if missing (migration for existing DBs)
-        try:
+            # Add drive_file_id column if missing (migration for existing DBs)
+            try:
+                cursor.execute(
+                    """
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_schema = 'public' AND table_name = 'daily_entries' AND column_name = 'drive_file_id'
+                    """
+                )
+                if cursor.fetchone() is None:
+                    cursor.execute("ALTER TABLE daily_entries ADD COLUMN drive_file_id TEXT")
+            except Exception as e:
+                logger = logging.getLogger(__name__)
+                logger.warning("Migration: could not add drive_file_id to daily_entries: %s", e)
+                conn.rollback()
+
+            # Create index on date for fast queries
             cursor.execute(
                 """
-                SELECT 1 FROM information_schema.columns
-                WHERE table_schema = 'public' AND table_name = 'daily_entries' AND column_name = 'drive_file_id'
-                """
+                CREATE INDEX IF NOT EXISTS idx_daily_entries_date 
+                ON daily_entries(date)
+            """
             )
-            if cursor.fetchone() is None:
-                cursor.execute("ALTER TABLE daily_entries ADD COLUMN drive_file_id TEXT")
-        except Exception as e:
-            logger = logging.getLogger(__name__)
-            logger.warning("Migration: could not add drive_file_id to daily_entries: %s", e)
-            conn.rollback()
-
-        # Create index on date for fast queries
-        cursor.execute(
+            # Composite indexes for tag-filtered summaries and per-user "uploads today"
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_daily_entries_date_tag 
+                ON daily_entries(date, tag)
             """
-            CREATE INDEX IF NOT EXISTS idx_daily_entries_date 
-            ON daily_entries(date)
-        """
-        )
-        # Index for upsert: find today's entry by drive_file_id (only if column exists)
-        try:
+            )
             cursor.execute(
                 """
-                CREATE INDEX IF NOT EXISTS idx_daily_entries_date_drive_file_id 
-                ON daily_entries(date, drive_file_id) 
-                WHERE drive_file_id IS NOT NULL
+                CREATE INDEX IF NOT EXISTS idx_daily_entries_uploaded_by_date 
+                ON daily_entries(uploaded_by, date)
+            """
+            )
+            # Upsert target: one entry per drive_file_id per day (DRIVE_ENTRY_UPSERT needs it). Unique,
+            # so concurrent syncs of the same file can't both insert; older duplicates are dropped first.
+            # In a savepoint, so a failure here doesn't abort the rest of init_database; the old
+            # non-unique index is only dropped once the unique one exists.
+            try:
+                with conn.transaction():
+                    cursor.execute(
+                        """
+                        DELETE FROM daily_entries a USING daily_entries b
+                        WHERE a.drive_file_id IS NOT NULL
+                          AND a.date = b.date AND a.drive_file_id = b.drive_file_id AND a.id < b.id
+                        """
+                    )
+                    cursor.execute(
+                        """
+                        CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_entries_date_drive_file_id_unique
+                        ON daily_entries(date, drive_file_id)
+                        WHERE drive_file_id IS NOT NULL
+                        """
+                    )
+                    cursor.execute("DROP INDEX IF EXISTS idx_daily_entries_date_drive_file_id")
+            except Exception as e:
+                logger = logging.getLogger(__name__)
+                logger.warning("Migration: could not create unique (date, drive_file_id) index: %s", e)
+
+            # Daily codes table
+            cursor.execute(
                 """
+                CREATE TABLE IF NOT EXISTS daily_codes (
+                    date DATE PRIMARY KEY,
+                    code TEXT NOT NULL,
+                    generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """
             )
-        except Exception:
-            pass
 
-        # Daily codes table
-        cursor.execute(
+            # Relief reminders table
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS relief_reminders (
+                    id SERIAL PRIMARY KEY,
+                    date DATE NOT NULL,
+                    teacher_name TEXT NOT NULL,
+                    teacher_telegram_id BIGINT,
+                    relief_time TIME NOT NULL,
+                    period TEXT,
+                    class_info TEXT,
+                    room TEXT,
+                    original_teacher TEXT,
+                    reminder_sent BOOLEAN DEFAULT FALSE,
+                    activated BOOLEAN DEFAULT FALSE,
+                    created_by BIGINT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
             """
-            CREATE TABLE IF NOT EXISTS daily_codes (
-                date DATE PRIMARY KEY,
-                code TEXT NOT NULL,
-                generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-        """
-        )
 
-        # Relief reminders table
-        cursor.execute(
+            # Create index on date for relief reminders
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_relief_reminders_date 
+                ON relief_reminders(date)
             """
-            CREATE TABLE IF NOT EXISTS relief_reminders (
-                id SERIAL PRIMARY KEY,
-                date DATE NOT NULL,
-                teacher_name TEXT NOT NULL,
-                teacher_telegram_id BIGINT,
-                relief_time TIME NOT NULL,
-                period TEXT,
-                class_info TEXT,
-                room TEXT,
-                original_teacher TEXT,
-                reminder_sent BOOLEAN DEFAULT FALSE,
-                activated BOOLEAN DEFAULT FALSE,
-                created_by BIGINT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-        """
-        )
 
-        # Create index on date for relief reminders
-        cursor.execute(
+            # No-show reports table
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS noshow_reports (
+                    id SERIAL PRIMARY KEY,
+                    date DATE NOT NULL,
+                    relief_reminder_id INTEGER REFERENCES relief_reminders(id),
+                    teacher_name TEXT NOT NULL,
+                    reported_by BIGINT NOT NULL,
+                    reporter_name TEXT,
+                    situation TEXT NOT NULL,
+                    reported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
             """
-            CREATE INDEX IF NOT EXISTS idx_relief_reminders_date 
-            ON relief_reminders(date)
-        """
-        )
+            )
 
-        # No-show reports table
-        cursor.execute(
+            # Google Drive folders table
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS drive_folders (
+                    id SERIAL PRIMARY KEY,
+                    folder_name TEXT NOT NULL UNIQUE,
+                    drive_folder_id TEXT NOT NULL UNIQUE,
+                    parent_folder_id TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_synced_at TIMESTAMP
+                )
             """
-            CREATE TABLE IF NOT EXISTS noshow_reports (
-                id SERIAL PRIMARY KEY,
-                date DATE NOT NULL,
-                relief_reminder_id INTEGER REFERENCES relief_reminders(id),
-                teacher_name TEXT NOT NULL,
-                reported_by BIGINT NOT NULL,
-                reporter_name TEXT,
-                situation TEXT NOT NULL,
-                reported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-        """
-        )
 
-        # Google Drive folders table
-        cursor.execute(
+            # Folder-role access mapping (many-to-many)
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS folder_role_access (
+                    id SERIAL PRIMARY KEY,
+                    folder_id INTEGER REFERENCES drive_folders(id) ON DELETE CASCADE,
+                    role TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(folder_id, role)
+                )
             """
-            CREATE TABLE IF NOT EXISTS drive_folders (
-                id SERIAL PRIMARY KEY,
-                folder_name TEXT NOT NULL UNIQUE,
-                drive_folder_id TEXT NOT NULL UNIQUE,
-                parent_folder_id TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_synced_at TIMESTAMP
             )
-        """
-        )
 
-        # Folder-role access mapping (many-to-many)
-        cursor.execute(
+            # User-folder access overrides (optional, for individual exceptions)
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS user_folder_access (
+                    id SERIAL PRIMARY KEY,
+                    telegram_id BIGINT NOT NULL,
+                    folder_id INTEGER REFERENCES drive_folders(id) ON DELETE CASCADE,
+                    granted BOOLEAN DEFAULT TRUE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(telegram_id, folder_id),
+                    FOREIGN KEY (telegram_id) REFERENCES users(telegram_id)
+                )
             """
-            CREATE TABLE IF NOT EXISTS folder_role_access (
-                id SERIAL PRIMARY KEY,
-                folder_id INTEGER REFERENCES drive_folders(id) ON DELETE CASCADE,
-                role TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(folder_id, role)
             )
-        """
-        )
 
-        # User-folder access overrides (optional, for individual exceptions)
-        cursor.execute(
+            # Drive sync log
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS drive_sync_log (
+                    id SERIAL PRIMARY KEY,
+                    date DATE NOT NULL,
+                    folder_id INTEGER REFERENCES drive_folders(id),
+                    files_synced INTEGER DEFAULT 0,
+                    files_processed INTEGER DEFAULT 0,
+                    errors TEXT,
+                    errors_total INTEGER DEFAULT 0,
+                    synced_by BIGINT,
+                    synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
             """
-            CREATE TABLE IF NOT EXISTS user_folder_access (
-                id SERIAL PRIMARY KEY,
-                telegram_id BIGINT NOT NULL,
-                folder_id INTEGER REFERENCES drive_folders(id) ON DELETE CASCADE,
-                granted BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(telegram_id, folder_id),
-                FOREIGN KEY (telegram_id) REFERENCES users(telegram_id)
             )
-        """
-        )
+            # errors only keeps the latest messages; errors_total counts them all (migration for existing DBs)
+            cursor.execute("ALTER TABLE drive_sync_log ADD COLUMN IF NOT EXISTS errors_total INTEGER DEFAULT 0")
 
-        # Drive sync log
-        cursor.execute(
+            # Webhook channels and page tokens
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS drive_webhooks (
+                    id SERIAL PRIMARY KEY,
+                    folder_id TEXT NOT NULL,
+                    channel_id TEXT NOT NULL UNIQUE,
+                    resource_id TEXT,
+                    webhook_url TEXT NOT NULL,
+                    page_token TEXT,
+                    active BOOLEAN DEFAULT TRUE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    expires_at TIMESTAMP
+                )
             """
-            CREATE TABLE IF NOT EXISTS drive_sync_log (
-                id SERIAL PRIMARY KEY,
-                date DATE NOT NULL,
-                folder_id INTEGER REFERENCES drive_folders(id),
-                files_synced INTEGER DEFAULT 0,
-                files_processed INTEGER DEFAULT 0,
-                errors TEXT,
-                synced_by BIGINT,
-                synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-        """
-        )
 
-        # Webhook channels and page tokens
-        cursor.execute(
+            # Track shortcuts and their target files for watching
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS shortcut_targets (
+                    id SERIAL PRIMARY KEY,
+                    shortcut_id TEXT NOT NULL,
+                    shortcut_name TEXT NOT NULL,
+                    target_file_id TEXT NOT NULL,
+                    target_file_name TEXT,
+                    watched_folder_id TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(shortcut_id, target_file_id)
+                )
             """
-            CREATE TABLE IF NOT EXISTS drive_webhooks (
-                id SERIAL PRIMARY KEY,
-                folder_id TEXT NOT NULL,
-                channel_id TEXT NOT NULL UNIQUE,
-                resource_id TEXT,
-                webhook_url TEXT NOT NULL,
-                page_token TEXT,
-                active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                expires_at TIMESTAMP
             )
-        """
-        )
 
-        # Track shortcuts and their target files for watching
-        cursor.execute(
+            # Last analysis of each Drive file, keyed by its version (md5Checksum or modifiedTime),
+            # so unchanged files are re-entered each day without re-downloading or re-analysing
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS drive_file_cache (
+                    drive_file_id TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
             """
-            CREATE TABLE IF NOT EXISTS shortcut_targets (
-                id SERIAL PRIMARY KEY,
-                shortcut_id TEXT NOT NULL,
-                shortcut_name TEXT NOT NULL,
-                target_file_id TEXT NOT NULL,
-                target_file_name TEXT,
-                watched_folder_id TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(shortcut_id, target_file_id)
             )
-        """
-        )
+            # SHA-256 of the downloaded bytes: a new version with the same content reuses the analysis
+            cursor.execute("ALTER TABLE drive_file_cache ADD COLUMN IF NOT EXISTS content_hash TEXT")
 
-        # Role assumption for superadmins (testing feature)
-        cursor.execute(
+            # Role assumption for superadmins (testing feature)
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS role_assumptions (
+                    id SERIAL PRIMARY KEY,
+                    telegram_id BIGINT NOT NULL UNIQUE,
+                    original_role TEXT NOT NULL,
+                    assumed_role TEXT NOT NULL,
+                    assumed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (telegram_id) REFERENCES users(telegram_id) ON DELETE CASCADE
+                )
             """
-            CREATE TABLE IF NOT EXISTS role_assumptions (
-                id SERIAL PRIMARY KEY,
-                telegram_id BIGINT NOT NULL UNIQUE,
-                original_role TEXT NOT NULL,
-                assumed_role TEXT NOT NULL,
-                assumed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (telegram_id) REFERENCES users(telegram_id) ON DELETE CASCADE
             )
-        """
-        )
 
-        # Create indexes
-        cursor.execute(
+            # Create indexes
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_folder_role_access_folder 
+                ON folder_role_access(folder_id)
             """
-            CREATE INDEX IF NOT EXISTS idx_folder_role_access_folder 
-            ON folder_role_access(folder_id)
-        """
-        )
-        cursor.execute(
+            )
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_user_folder_access_user 
+                ON user_folder_access(telegram_id)
             """
-            CREATE INDEX IF NOT EXISTS idx_user_folder_access_user 
-            ON user_folder_access(telegram_id)
-        """
-        )
+            )
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
 
         # Ensure today's code exists
         self.get_daily_code()
@@ -287,44 +364,96 @@ class Database:
     # ===== USER MANAGEMENT =====
 
     def add_user(self, telegram_id, display_name, role, added_by):
-        """Add a new user"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """Add a new user. Returns False if the telegram ID is already registered."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            INSERT INTO users (telegram_id, display_name, role, added_by)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT (telegram_id) DO NOTHING
-        """,
-            (telegram_id, display_name, role, added_by),
-        )
+            cursor.execute(
+                """
+                INSERT INTO users (telegram_id, display_name, role, added_by)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (telegram_id) DO NOTHING
+            """,
+                (telegram_id, display_name, role, added_by),
+            )
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            added = cursor.rowcount == 1
+            conn.commit()
+            cursor.close()
+        self.invalidate_user_cache(telegram_id)
+
+        return added
+
+    def add_users_bulk(self, users, added_by):
+        """Add many users in one transaction (users: dicts with telegram_id, name, role). Returns rows inserted."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            try:
+                cursor.executemany(
+                    """
+                    INSERT INTO users (telegram_id, display_name, role, added_by)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (telegram_id) DO NOTHING
+                """,
+                    [(u['telegram_id'], u['name'], u['role'], added_by) for u in users],
+                )
+                added_count = cursor.rowcount
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        for u in users:
+            self.invalidate_user_cache(u['telegram_id'])
+        return added_count
+
+    def invalidate_user_cache(self, telegram_id=None):
+        """Drop a cached get_user() result (or all of them when telegram_id is None)"""
+        with self._user_cache_lock:
+            self._user_cache_generation += 1
+            if telegram_id is None:
+                self._user_cache.clear()
+            else:
+                self._user_cache.pop(telegram_id, None)
 
     def get_user(self, telegram_id):
-        """Get user by telegram ID, with role assumption if active"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        """Get user by telegram ID, with role assumption if active (cached for USER_CACHE_TTL seconds)"""
+        with self._user_cache_lock:
+            cached = self._user_cache.get(telegram_id)
+            generation = self._user_cache_generation
+        if cached and time.monotonic() - cached[0] < USER_CACHE_TTL:
+            return dict(cached[1]) if cached[1] else None
+
+        user = self._fetch_user(telegram_id)
+        with self._user_cache_lock:
+            # An invalidation during the fetch may mean the row read is already stale
+            if generation == self._user_cache_generation:
+                self._user_cache[telegram_id] = (time.monotonic(), user)
+        return dict(user) if user else None
 
-        cursor.execute(
-            """
-            SELECT u.telegram_id, u.display_name, u.role, u.added_by, u.added_date,
-                   COALESCE(ra.assumed_role, u.role) as effective_role,
-                   ra.assumed_role IS NOT NULL as is_assumed,
-                   ra.original_role
-            FROM users u
-            LEFT JOIN role_assumptions ra ON u.telegram_id = ra.telegram_id
-            WHERE u.telegram_id = %s
-        """,
-            (telegram_id,),
-        )
+    def _fetch_user(self, telegram_id):
+        """Read a user row from the database, applying any active role assumption"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        user = cursor.fetchone()
-        cursor.close()
-        conn.close()
+            cursor.execute(
+                """
+                SELECT u.telegram_id, u.display_name, u.role, u.added_by, u.added_date,
+                       COALESCE(ra.assumed_role, u.role) as effective_role,
+                       ra.assumed_role IS NOT NULL as is_assumed,
+                       ra.original_role
+                FROM users u
+                LEFT JOIN role_assumptions ra ON u.telegram_id = ra.telegram_id
+                WHERE u.telegram_id = %s
+            """,
+                (telegram_id,),
+            )
+
+            user = cursor.fetchone()
+            cursor.close()
 
         if user:
             user_dict = dict(user)
@@ -347,74 +476,73 @@ class Database:
 
     def remove_user(self, telegram_id):
         """Remove a user"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            DELETE FROM users WHERE telegram_id = %s
-        """,
-            (telegram_id,),
-        )
+            cursor.execute(
+                """
+                DELETE FROM users WHERE telegram_id = %s
+            """,
+                (telegram_id,),
+            )
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
+        self.invalidate_user_cache(telegram_id)
 
     def update_user_role(self, telegram_id, new_role):
         """Update user's role"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            UPDATE users SET role = %s WHERE telegram_id = %s
-        """,
-            (new_role, telegram_id),
-        )
+            cursor.execute(
+                """
+                UPDATE users SET role = %s WHERE telegram_id = %s
+            """,
+                (new_role, telegram_id),
+            )
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
+        self.invalidate_user_cache(telegram_id)
 
     def get_all_users(self):
         """Get all users"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        cursor.execute(
+            cursor.execute(
+                """
+                SELECT * FROM users ORDER BY role, display_name
             """
-            SELECT * FROM users ORDER BY role, display_name
-        """
-        )
+            )
 
-        users = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            users = cursor.fetchall()
+            cursor.close()
 
         return [dict(user) for user in users]
 
     def delete_non_superadmin_users(self, protected_ids):
         """Delete all users except those with protected IDs (original super admins)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Convert to tuple for SQL IN clause
-        if protected_ids:
-            placeholders = ','.join(['%s'] * len(protected_ids))
-            cursor.execute(
-                f"""
-                DELETE FROM users WHERE telegram_id NOT IN ({placeholders})
-            """,
-                tuple(protected_ids),
-            )
-        else:
-            cursor.execute("DELETE FROM users")
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            # Convert to tuple for SQL IN clause
+            if protected_ids:
+                placeholders = ','.join(['%s'] * len(protected_ids))
+                cursor.execute(
+                    f"""
+                    DELETE FROM users WHERE telegram_id NOT IN ({placeholders})
+                """,
+                    tuple(protected_ids),
+                )
+            else:
+                cursor.execute("DELETE FROM users")
 
-        deleted_count = cursor.rowcount
-        conn.commit()
-        cursor.close()
-        conn.close()
+            deleted_count = cursor.rowcount
+            conn.commit()
+            cursor.close()
+        self.invalidate_user_cache()
 
         return deleted_count
 
@@ -422,22 +550,21 @@ class Database:
 
     def add_entry(self, uploaded_by, tag, content_data, drive_file_id=None):
         """Add a new daily entry (optional drive_file_id for Drive-synced files)."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            INSERT INTO daily_entries (date, tag, content, uploaded_by, drive_file_id)
-            VALUES (%s, %s, %s, %s, %s)
-        """,
-            (today, tag, json.dumps(content_data), uploaded_by, drive_file_id),
-        )
+            cursor.execute(
+                """
+                INSERT INTO daily_entries (date, tag, content, uploaded_by, drive_file_id)
+                VALUES (%s, %s, %s, %s, %s)
+            """,
+                (today, tag, json.dumps(content_data), uploaded_by, drive_file_id),
+            )
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
 
     def add_or_update_drive_entry(self, uploaded_by, tag, content_data):
         """
@@ -451,61 +578,92 @@ class Database:
             self.add_entry(uploaded_by, tag, content_data, drive_file_id=None)
             return
 
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        today = date.today()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            SELECT id FROM daily_entries
-            WHERE date = %s AND drive_file_id = %s
-            LIMIT 1
-            """,
-            (today, drive_file_id),
-        )
-        row = cursor.fetchone()
-        if row:
             cursor.execute(
-                """
-                UPDATE daily_entries
-                SET content = %s, tag = %s, timestamp = CURRENT_TIMESTAMP
-                WHERE id = %s
-                """,
-                (json.dumps(content_data), tag, row[0]),
-            )
-        else:
-            cursor.execute(
-                """
-                INSERT INTO daily_entries (date, tag, content, uploaded_by, drive_file_id)
-                VALUES (%s, %s, %s, %s, %s)
-                """,
-                (today, tag, json.dumps(content_data), uploaded_by, drive_file_id),
+                DRIVE_ENTRY_UPSERT,
+                (date.today(), tag, json.dumps(content_data), uploaded_by, drive_file_id),
             )
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
+
+    def add_or_update_drive_entries(self, uploaded_by, entries):
+        """
+        Batch version of add_or_update_drive_entry for a folder sync.
+        entries: list of (tag, content_data). Today's rows with a matching drive_file_id
+        are updated, the rest inserted - all in one transaction. Returns rows written.
+        """
+        if not entries:
+            return 0
+
+        today = date.today()
+        # Last entry wins if a file appears twice in the batch
+        by_file_id = {}
+        without_file_id = []
+        for tag, content_data in entries:
+            drive_file_id = content_data.get("drive_file_id")
+            if drive_file_id:
+                by_file_id[drive_file_id] = (tag, content_data)
+            else:
+                without_file_id.append((tag, content_data))
+
+        upserts = [
+            (today, tag, json.dumps(content_data), uploaded_by, drive_file_id)
+            for drive_file_id, (tag, content_data) in by_file_id.items()
+        ]
+        inserts = [
+            (today, tag, json.dumps(content_data), uploaded_by, None)
+            for tag, content_data in without_file_id
+        ]
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            try:
+                # Sync writes can be re-derived from Drive, so don't wait for the WAL flush on commit.
+                # A crash loses at most the last few commits, and the page token that is committed
+                # (synchronously) after them flushes them too.
+                cursor.execute("SET LOCAL synchronous_commit TO OFF")
+                if upserts:
+                    cursor.executemany(DRIVE_ENTRY_UPSERT, upserts)
+                if inserts:
+                    cursor.executemany(
+                        """
+                        INSERT INTO daily_entries (date, tag, content, uploaded_by, drive_file_id)
+                        VALUES (%s, %s, %s, %s, %s)
+                        """,
+                        inserts,
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        return len(upserts) + len(inserts)
 
     def get_today_entries(self):
         """Get all entries for today. When multiple rows share the same drive_file_id, only the latest (by timestamp) is returned."""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            SELECT id, tag, content, uploaded_by, drive_file_id,
-                   TO_CHAR(timestamp, 'HH24:MI') as timestamp
-            FROM daily_entries 
-            WHERE date = %s
-            ORDER BY timestamp DESC
-        """,
-            (today,),
-        )
+            cursor.execute(
+                """
+                SELECT id, tag, content, uploaded_by, drive_file_id,
+                       TO_CHAR(timestamp, 'HH24:MI') as timestamp
+                FROM daily_entries 
+                WHERE date = %s
+                ORDER BY timestamp DESC
+            """,
+                (today,),
+            )
 
-        rows = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            rows = cursor.fetchall()
+            cursor.close()
 
         # Deduplicate by drive_file_id: keep latest (first in DESC order) per file
         seen_file_ids = set()
@@ -522,193 +680,193 @@ class Database:
 
     def get_user_uploads_today(self, telegram_id):
         """Get user's uploads for today"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            SELECT id, tag, content, 
-                   TO_CHAR(timestamp, 'HH24:MI') as timestamp
-            FROM daily_entries 
-            WHERE date = %s AND uploaded_by = %s
-            ORDER BY timestamp DESC
-        """,
-            (today, telegram_id),
-        )
+            cursor.execute(
+                """
+                SELECT id, tag, content, 
+                       TO_CHAR(timestamp, 'HH24:MI') as timestamp
+                FROM daily_entries 
+                WHERE date = %s AND uploaded_by = %s
+                ORDER BY timestamp DESC
+            """,
+                (today, telegram_id),
+            )
 
-        entries = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            entries = cursor.fetchall()
+            cursor.close()
 
         return [dict(entry) for entry in entries]
 
     def delete_entry_by_id(self, entry_id, telegram_id):
         """Delete a specific entry by ID (only if owned by user)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            DELETE FROM daily_entries 
-            WHERE id = %s AND uploaded_by = %s AND date = %s
-        """,
-            (entry_id, telegram_id, today),
-        )
+            cursor.execute(
+                """
+                DELETE FROM daily_entries 
+                WHERE id = %s AND uploaded_by = %s AND date = %s
+            """,
+                (entry_id, telegram_id, today),
+            )
 
-        deleted = cursor.rowcount > 0
-        conn.commit()
-        cursor.close()
-        conn.close()
+            deleted = cursor.rowcount > 0
+            conn.commit()
+            cursor.close()
 
         return deleted
 
     def delete_all_user_uploads_today(self, telegram_id):
         """Delete all of user's uploads for today"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            DELETE FROM daily_entries 
-            WHERE uploaded_by = %s AND date = %s
-        """,
-            (telegram_id, today),
-        )
+            cursor.execute(
+                """
+                DELETE FROM daily_entries 
+                WHERE uploaded_by = %s AND date = %s
+            """,
+                (telegram_id, today),
+            )
 
-        deleted_count = cursor.rowcount
-        conn.commit()
-        cursor.close()
-        conn.close()
+            deleted_count = cursor.rowcount
+            conn.commit()
+            cursor.close()
 
         return deleted_count
 
     def delete_student_movement_entries_today(self):
         """Delete all Student Movement entries for today (tag or folder)."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            DELETE FROM daily_entries 
-            WHERE date = %s AND (
-                tag = %s
-                OR content->>'folder' ILIKE %s
+            cursor.execute(
+                """
+                DELETE FROM daily_entries 
+                WHERE date = %s AND (
+                    tag = %s
+                    OR content->>'folder' ILIKE %s
+                )
+            """,
+                (today, "STUDENT_MOVEMENT", "%Student Movement%"),
             )
-        """,
-            (today, "STUDENT_MOVEMENT", "%Student Movement%"),
-        )
 
-        deleted_count = cursor.rowcount
-        conn.commit()
-        cursor.close()
-        conn.close()
+            deleted_count = cursor.rowcount
+            conn.commit()
+            cursor.close()
 
         return deleted_count
 
     def get_student_movement_entries_today(self):
         """Get all Student Movement entries for today."""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            SELECT id, tag, content, uploaded_by, drive_file_id,
-                   TO_CHAR(timestamp, 'HH24:MI') as timestamp
-            FROM daily_entries 
-            WHERE date = %s AND (
-                tag = %s
-                OR content->>'folder' ILIKE %s
-            )
-            ORDER BY timestamp DESC
-        """,
-            (today, "STUDENT_MOVEMENT", "%Student Movement%"),
-        )
+            cursor.execute(
+                """
+                SELECT id, tag, content, uploaded_by, drive_file_id,
+                       TO_CHAR(timestamp, 'HH24:MI') as timestamp
+                FROM daily_entries 
+                WHERE date = %s AND (
+                    tag = %s
+                    OR content->>'folder' ILIKE %s
+                )
+                ORDER BY timestamp DESC
+            """,
+                (today, "STUDENT_MOVEMENT", "%Student Movement%"),
+            )
 
-        entries = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            entries = cursor.fetchall()
+            cursor.close()
 
         return [dict(e) for e in entries]
 
     def delete_student_movement_entry_by_id(self, entry_id):
         """Delete a single Student Movement entry by ID (for student_admin). Returns True if deleted."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            DELETE FROM daily_entries 
-            WHERE id = %s AND date = %s AND (
-                tag = %s
-                OR content->>'folder' ILIKE %s
+            cursor.execute(
+                """
+                DELETE FROM daily_entries 
+                WHERE id = %s AND date = %s AND (
+                    tag = %s
+                    OR content->>'folder' ILIKE %s
+                )
+            """,
+                (entry_id, today, "STUDENT_MOVEMENT", "%Student Movement%"),
             )
-        """,
-            (entry_id, today, "STUDENT_MOVEMENT", "%Student Movement%"),
-        )
 
-        deleted = cursor.rowcount > 0
-        conn.commit()
-        cursor.close()
-        conn.close()
+            deleted = cursor.rowcount > 0
+            conn.commit()
+            cursor.close()
 
         return deleted
 
     def purge_old_data(self):
         """Delete entries older than today and generate new code"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        today = date.today()
+            today = date.today()
 
-        # Delete old entries
-        cursor.execute(
-            """
-            DELETE FROM daily_entries WHERE date < %s
-        """,
-            (today,),
-        )
+            # Delete old entries
+            cursor.execute(
+                """
+                DELETE FROM daily_entries WHERE date < %s
+            """,
+                (today,),
+            )
 
-        deleted_count = cursor.rowcount
+            deleted_count = cursor.rowcount
 
-        # Delete old codes
-        cursor.execute(
-            """
-            DELETE FROM daily_codes WHERE date < %s
-        """,
-            (today,),
-        )
+            # Delete old codes
+            cursor.execute(
+                """
+                DELETE FROM daily_codes WHERE date < %s
+            """,
+                (today,),
+            )
 
-        # Delete old no-show reports first (due to foreign key)
-        cursor.execute(
-            """
-            DELETE FROM noshow_reports WHERE date < %s
-        """,
-            (today,),
-        )
+            # Delete old no-show reports first (due to foreign key)
+            cursor.execute(
+                """
+                DELETE FROM noshow_reports WHERE date < %s
+            """,
+                (today,),
+            )
+
+            # Delete old relief reminders
+            cursor.execute(
+                """
+                DELETE FROM relief_reminders WHERE date < %s
+            """,
+                (today,),
+            )
 
-        # Delete old relief reminders
-        cursor.execute(
+            # Forget analyses of Drive files that have not been seen for a month
+            cursor.execute(
+                """
+                DELETE FROM drive_file_cache WHERE updated_at < NOW() - INTERVAL '30 days'
             """
-            DELETE FROM relief_reminders WHERE date < %s
-        """,
-            (today,),
-        )
+            )
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
 
         # Clean up old files
         self._cleanup_old_files()
@@ -754,48 +912,46 @@ class Database:
 
     def generate_new_daily_code(self):
         """Generate new daily code"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        today = date.today()
-
-        # Generate code: ANIMAL-DIGITS
-        animal = random.choice(ANIMALS)
-        digits = "".join(random.choices(string.digits, k=DAILY_CODE_LENGTH))
-        code = f"{animal}-{digits}"
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            INSERT INTO daily_codes (date, code)
-            VALUES (%s, %s)
-            ON CONFLICT (date) DO UPDATE SET code = %s, generated_at = CURRENT_TIMESTAMP
-        """,
-            (today, code, code),
-        )
+            today = date.today()
 
-        conn.commit()
-        cursor.close()
-        conn.close()
-
-        return code
+            # Generate code: ANIMAL-DIGITS
+            animal = random.choice(ANIMALS)
+            digits = "".join(random.choices(string.digits, k=DAILY_CODE_LENGTH))
+            code = f"{animal}-{digits}"
+
+            cursor.execute(
+                """
+                INSERT INTO daily_codes (date, code)
+                VALUES (%s, %s)
+                ON CONFLICT (date) DO UPDATE SET code = %s, generated_at = CURRENT_TIMESTAMP
+            """,
+                (today, code, code),
+            )
+
+            conn.commit()
+            cursor.close()
+
+        return code
 
     def get_daily_code(self):
         """Get today's code (generate if doesn't exist)"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            SELECT code FROM daily_codes WHERE date = %s
-        """,
-            (today,),
-        )
+            cursor.execute(
+                """
+                SELECT code FROM daily_codes WHERE date = %s
+            """,
+                (today,),
+            )
 
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
+            result = cursor.fetchone()
+            cursor.close()
 
         if result:
             return result["code"]
@@ -808,223 +964,213 @@ class Database:
     def add_relief_reminder(self, teacher_name, teacher_telegram_id, relief_time, period, 
                            class_info, room, original_teacher, created_by, activated=False):
         """Add a new relief reminder"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        today = date.today()
+            today = date.today()
         
-        # Convert time object to string if needed
-        if hasattr(relief_time, 'strftime'):
-            relief_time_str = relief_time.strftime('%H:%M:%S')
-        else:
-            relief_time_str = str(relief_time)
+            # Convert time object to string if needed
+            if hasattr(relief_time, 'strftime'):
+                relief_time_str = relief_time.strftime('%H:%M:%S')
+            else:
+                relief_time_str = str(relief_time)
 
-        cursor.execute(
-            """
-            INSERT INTO relief_reminders 
-            (date, teacher_name, teacher_telegram_id, relief_time, period, class_info, room, original_teacher, created_by, activated)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """,
-            (today, teacher_name, teacher_telegram_id, relief_time_str, period, class_info, room, original_teacher, created_by, activated),
-        )
+            cursor.execute(
+                """
+                INSERT INTO relief_reminders 
+                (date, teacher_name, teacher_telegram_id, relief_time, period, class_info, room, original_teacher, created_by, activated)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
+            """,
+                (today, teacher_name, teacher_telegram_id, relief_time_str, period, class_info, room, original_teacher, created_by, activated),
+            )
 
-        reminder_id = cursor.fetchone()[0]
-        conn.commit()
-        cursor.close()
-        conn.close()
+            reminder_id = cursor.fetchone()[0]
+            conn.commit()
+            cursor.close()
 
         return reminder_id
 
     def get_today_relief_reminders(self):
         """Get all relief reminders for today"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            SELECT id, teacher_name, teacher_telegram_id, 
-                   TO_CHAR(relief_time, 'HH24:MI') as relief_time,
-                   period, class_info, room, original_teacher, 
-                   reminder_sent, activated, created_by,
-                   TO_CHAR(created_at, 'HH24:MI') as created_at
-            FROM relief_reminders 
-            WHERE date = %s
-            ORDER BY relief_time ASC
-        """,
-            (today,),
-        )
+            cursor.execute(
+                """
+                SELECT id, teacher_name, teacher_telegram_id, 
+                       TO_CHAR(relief_time, 'HH24:MI') as relief_time,
+                       period, class_info, room, original_teacher, 
+                       reminder_sent, activated, created_by,
+                       TO_CHAR(created_at, 'HH24:MI') as created_at
+                FROM relief_reminders 
+                WHERE date = %s
+                ORDER BY relief_time ASC
+            """,
+                (today,),
+            )
 
-        reminders = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            reminders = cursor.fetchall()
+            cursor.close()
 
         return [dict(r) for r in reminders]
 
     def get_pending_relief_reminders(self, current_time):
         """Get activated reminders that haven't been sent yet and are due"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            SELECT id, teacher_name, teacher_telegram_id, 
-                   TO_CHAR(relief_time, 'HH24:MI') as relief_time,
-                   period, class_info, room, original_teacher
-            FROM relief_reminders 
-            WHERE date = %s 
-              AND activated = TRUE 
-              AND reminder_sent = FALSE
-              AND relief_time <= %s
-            ORDER BY relief_time ASC
-        """,
-            (today, current_time),
-        )
+            cursor.execute(
+                """
+                SELECT id, teacher_name, teacher_telegram_id, 
+                       TO_CHAR(relief_time, 'HH24:MI') as relief_time,
+                       period, class_info, room, original_teacher
+                FROM relief_reminders 
+                WHERE date = %s 
+                  AND activated = TRUE 
+                  AND reminder_sent = FALSE
+                  AND relief_time <= %s
+                ORDER BY relief_time ASC
+            """,
+                (today, current_time),
+            )
 
-        reminders = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            reminders = cursor.fetchall()
+            cursor.close()
 
         return [dict(r) for r in reminders]
 
     def mark_reminder_sent(self, reminder_id):
         """Mark a reminder as sent"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            UPDATE relief_reminders SET reminder_sent = TRUE WHERE id = %s
-        """,
-            (reminder_id,),
-        )
+            cursor.execute(
+                """
+                UPDATE relief_reminders SET reminder_sent = TRUE WHERE id = %s
+            """,
+                (reminder_id,),
+            )
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
 
     def activate_reminder(self, reminder_id, activate=True):
         """Activate or deactivate a reminder"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            UPDATE relief_reminders SET activated = %s WHERE id = %s
-        """,
-            (activate, reminder_id),
-        )
+            cursor.execute(
+                """
+                UPDATE relief_reminders SET activated = %s WHERE id = %s
+            """,
+                (activate, reminder_id),
+            )
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
 
     def activate_all_matched_reminders(self):
         """Activate all reminders that have a matched telegram ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            UPDATE relief_reminders 
-            SET activated = TRUE 
-            WHERE date = %s AND teacher_telegram_id IS NOT NULL
-        """,
-            (today,),
-        )
+            cursor.execute(
+                """
+                UPDATE relief_reminders 
+                SET activated = TRUE 
+                WHERE date = %s AND teacher_telegram_id IS NOT NULL
+            """,
+                (today,),
+            )
 
-        updated = cursor.rowcount
-        conn.commit()
-        cursor.close()
-        conn.close()
+            updated = cursor.rowcount
+            conn.commit()
+            cursor.close()
 
         return updated
 
     def deactivate_all_reminders_today(self):
         """Deactivate all reminders for today"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            UPDATE relief_reminders SET activated = FALSE WHERE date = %s
-        """,
-            (today,),
-        )
+            cursor.execute(
+                """
+                UPDATE relief_reminders SET activated = FALSE WHERE date = %s
+            """,
+                (today,),
+            )
 
-        updated = cursor.rowcount
-        conn.commit()
-        cursor.close()
-        conn.close()
+            updated = cursor.rowcount
+            conn.commit()
+            cursor.close()
 
         return updated
 
     def get_relief_reminder_by_id(self, reminder_id):
         """Get a specific relief reminder by ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        cursor.execute(
-            """
-            SELECT id, teacher_name, teacher_telegram_id, 
-                   TO_CHAR(relief_time, 'HH24:MI') as relief_time,
-                   period, class_info, room, original_teacher, 
-                   reminder_sent, activated
-            FROM relief_reminders 
-            WHERE id = %s
-        """,
-            (reminder_id,),
-        )
+            cursor.execute(
+                """
+                SELECT id, teacher_name, teacher_telegram_id, 
+                       TO_CHAR(relief_time, 'HH24:MI') as relief_time,
+                       period, class_info, room, original_teacher, 
+                       reminder_sent, activated
+                FROM relief_reminders 
+                WHERE id = %s
+            """,
+                (reminder_id,),
+            )
 
-        reminder = cursor.fetchone()
-        cursor.close()
-        conn.close()
+            reminder = cursor.fetchone()
+            cursor.close()
 
         return dict(reminder) if reminder else None
 
     def delete_relief_reminder(self, reminder_id):
         """Delete a relief reminder"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            DELETE FROM relief_reminders WHERE id = %s
-        """,
-            (reminder_id,),
-        )
+            cursor.execute(
+                """
+                DELETE FROM relief_reminders WHERE id = %s
+            """,
+                (reminder_id,),
+            )
 
-        deleted = cursor.rowcount > 0
-        conn.commit()
-        cursor.close()
-        conn.close()
+            deleted = cursor.rowcount > 0
+            conn.commit()
+            cursor.close()
 
         return deleted
 
     def find_user_by_name(self, name):
         """Find a user by exact display name match"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        cursor.execute(
-            """
-            SELECT telegram_id, display_name, role FROM users 
-            WHERE LOWER(display_name) = LOWER(%s)
-        """,
-            (name,),
-        )
+            cursor.execute(
+                """
+                SELECT telegram_id, display_name, role FROM users 
+                WHERE LOWER(display_name) = LOWER(%s)
+            """,
+                (name,),
+            )
 
-        user = cursor.fetchone()
-        cursor.close()
-        conn.close()
+            user = cursor.fetchone()
+            cursor.close()
 
         return dict(user) if user else None
 
@@ -1032,52 +1178,50 @@ class Database:
 
     def add_noshow_report(self, relief_reminder_id, teacher_name, reported_by, reporter_name, situation):
         """Add a no-show report"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            INSERT INTO noshow_reports 
-            (date, relief_reminder_id, teacher_name, reported_by, reporter_name, situation)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """,
-            (today, relief_reminder_id, teacher_name, reported_by, reporter_name, situation),
-        )
+            cursor.execute(
+                """
+                INSERT INTO noshow_reports 
+                (date, relief_reminder_id, teacher_name, reported_by, reporter_name, situation)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING id
+            """,
+                (today, relief_reminder_id, teacher_name, reported_by, reporter_name, situation),
+            )
 
-        report_id = cursor.fetchone()[0]
-        conn.commit()
-        cursor.close()
-        conn.close()
+            report_id = cursor.fetchone()[0]
+            conn.commit()
+            cursor.close()
 
         return report_id
 
     def get_today_noshow_reports(self):
         """Get all no-show reports for today"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        today = date.today()
+            today = date.today()
 
-        cursor.execute(
-            """
-            SELECT nr.id, nr.teacher_name, nr.reported_by, nr.reporter_name, 
-                   nr.situation, TO_CHAR(nr.reported_at, 'HH24:MI') as reported_at,
-                   rr.period, rr.class_info, rr.room,
-                   TO_CHAR(rr.relief_time, 'HH24:MI') as relief_time
-            FROM noshow_reports nr
-            LEFT JOIN relief_reminders rr ON nr.relief_reminder_id = rr.id
-            WHERE nr.date = %s
-            ORDER BY nr.reported_at DESC
-        """,
-            (today,),
-        )
+            cursor.execute(
+                """
+                SELECT nr.id, nr.teacher_name, nr.reported_by, nr.reporter_name, 
+                       nr.situation, TO_CHAR(nr.reported_at, 'HH24:MI') as reported_at,
+                       rr.period, rr.class_info, rr.room,
+                       TO_CHAR(rr.relief_time, 'HH24:MI') as relief_time
+                FROM noshow_reports nr
+                LEFT JOIN relief_reminders rr ON nr.relief_reminder_id = rr.id
+                WHERE nr.date = %s
+                ORDER BY nr.reported_at DESC
+            """,
+                (today,),
+            )
 
-        reports = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            reports = cursor.fetchall()
+            cursor.close()
 
         return [dict(r) for r in reports]
 
@@ -1085,481 +1229,619 @@ class Database:
 
     def add_or_update_drive_folder(self, folder_name, drive_folder_id, parent_folder_id=None):
         """Add or update a drive folder"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            INSERT INTO drive_folders (folder_name, drive_folder_id, parent_folder_id)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (drive_folder_id) 
-            DO UPDATE SET folder_name = EXCLUDED.folder_name, parent_folder_id = EXCLUDED.parent_folder_id
-            RETURNING id
-        """,
-            (folder_name, drive_folder_id, parent_folder_id),
-        )
+            cursor.execute(
+                """
+                INSERT INTO drive_folders (folder_name, drive_folder_id, parent_folder_id)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (drive_folder_id) 
+                DO UPDATE SET folder_name = EXCLUDED.folder_name, parent_folder_id = EXCLUDED.parent_folder_id
+                RETURNING id
+            """,
+                (folder_name, drive_folder_id, parent_folder_id),
+            )
 
-        folder_id = cursor.fetchone()[0]
-        conn.commit()
-        cursor.close()
-        conn.close()
+            folder_id = cursor.fetchone()[0]
+            conn.commit()
+            cursor.close()
 
         return folder_id
 
     def get_folder_by_name(self, folder_name):
         """Get folder by name"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        cursor.execute(
-            """
-            SELECT id, folder_name, drive_folder_id, parent_folder_id, last_synced_at
-            FROM drive_folders 
-            WHERE folder_name = %s
-        """,
-            (folder_name,),
-        )
+            cursor.execute(
+                """
+                SELECT id, folder_name, drive_folder_id, parent_folder_id, last_synced_at
+                FROM drive_folders 
+                WHERE folder_name = %s
+            """,
+                (folder_name,),
+            )
 
-        folder = cursor.fetchone()
-        cursor.close()
-        conn.close()
+            folder = cursor.fetchone()
+            cursor.close()
 
         return dict(folder) if folder else None
 
     def get_folder_by_drive_id(self, drive_folder_id):
         """Get folder by Google Drive ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        cursor.execute(
-            """
-            SELECT id, folder_name, drive_folder_id, parent_folder_id, last_synced_at
-            FROM drive_folders 
-            WHERE drive_folder_id = %s
-        """,
-            (drive_folder_id,),
-        )
+            cursor.execute(
+                """
+                SELECT id, folder_name, drive_folder_id, parent_folder_id, last_synced_at
+                FROM drive_folders 
+                WHERE drive_folder_id = %s
+            """,
+                (drive_folder_id,),
+            )
 
-        folder = cursor.fetchone()
-        cursor.close()
-        conn.close()
+            folder = cursor.fetchone()
+            cursor.close()
 
         return dict(folder) if folder else None
 
     def get_all_folders(self):
         """Get all folders"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        cursor.execute(
+            cursor.execute(
+                """
+                SELECT id, folder_name, drive_folder_id, parent_folder_id, last_synced_at
+                FROM drive_folders 
+                ORDER BY folder_name
             """
-            SELECT id, folder_name, drive_folder_id, parent_folder_id, last_synced_at
-            FROM drive_folders 
-            ORDER BY folder_name
-        """
-        )
+            )
 
-        folders = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            folders = cursor.fetchall()
+            cursor.close()
 
         return [dict(f) for f in folders]
 
     def set_folder_role_access(self, folder_id, roles):
         """Set which roles can access a folder (replaces existing)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        # Delete existing role access
-        cursor.execute(
-            """
-            DELETE FROM folder_role_access WHERE folder_id = %s
-        """,
-            (folder_id,),
-        )
-
-        # Add new role access
-        for role in roles:
+            # Delete existing role access
             cursor.execute(
                 """
-                INSERT INTO folder_role_access (folder_id, role)
-                VALUES (%s, %s)
-                ON CONFLICT (folder_id, role) DO NOTHING
+                DELETE FROM folder_role_access WHERE folder_id = %s
             """,
-                (folder_id, role.strip()),
+                (folder_id,),
             )
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            # Add new role access
+            for role in roles:
+                cursor.execute(
+                    """
+                    INSERT INTO folder_role_access (folder_id, role)
+                    VALUES (%s, %s)
+                    ON CONFLICT (folder_id, role) DO NOTHING
+                """,
+                    (folder_id, role.strip()),
+                )
+
+            conn.commit()
+            cursor.close()
 
     def get_folders_for_role(self, role):
         """Get all folders accessible to a role"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        cursor.execute(
-            """
-            SELECT DISTINCT df.id, df.folder_name, df.drive_folder_id, df.parent_folder_id, df.last_synced_at
-            FROM drive_folders df
-            INNER JOIN folder_role_access fra ON df.id = fra.folder_id
-            WHERE fra.role = %s
-            ORDER BY df.folder_name
-        """,
-            (role,),
-        )
+            cursor.execute(
+                """
+                SELECT DISTINCT df.id, df.folder_name, df.drive_folder_id, df.parent_folder_id, df.last_synced_at
+                FROM drive_folders df
+                INNER JOIN folder_role_access fra ON df.id = fra.folder_id
+                WHERE fra.role = %s
+                ORDER BY df.folder_name
+            """,
+                (role,),
+            )
 
-        folders = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            folders = cursor.fetchall()
+            cursor.close()
 
         return [dict(f) for f in folders]
 
     def get_folder_with_roles(self, folder_id):
         """Get folder with its role access list"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        # Get folder
-        cursor.execute(
-            """
-            SELECT id, folder_name, drive_folder_id, parent_folder_id, last_synced_at
-            FROM drive_folders 
-            WHERE id = %s
-        """,
-            (folder_id,),
-        )
+            # Get folder
+            cursor.execute(
+                """
+                SELECT id, folder_name, drive_folder_id, parent_folder_id, last_synced_at
+                FROM drive_folders 
+                WHERE id = %s
+            """,
+                (folder_id,),
+            )
 
-        folder = cursor.fetchone()
-        if not folder:
-            cursor.close()
-            conn.close()
-            return None
+            folder = cursor.fetchone()
+            if not folder:
+                cursor.close()
+                return None
 
-        folder_dict = dict(folder)
+            folder_dict = dict(folder)
 
-        # Get roles
-        cursor.execute(
-            """
-            SELECT role FROM folder_role_access WHERE folder_id = %s
-        """,
-            (folder_id,),
-        )
+            # Get roles
+            cursor.execute(
+                """
+                SELECT role FROM folder_role_access WHERE folder_id = %s
+            """,
+                (folder_id,),
+            )
 
-        roles = [row["role"] for row in cursor.fetchall()]
-        folder_dict["roles"] = roles
+            roles = [row["role"] for row in cursor.fetchall()]
+            folder_dict["roles"] = roles
 
-        cursor.close()
-        conn.close()
+            cursor.close()
 
         return folder_dict
 
-    def update_folder_sync_time(self, folder_id):
-        """Update last synced timestamp for a folder"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def get_folders_with_roles_by_drive_ids(self, drive_folder_ids):
+        """Get folders with their role access lists by Drive folder ID: {drive_folder_id: folder with 'roles'}"""
+        if not drive_folder_ids:
+            return {}
 
-        cursor.execute(
-            """
-            UPDATE drive_folders SET last_synced_at = CURRENT_TIMESTAMP WHERE id = %s
-        """,
-            (folder_id,),
-        )
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            cursor.execute(
+                """
+                SELECT f.id, f.folder_name, f.drive_folder_id, f.parent_folder_id, f.last_synced_at,
+                       COALESCE(array_agg(r.role) FILTER (WHERE r.role IS NOT NULL), '{}') AS roles
+                FROM drive_folders f
+                LEFT JOIN folder_role_access r ON r.folder_id = f.id
+                WHERE f.drive_folder_id = ANY(%s)
+                GROUP BY f.id
+            """,
+                (list(drive_folder_ids),),
+            )
 
-    def log_sync(self, folder_id, files_synced, files_processed, errors, synced_by):
-        """Log a sync operation"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+            folders = cursor.fetchall()
+            cursor.close()
 
-        today = date.today()
+        return {f['drive_folder_id']: dict(f) for f in folders}
 
-        cursor.execute(
-            """
-            INSERT INTO drive_sync_log 
-            (date, folder_id, files_synced, files_processed, errors, synced_by)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """,
-            (today, folder_id, files_synced, files_processed, errors, synced_by),
-        )
+    def finalize_folder_sync(self, folder_id, files_synced, files_processed, errors, synced_by, errors_total=0):
+        """Stamp the folder's last sync time and log the sync, in one transaction"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            today = date.today()
+
+            cursor.execute(
+                """
+                UPDATE drive_folders SET last_synced_at = CURRENT_TIMESTAMP WHERE id = %s
+            """,
+                (folder_id,),
+            )
+            cursor.execute(
+                """
+                INSERT INTO drive_sync_log 
+                (date, folder_id, files_synced, files_processed, errors, errors_total, synced_by)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """,
+                (today, folder_id, files_synced, files_processed, errors, errors_total, synced_by),
+            )
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
 
     def get_today_sync_logs(self, folder_id=None):
         """Get sync logs for today"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+
+            today = date.today()
+
+            if folder_id:
+                cursor.execute(
+                    """
+                    SELECT sl.id, sl.files_synced, sl.files_processed, sl.errors, sl.errors_total, 
+                           sl.synced_by, TO_CHAR(sl.synced_at, 'HH24:MI') as synced_at,
+                           df.folder_name
+                    FROM drive_sync_log sl
+                    LEFT JOIN drive_folders df ON sl.folder_id = df.id
+                    WHERE sl.date = %s AND sl.folder_id = %s
+                    ORDER BY sl.synced_at DESC
+                """,
+                    (today, folder_id),
+                )
+            else:
+                cursor.execute(
+                    """
+                    SELECT sl.id, sl.files_synced, sl.files_processed, sl.errors, sl.errors_total, 
+                           sl.synced_by, TO_CHAR(sl.synced_at, 'HH24:MI') as synced_at,
+                           df.folder_name
+                    FROM drive_sync_log sl
+                    LEFT JOIN drive_folders df ON sl.folder_id = df.id
+                    WHERE sl.date = %s
+                    ORDER BY sl.synced_at DESC
+                """,
+                    (today,),
+                )
 
-        today = date.today()
+            logs = cursor.fetchall()
+            cursor.close()
+
+        return [dict(l) for l in logs]
+
+    def get_drive_file_cache(self, drive_file_ids):
+        """Get cached analyses for Drive files: {drive_file_id: {'version', 'content_hash', 'tag', 'content_data'}}"""
+        if not drive_file_ids:
+            return {}
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        if folder_id:
             cursor.execute(
                 """
-                SELECT sl.id, sl.files_synced, sl.files_processed, sl.errors, 
-                       sl.synced_by, TO_CHAR(sl.synced_at, 'HH24:MI') as synced_at,
-                       df.folder_name
-                FROM drive_sync_log sl
-                LEFT JOIN drive_folders df ON sl.folder_id = df.id
-                WHERE sl.date = %s AND sl.folder_id = %s
-                ORDER BY sl.synced_at DESC
+                SELECT drive_file_id, version, content_hash, tag, content
+                FROM drive_file_cache
+                WHERE drive_file_id = ANY(%s)
             """,
-                (today, folder_id),
+                (list(drive_file_ids),),
             )
-        else:
-            cursor.execute(
+
+            rows = cursor.fetchall()
+            cursor.close()
+
+        return {
+            row['drive_file_id']: {
+                'version': row['version'],
+                'content_hash': row['content_hash'],
+                'tag': row['tag'],
+                'content_data': json.loads(row['content']),
+            }
+            for row in rows
+        }
+
+    def save_drive_file_cache(self, cache_rows):
+        """
+        Upsert cached analyses
+        cache_rows: list of (drive_file_id, version, content_hash or None, tag, content_data)
+        """
+        if not cache_rows:
+            return
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            # Rebuildable from Drive - see add_or_update_drive_entries
+            cursor.execute("SET LOCAL synchronous_commit TO OFF")
+            cursor.executemany(
                 """
-                SELECT sl.id, sl.files_synced, sl.files_processed, sl.errors, 
-                       sl.synced_by, TO_CHAR(sl.synced_at, 'HH24:MI') as synced_at,
-                       df.folder_name
-                FROM drive_sync_log sl
-                LEFT JOIN drive_folders df ON sl.folder_id = df.id
-                WHERE sl.date = %s
-                ORDER BY sl.synced_at DESC
+                INSERT INTO drive_file_cache (drive_file_id, version, content_hash, tag, content, updated_at)
+                VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (drive_file_id)
+                DO UPDATE SET version = EXCLUDED.version,
+                              content_hash = EXCLUDED.content_hash,
+                              tag = EXCLUDED.tag,
+                              content = EXCLUDED.content,
+                              updated_at = CURRENT_TIMESTAMP
             """,
-                (today,),
+                [
+                    (drive_file_id, version, content_hash, tag, json.dumps(content_data))
+                    for drive_file_id, version, content_hash, tag, content_data in cache_rows
+                ],
             )
 
-        logs = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
 
-        return [dict(l) for l in logs]
+    def touch_drive_file_cache(self, drive_file_ids):
+        """Mark cached analyses as still in use (keeps them from being purged)"""
+        if not drive_file_ids:
+            return
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute("SET LOCAL synchronous_commit TO OFF")
+            cursor.execute(
+                """
+                UPDATE drive_file_cache SET updated_at = CURRENT_TIMESTAMP
+                WHERE drive_file_id = ANY(%s)
+            """,
+                (list(drive_file_ids),),
+            )
+
+            conn.commit()
+            cursor.close()
 
     # ===== WEBHOOK MANAGEMENT =====
 
     def save_webhook(self, folder_id, channel_id, resource_id, webhook_url, page_token=None, expires_at=None):
         """Save webhook channel information"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            INSERT INTO drive_webhooks 
-            (folder_id, channel_id, resource_id, webhook_url, page_token, expires_at)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (channel_id) 
-            DO UPDATE SET resource_id = EXCLUDED.resource_id, 
-                         page_token = EXCLUDED.page_token,
-                         expires_at = EXCLUDED.expires_at,
-                         active = TRUE
-            RETURNING id
-        """,
-            (folder_id, channel_id, resource_id, webhook_url, page_token, expires_at),
-        )
+            cursor.execute(
+                """
+                INSERT INTO drive_webhooks 
+                (folder_id, channel_id, resource_id, webhook_url, page_token, expires_at)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (channel_id) 
+                DO UPDATE SET resource_id = EXCLUDED.resource_id, 
+                             page_token = EXCLUDED.page_token,
+                             expires_at = EXCLUDED.expires_at,
+                             active = TRUE
+                RETURNING id
+            """,
+                (folder_id, channel_id, resource_id, webhook_url, page_token, expires_at),
+            )
 
-        webhook_id = cursor.fetchone()[0]
-        conn.commit()
-        cursor.close()
-        conn.close()
+            webhook_id = cursor.fetchone()[0]
+            conn.commit()
+            cursor.close()
 
+        self._webhook_cache.pop(channel_id, None)
         return webhook_id
 
     def get_webhook_by_folder(self, folder_id):
         """Get active webhook for a folder"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        cursor.execute(
-            """
-            SELECT id, folder_id, channel_id, resource_id, webhook_url, page_token, expires_at
-            FROM drive_webhooks 
-            WHERE folder_id = %s AND active = TRUE
-            ORDER BY created_at DESC
-            LIMIT 1
-        """,
-            (folder_id,),
-        )
+            cursor.execute(
+                """
+                SELECT id, folder_id, channel_id, resource_id, webhook_url, page_token, expires_at
+                FROM drive_webhooks 
+                WHERE folder_id = %s AND active = TRUE
+                ORDER BY created_at DESC
+                LIMIT 1
+            """,
+                (folder_id,),
+            )
 
-        webhook = cursor.fetchone()
-        cursor.close()
-        conn.close()
+            webhook = cursor.fetchone()
+            cursor.close()
 
         return dict(webhook) if webhook else None
 
+    def get_webhook_by_channel_id(self, channel_id):
+        """Get an active webhook by its channel ID (cached; the lookup behind every Drive notification)"""
+        cached = self._webhook_cache.get(channel_id)
+        if cached:
+            return dict(cached)
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+
+            cursor.execute(
+                """
+                SELECT id, folder_id, channel_id, resource_id, webhook_url, page_token, expires_at
+                FROM drive_webhooks 
+                WHERE channel_id = %s AND active = TRUE
+            """,
+                (channel_id,),
+            )
+
+            webhook = cursor.fetchone()
+            cursor.close()
+
+        if not webhook:
+            return None
+        self._webhook_cache[channel_id] = dict(webhook)
+        return dict(webhook)
+
     def update_webhook_page_token(self, channel_id, page_token):
         """Update the page token for a webhook"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            UPDATE drive_webhooks SET page_token = %s WHERE channel_id = %s
-        """,
-            (page_token, channel_id),
-        )
+            cursor.execute(
+                """
+                UPDATE drive_webhooks SET page_token = %s WHERE channel_id = %s
+            """,
+                (page_token, channel_id),
+            )
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
+
+        cached = self._webhook_cache.get(channel_id)
+        if cached:
+            cached['page_token'] = page_token
 
     def deactivate_webhook(self, channel_id):
         """Deactivate a webhook"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            UPDATE drive_webhooks SET active = FALSE WHERE channel_id = %s
-        """,
-            (channel_id,),
-        )
+            cursor.execute(
+                """
+                UPDATE drive_webhooks SET active = FALSE WHERE channel_id = %s
+            """,
+                (channel_id,),
+            )
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
+
+        self._webhook_cache.pop(channel_id, None)
 
     def get_all_active_webhooks(self):
         """Get all active webhooks"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        cursor.execute(
+            cursor.execute(
+                """
+                SELECT id, folder_id, channel_id, resource_id, webhook_url, page_token, expires_at
+                FROM drive_webhooks 
+                WHERE active = TRUE
             """
-            SELECT id, folder_id, channel_id, resource_id, webhook_url, page_token, expires_at
-            FROM drive_webhooks 
-            WHERE active = TRUE
-        """
-        )
+            )
 
-        webhooks = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            webhooks = cursor.fetchall()
+            cursor.close()
 
         return [dict(w) for w in webhooks]
 
     # ===== SHORTCUT TARGET TRACKING =====
 
-    def save_shortcut_target(self, shortcut_id, shortcut_name, target_file_id, target_file_name, watched_folder_id):
-        """Save a shortcut and its target file for tracking"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def save_shortcut_targets(self, rows):
+        """
+        Save several shortcuts and their targets in one transaction.
+        rows: (shortcut_id, shortcut_name, target_file_id, target_file_name, watched_folder_id) tuples
+        """
+        if not rows:
+            return
 
-        cursor.execute(
-            """
-            INSERT INTO shortcut_targets 
-            (shortcut_id, shortcut_name, target_file_id, target_file_name, watched_folder_id)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (shortcut_id, target_file_id) 
-            DO UPDATE SET shortcut_name = EXCLUDED.shortcut_name,
-                         target_file_name = EXCLUDED.target_file_name
-            RETURNING id
-        """,
-            (shortcut_id, shortcut_name, target_file_id, target_file_name, watched_folder_id),
-        )
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        target_id = cursor.fetchone()[0]
-        conn.commit()
-        cursor.close()
-        conn.close()
+            cursor.executemany(
+                """
+                INSERT INTO shortcut_targets 
+                (shortcut_id, shortcut_name, target_file_id, target_file_name, watched_folder_id)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (shortcut_id, target_file_id) 
+                DO UPDATE SET shortcut_name = EXCLUDED.shortcut_name,
+                             target_file_name = EXCLUDED.target_file_name
+            """,
+                rows,
+            )
 
-        return target_id
+            conn.commit()
+            cursor.close()
 
     def get_shortcut_targets_for_folder(self, watched_folder_id):
         """Get all shortcut targets being watched for a folder"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        cursor.execute(
-            """
-            SELECT shortcut_id, shortcut_name, target_file_id, target_file_name
-            FROM shortcut_targets 
-            WHERE watched_folder_id = %s
-        """,
-            (watched_folder_id,),
-        )
+            cursor.execute(
+                """
+                SELECT shortcut_id, shortcut_name, target_file_id, target_file_name
+                FROM shortcut_targets 
+                WHERE watched_folder_id = %s
+            """,
+                (watched_folder_id,),
+            )
 
-        targets = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            targets = cursor.fetchall()
+            cursor.close()
 
         return [dict(t) for t in targets]
 
     def get_shortcut_by_target(self, target_file_id):
         """Get shortcut info by target file ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        cursor.execute(
-            """
-            SELECT shortcut_id, shortcut_name, target_file_id, target_file_name, watched_folder_id
-            FROM shortcut_targets 
-            WHERE target_file_id = %s
-            LIMIT 1
-        """,
-            (target_file_id,),
-        )
+            cursor.execute(
+                """
+                SELECT shortcut_id, shortcut_name, target_file_id, target_file_name, watched_folder_id
+                FROM shortcut_targets 
+                WHERE target_file_id = %s
+                LIMIT 1
+            """,
+                (target_file_id,),
+            )
 
-        shortcut = cursor.fetchone()
-        cursor.close()
-        conn.close()
+            shortcut = cursor.fetchone()
+            cursor.close()
 
         return dict(shortcut) if shortcut else None
 
+    def get_shortcuts_by_targets(self, target_file_ids):
+        """Get the shortcuts pointing at any of target_file_ids: {target_file_id: [shortcut info, ...]}"""
+        if not target_file_ids:
+            return {}
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+
+            cursor.execute(
+                """
+                SELECT shortcut_id, shortcut_name, target_file_id, target_file_name, watched_folder_id
+                FROM shortcut_targets
+                WHERE target_file_id = ANY(%s)
+            """,
+                (list(target_file_ids),),
+            )
+
+            rows = cursor.fetchall()
+            cursor.close()
+
+        shortcuts = defaultdict(list)
+        for row in rows:
+            shortcuts[row['target_file_id']].append(dict(row))
+        return dict(shortcuts)
+
     def remove_shortcut_target(self, shortcut_id):
         """Remove a shortcut target from tracking"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            DELETE FROM shortcut_targets WHERE shortcut_id = %s
-        """,
-            (shortcut_id,),
-        )
+            cursor.execute(
+                """
+                DELETE FROM shortcut_targets WHERE shortcut_id = %s
+            """,
+                (shortcut_id,),
+            )
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
 
     # ===== ROLE ASSUMPTION =====
 
     def assume_role(self, telegram_id, assumed_role, original_role):
         """Store role assumption for a superadmin"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            INSERT INTO role_assumptions (telegram_id, original_role, assumed_role)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (telegram_id) 
-            DO UPDATE SET original_role = EXCLUDED.original_role,
-                         assumed_role = EXCLUDED.assumed_role,
-                         assumed_at = CURRENT_TIMESTAMP
-            RETURNING id
-        """,
-            (telegram_id, original_role, assumed_role),
-        )
+            cursor.execute(
+                """
+                INSERT INTO role_assumptions (telegram_id, original_role, assumed_role)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (telegram_id) 
+                DO UPDATE SET original_role = EXCLUDED.original_role,
+                             assumed_role = EXCLUDED.assumed_role,
+                             assumed_at = CURRENT_TIMESTAMP
+                RETURNING id
+            """,
+                (telegram_id, original_role, assumed_role),
+            )
 
-        assumption_id = cursor.fetchone()[0]
-        conn.commit()
-        cursor.close()
-        conn.close()
+            assumption_id = cursor.fetchone()[0]
+            conn.commit()
+            cursor.close()
+        self.invalidate_user_cache(telegram_id)
 
         return assumption_id
 
     def get_role_assumption(self, telegram_id):
         """Get current role assumption for a user"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        cursor.execute(
-            """
-            SELECT telegram_id, original_role, assumed_role, assumed_at
-            FROM role_assumptions 
-            WHERE telegram_id = %s
-        """,
-            (telegram_id,),
-        )
+            cursor.execute(
+                """
+                SELECT telegram_id, original_role, assumed_role, assumed_at
+                FROM role_assumptions 
+                WHERE telegram_id = %s
+            """,
+                (telegram_id,),
+            )
 
-        assumption = cursor.fetchone()
-        cursor.close()
-        conn.close()
+            assumption = cursor.fetchone()
+            cursor.close()
 
         return dict(assumption) if assumption else None
 
@@ -1572,19 +1854,19 @@ class Database:
         
         original_role = assumption['original_role']
         
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute(
-            """
-            DELETE FROM role_assumptions WHERE telegram_id = %s
-        """,
-            (telegram_id,),
-        )
+            cursor.execute(
+                """
+                DELETE FROM role_assumptions WHERE telegram_id = %s
+            """,
+                (telegram_id,),
+            )
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+            conn.commit()
+            cursor.close()
+        self.invalidate_user_cache(telegram_id)
 
         return original_role
 
@@ -1592,35 +1874,34 @@ class Database:
 
     def get_stats(self):
         """Get bot usage statistics"""
-        conn = self.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
+        with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
 
-        # Count users by role
-        cursor.execute(
+            # Count users by role
+            cursor.execute(
+                """
+                SELECT role, COUNT(*) as count
+                FROM users
+                GROUP BY role
             """
-            SELECT role, COUNT(*) as count
-            FROM users
-            GROUP BY role
-        """
-        )
+            )
 
-        role_counts = {row["role"]: row["count"] for row in cursor.fetchall()}
+            role_counts = {row["role"]: row["count"] for row in cursor.fetchall()}
 
-        # Count today's entries
-        today = date.today()
-        cursor.execute(
-            """
-            SELECT COUNT(*) as count
-            FROM daily_entries
-            WHERE date = %s
-        """,
-            (today,),
-        )
+            # Count today's entries
+            today = date.today()
+            cursor.execute(
+                """
+                SELECT COUNT(*) as count
+                FROM daily_entries
+                WHERE date = %s
+            """,
+                (today,),
+            )
 
-        today_count = cursor.fetchone()["count"]
+            today_count = cursor.fetchone()["count"]
 
-        cursor.close()
-        conn.close()
+            cursor.close()
 
         return {
             "total_users": sum(role_counts.values()),
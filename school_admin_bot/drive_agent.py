@@ -287,8 +287,17 @@ class DriveAgent:
         self.sheets = build("sheets", "v4", credentials=creds)
         self.root_id = GOOGLE_DRIVE_ROOT_FOLDER_ID
 
+        # Apps Script HTTP client, created on first use and kept so calls reuse its TLS connections
+        self._http = None
+
     # ---------- public entry point ----------
 
+    async def aclose(self):
+        """Close the Apps Script HTTP client and its connections (called when the bot shuts down)."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
     async def run(self, user_query: str) -> str:
         """Run the agent loop and return the final text response."""
         messages = [{"role": "user", "content": user_query}]
@@ -769,15 +778,12 @@ class DriveAgent:
 
     async def _call_apps_script(self, payload: dict) -> dict:
         """POST to the Apps Script web app and return the JSON response."""
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.post(
-                APPS_SCRIPT_URL,
-                json=payload,
-                follow_redirects=True,
-            )
-            if resp.status_code != 200:
-                return {"error": f"Apps Script returned HTTP {resp.status_code}"}
-            return resp.json()
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=30, follow_redirects=True)
+        resp = await self._http.post(APPS_SCRIPT_URL, json=payload)
+        if resp.status_code != 200:
+            return {"error": f"Apps Script returned HTTP {resp.status_code}"}
+        return resp.json()
 
     # ---------- helpers ----------
 
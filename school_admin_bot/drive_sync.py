@@ -1,8 +1,11 @@
 import json
 import io
+import codecs
 import uuid
 import logging
-from typing import List, Dict, Optional
+import threading
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
@@ -11,6 +14,43 @@ from config import GOOGLE_DRIVE_ROOT_FOLDER_ID, GOOGLE_SERVICE_ACCOUNT_JSON
 
 logger = logging.getLogger(__name__)
 
+# Drive accepts at most 100 calls in one batch request
+DRIVE_BATCH_SIZE = 100
+
+# Download/export chunk size: bounds the HTTP response held in memory alongside the file buffer
+# (MediaIoBaseDownload's default of 100MB pulls a whole PDF in one response)
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# changes.list pages (of up to 1000 changes) read per call to get_changes: a huge burst is then
+# synced in several runs, each saving its page token, instead of all in one
+CHANGES_MAX_PAGES = 5
+
+# Google Workspace files have no bytes of their own: the format each one is exported in for analysis
+# (Sheets as CSV for structured data, Docs/Slides as PDF)
+GOOGLE_EXPORT_FORMATS = {
+    'application/vnd.google-apps.document': 'application/pdf',
+    'application/vnd.google-apps.spreadsheet': 'text/csv',
+    'application/vnd.google-apps.presentation': 'application/pdf',
+}
+
+
+class _TextSink:
+    """Write target for MediaIoBaseDownload that decodes each chunk as it arrives (UTF-8, BOM dropped)"""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+        self._parts = []
+        self.head = b''  # First bytes of the download, for signature checks
+
+    def write(self, data):
+        if not self.head:
+            self.head = bytes(data[:16])
+        self._parts.append(self._decoder.decode(data))
+
+    def getvalue(self) -> str:
+        self._parts.append(self._decoder.decode(b'', final=True))
+        return ''.join(self._parts)
+
 
 class DriveSync:
     """Handle Google Drive operations"""
@@ -35,10 +75,22 @@ class DriveSync:
             scopes=['https://www.googleapis.com/auth/drive']
         )
 
-        # Build Drive API service
-        self.service = build('drive', 'v3', credentials=credentials)
+        self._credentials = credentials
+        self._local = threading.local()
         self.root_folder_id = GOOGLE_DRIVE_ROOT_FOLDER_ID
 
+    @property
+    def service(self):
+        """
+        Drive API service for the calling thread
+        httplib2 connections are not thread-safe, so each sync worker thread gets its own client
+        """
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = build('drive', 'v3', credentials=self._credentials, cache_discovery=False)
+            self._local.service = service
+        return service
+
     def list_folders(self, parent_folder_id: Optional[str] = None) -> List[Dict]:
         """
         List all folders in a parent folder (or root if not specified)
@@ -84,7 +136,7 @@ class DriveSync:
         """
         List all files in a folder
         If recursive=True, also includes files in subfolders
-        Returns list of file dicts with: id, name, mimeType, size, parents (for folder tracking)
+        Returns list of file dicts with: id, name, mimeType, modifiedTime, md5Checksum, shortcutDetails
         """
         try:
             all_files = []
@@ -92,7 +144,7 @@ class DriveSync:
             while True:
                 kwargs = {
                     "q": f"'{folder_id}' in parents and trashed=false",
-                    "fields": "nextPageToken, files(id, name, mimeType, size, modifiedTime, parents)",
+                    "fields": "nextPageToken, files(id, name, mimeType, modifiedTime, md5Checksum, shortcutDetails)",
                     "pageSize": 100,
                     "supportsAllDrives": True,
                     "includeItemsFromAllDrives": True,
@@ -122,6 +174,66 @@ class DriveSync:
             logger.error(f"Error listing files: {error}")
             return []
     
+    def list_files_in_folders(self, folder_ids: List[str]) -> Dict[str, List[Dict]]:
+        """
+        List files (non-recursive) in several folders with batched files.list calls
+        Up to DRIVE_BATCH_SIZE folders share one HTTP request; folders with more than one page
+        of results are finished with list_files_in_folder
+        Returns {folder_id: [file dicts]}; folders whose request failed are left out
+        """
+        files_by_folder = {}
+        multi_page = []
+
+        def make_callback(folder_id):
+            def callback(request_id, response, exception):
+                if exception is not None:
+                    logger.error(f"Error listing files in folder {folder_id}: {exception}")
+                elif response.get('nextPageToken'):
+                    multi_page.append(folder_id)
+                else:
+                    files_by_folder[folder_id] = [
+                        item for item in response.get('files', [])
+                        if item.get('mimeType') != 'application/vnd.google-apps.folder'
+                    ]
+            return callback
+
+        for start in range(0, len(folder_ids), DRIVE_BATCH_SIZE):
+            batch = self.service.new_batch_http_request()
+            for folder_id in folder_ids[start:start + DRIVE_BATCH_SIZE]:
+                batch.add(
+                    self.service.files().list(
+                        q=f"'{folder_id}' in parents and trashed=false",
+                        fields="nextPageToken, files(id, name, mimeType, modifiedTime, md5Checksum, shortcutDetails)",
+                        pageSize=100,
+                        supportsAllDrives=True,
+                        includeItemsFromAllDrives=True,
+                    ),
+                    callback=make_callback(folder_id),
+                )
+            try:
+                batch.execute()
+            except HttpError as error:
+                logger.error(f"Error in batched file listing: {error}")
+
+        for folder_id in multi_page:
+            files_by_folder[folder_id] = self.list_files_in_folder(folder_id)
+
+        logger.info(f"Listed files for {len(files_by_folder)}/{len(folder_ids)} folders in batch")
+        return files_by_folder
+
+    @staticmethod
+    def file_version(file: Dict) -> Optional[str]:
+        """
+        Identifier that changes whenever the file content changes: md5Checksum for binary files,
+        modifiedTime for Google Docs/Sheets (which have no checksum). Shortcuts take their target's
+        version once attach_shortcut_targets has run (None before: their own metadata does not
+        change when the target file does).
+        """
+        if file.get('mimeType') == 'application/vnd.google-apps.shortcut':
+            target = file.get('_target')
+            return DriveSync.file_version(target) if target else None
+        return file.get('md5Checksum') or file.get('modifiedTime')
+
     def get_file_folder_path(self, file_id: str, root_folder_id: str) -> Optional[str]:
         """
         Get the folder path for a file relative to root folder
@@ -177,6 +289,22 @@ class DriveSync:
             logger.debug(f"Error getting file folder path: {error}")
             return None
 
+    @staticmethod
+    def _download_media(request, sink=None):
+        """
+        Run a get_media/export_media request in DOWNLOAD_CHUNK_SIZE pieces into one buffer
+        (bytes), or into sink (e.g. a _TextSink) and return its getvalue()
+        """
+        file_content = sink if sink is not None else io.BytesIO()
+        downloader = MediaIoBaseDownload(file_content, request, chunksize=DOWNLOAD_CHUNK_SIZE)
+        
+        done = False
+        while not done:
+            status, done = downloader.next_chunk()
+        
+        # BytesIO.getvalue() hands back the buffer's bytes without another copy once writing is done
+        return file_content.getvalue()
+
     def download_file(self, file_id: str) -> Optional[bytes]:
         """Download a file by ID, returns file content as bytes"""
         try:
@@ -184,14 +312,7 @@ class DriveSync:
                 fileId=file_id,
                 supportsAllDrives=True,
             )
-            file_content = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_content, request)
-            
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-            
-            return file_content.getvalue()
+            return self._download_media(request)
 
         except HttpError as error:
             logger.error(f"Error downloading file {file_id}: {error}")
@@ -206,49 +327,92 @@ class DriveSync:
         - 'text/csv' for CSV (Google Sheets only)
         - 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' for Excel
         """
+        if mime_type not in GOOGLE_EXPORT_FORMATS:
+            logger.warning(f"Unsupported Google file type: {mime_type}")
+            return None
+
         try:
-            # Map Google MIME types to export formats
-            export_mime_map = {
-                'application/vnd.google-apps.document': {
-                    'pdf': 'application/pdf',
-                    'txt': 'text/plain',
-                },
-                'application/vnd.google-apps.spreadsheet': {
-                    'pdf': 'application/pdf',
-                    'csv': 'text/csv',
-                    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                },
-                'application/vnd.google-apps.presentation': {
-                    'pdf': 'application/pdf',
-                },
-            }
-
-            if mime_type not in export_mime_map:
-                logger.warning(f"Unsupported Google file type: {mime_type}")
-                return None
+            request = self.service.files().export_media(fileId=file_id, mimeType=export_format)
+            return self._download_media(request)
+
+        except HttpError as error:
+            logger.error(f"Error exporting Google file {file_id}: {error}")
+            return None
+
+    def get_files_metadata(self, file_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Metadata for several files with batched files.get calls (DRIVE_BATCH_SIZE per HTTP request)
+        Returns {file_id: file dict}; files whose request failed are left out
+        """
+        metadata = {}
 
-            # Get export format
-            if export_format == 'application/pdf':
-                export_mime = export_mime_map[mime_type].get('pdf', 'application/pdf')
-            elif export_format == 'text/plain':
-                export_mime = export_mime_map[mime_type].get('txt', 'text/plain')
-            elif export_format == 'text/csv':
-                export_mime = export_mime_map[mime_type].get('csv', 'text/csv')
+        def callback(request_id, response, exception):
+            if exception is not None:
+                logger.error(f"Error getting metadata for file {request_id}: {exception}")
             else:
-                export_mime = export_format
+                metadata[response['id']] = response
 
-            request = self.service.files().export_media(fileId=file_id, mimeType=export_mime)
-            file_content = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_content, request)
-            
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-            
-            return file_content.getvalue()
+        file_ids = list(dict.fromkeys(file_ids))
+        for start in range(0, len(file_ids), DRIVE_BATCH_SIZE):
+            batch = self.service.new_batch_http_request(callback=callback)
+            for file_id in file_ids[start:start + DRIVE_BATCH_SIZE]:
+                batch.add(
+                    self.service.files().get(
+                        fileId=file_id,
+                        fields="id, name, mimeType, modifiedTime, md5Checksum",
+                        supportsAllDrives=True,
+                    ),
+                    request_id=file_id,
+                )
+            try:
+                batch.execute()
+            except HttpError as error:
+                logger.error(f"Error in batched metadata request: {error}")
+        return metadata
+
+    def attach_shortcut_targets(self, files: List[Dict]) -> None:
+        """
+        Look up the targets of the shortcuts in files in one batch and store each as file['_target'],
+        so get_file_content and file_version don't resolve them one by one
+        """
+        shortcuts = [
+            f for f in files
+            if f.get('mimeType') == 'application/vnd.google-apps.shortcut'
+            and '_target' not in f
+            and (f.get('shortcutDetails') or {}).get('targetId')
+        ]
+        if not shortcuts:
+            return
+        targets = self.get_files_metadata([f['shortcutDetails']['targetId'] for f in shortcuts])
+        for f in shortcuts:
+            target = targets.get(f['shortcutDetails']['targetId'])
+            if target:
+                f['_target'] = target
 
+    def export_sheet_as_text(self, file_id: str) -> Optional[str]:
+        """
+        Export a Google Sheet as CSV text, decoding each downloaded chunk as it arrives so the
+        raw export is never held in memory alongside the text
+        """
+        try:
+            request = self.service.files().export_media(fileId=file_id, mimeType='text/csv')
+            return self._download_media(request, _TextSink())
         except HttpError as error:
-            logger.error(f"Error exporting Google file {file_id}: {error}")
+            logger.error(f"Error exporting Google Sheet {file_id}: {error}")
+            return None
+
+    def download_text_file(self, file_id: str) -> Optional[Tuple[str, bytes]]:
+        """
+        Download a plain-text file, decoding each chunk as it arrives (like export_sheet_as_text)
+        Returns (text, first bytes of the file) or None; the first bytes let the caller spot a
+        binary file that Drive has labelled as text
+        """
+        try:
+            request = self.service.files().get_media(fileId=file_id, supportsAllDrives=True)
+            sink = _TextSink()
+            return self._download_media(request, sink), sink.head
+        except HttpError as error:
+            logger.error(f"Error downloading file {file_id}: {error}")
             return None
 
     def resolve_shortcut(self, file_id: str) -> Optional[Dict]:
@@ -300,6 +464,8 @@ class DriveSync:
         mime_type = file.get('mimeType', '')
         
         # Check if it's a shortcut - resolve to target file
+        if mime_type == 'application/vnd.google-apps.shortcut' and file.get('_target'):
+            return self.get_file_content(file['_target'])
         if mime_type == 'application/vnd.google-apps.shortcut':
             logger.info(f"Detected shortcut: {file.get('name')}, resolving to target file...")
             shortcut_result = self.resolve_shortcut(file_id)
@@ -311,31 +477,95 @@ class DriveSync:
                 logger.warning(f"Could not resolve shortcut {file.get('name')}")
                 return None
 
-        # Check if it's a Google Workspace file
-        if mime_type == 'application/vnd.google-apps.spreadsheet':
-            # Export Google Sheets as CSV for better structured data extraction
-            logger.info(f"Exporting Google Sheets {file['name']} as CSV")
-            return self.export_google_file(file_id, mime_type, 'text/csv')
-        elif mime_type in [
-            'application/vnd.google-apps.document',
-            'application/vnd.google-apps.presentation'
-        ]:
-            # Export Docs/Presentations as PDF for processing
-            logger.info(f"Exporting Google file {file['name']} as PDF")
-            return self.export_google_file(file_id, mime_type, 'application/pdf')
-        else:
-            # Regular file, download directly
-            logger.info(f"Downloading file {file['name']}")
-            return self.download_file(file_id)
+        # Google Workspace files are exported (GOOGLE_EXPORT_FORMATS); everything else is downloaded as-is
+        export_format = GOOGLE_EXPORT_FORMATS.get(mime_type)
+        if export_format:
+            logger.info(f"Exporting Google file {file['name']} as {export_format}")
+            return self.export_google_file(file_id, mime_type, export_format)
+        logger.info(f"Downloading file {file['name']}")
+        return self.download_file(file_id)
+
+    def get_start_page_token(self) -> Optional[str]:
+        """Page token marking 'now' in the Drive changes feed"""
+        try:
+            response = self.service.changes().getStartPageToken(supportsAllDrives=True).execute()
+            return response.get('startPageToken')
+        except HttpError as error:
+            logger.error(f"Error getting start page token: {error}")
+            return None
+
+    def watch_changes(self, page_token: str, channel_id: str, address: str,
+                      token: Optional[str] = None, expiration_ms: Optional[int] = None) -> Optional[Dict]:
+        """
+        Open a changes.watch channel: Drive POSTs to address whenever something changes
+        Returns the channel resource (resourceId, expiration in ms) or None
+        """
+        body = {'id': channel_id, 'type': 'web_hook', 'address': address}
+        if token:
+            body['token'] = token
+        if expiration_ms:
+            body['expiration'] = expiration_ms
+        try:
+            return self.service.changes().watch(
+                pageToken=page_token,
+                body=body,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+            ).execute()
+        except HttpError as error:
+            logger.error(f"Error watching changes: {error}")
+            return None
+
+    def get_changes(self, page_token: str, max_pages: int = CHANGES_MAX_PAGES) -> Tuple[List[Dict], Optional[str], bool]:
+        """
+        List changes since page_token, reading at most max_pages pages
+        Returns (changes, next_token, caught_up): next_token is the new start page token once the
+        feed is caught up, else the page to continue from; it is None if the request failed
+        """
+        changes = []
+        try:
+            for _ in range(max_pages):
+                response = self.service.changes().list(
+                    pageToken=page_token,
+                    fields=(
+                        "nextPageToken, newStartPageToken, changes(fileId, removed, "
+                        "file(id, name, mimeType, trashed, modifiedTime, md5Checksum, parents, shortcutDetails))"
+                    ),
+                    pageSize=1000,
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True,
+                ).execute()
+                changes.extend(response.get('changes', []))
+                if 'newStartPageToken' in response:
+                    return changes, response['newStartPageToken'], True
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    return changes, None, False
+            return changes, page_token, False
+        except HttpError as error:
+            logger.error(f"Error listing changes: {error}")
+        return changes, None, False
+
+    def stop_channel(self, channel_id: str, resource_id: str) -> bool:
+        """Stop a watch channel (already-expired channels are treated as stopped)"""
+        try:
+            self.service.channels().stop(body={'id': channel_id, 'resourceId': resource_id}).execute()
+            return True
+        except HttpError as error:
+            logger.warning(f"Error stopping channel {channel_id}: {error}")
+            return False
 
     def detect_file_category(self, file_name: str, folder_name: str) -> str:
         """
         Auto-detect category/tag based on filename and folder name
         Returns one of the TAGS from config
         """
-        file_lower = file_name.lower()
-        folder_lower = folder_name.lower()
+        return self._classify(file_name.lower(), folder_name.lower())
 
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _classify(file_lower: str, folder_lower: str) -> str:
+        """Keyword match behind detect_file_category, memoised (folder and file names repeat every sync)"""
         # Check folder name first
         if 'relief' in folder_lower:
             return 'RELIEF'
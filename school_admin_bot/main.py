@@ -1,10 +1,23 @@
 import os
 import io
 import re
+import csv
+import html
 import json
+import uuid
 import base64
+import hashlib
+import signal
+import asyncio
 import logging
-from datetime import datetime, time, timedelta
+import threading
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache, wraps
+from itertools import groupby, islice
+from operator import itemgetter
+from time import monotonic, sleep
 from zoneinfo import ZoneInfo
 
 # Singapore timezone for "today" context in prompts
@@ -21,8 +34,10 @@ def get_singapore_date_time_str():
     now = get_singapore_now()
     return now.strftime("%d %B %Y, %I:%M %p SGT")
 import fitz  # PyMuPDF for PDF processing
+import psycopg
 from psycopg.rows import dict_row
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -33,19 +48,32 @@ from telegram.ext import (
     filters,
 )
 import anthropic
+from charset_normalizer import from_bytes as detect_charset  # Re-decodes text that isn't UTF-8
+try:
+    import uvloop  # Faster event loop for webhook mode; not available on Windows
+except ImportError:
+    uvloop = None
 from database import Database
 from drive_sync import DriveSync
 from drive_agent import DriveAgent
+from webhook_handler import start_webhook_server, stop_webhook_server, drive_channel_token
 from config import (
     TELEGRAM_TOKEN,
     CLAUDE_API_KEY,
     TAGS,
     SUPER_ADMIN_IDS,
+    SUPER_ADMIN_IDS_LIST,
     DAILY_CODE_LENGTH,
     PERIOD_TIMES,
     REMINDER_MINUTES_BEFORE,
     GOOGLE_DRIVE_ROOT_FOLDER_ID,
     SYNC_SCHEDULE,
+    DRIVE_SYNC_CONCURRENCY,
+    DRIVE_FILE_WORKERS,
+    CLAUDE_MAX_CONCURRENCY,
+    WEBHOOK_URL,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
 )
 
 # Enable logging
@@ -60,11 +88,297 @@ AWAITING_USER_ID, AWAITING_ROLE = range(4, 6)
 UPLOAD_MENU, PRIVACY_WARNING, SELECTING_UPLOAD_TO_DELETE = range(6, 9)
 RELIEF_ACTIVATION, SELECTING_RELIEF_REMINDERS = range(9, 11)
 
+# Seconds that today's entries are reused across /today, summary buttons and /ask
+TODAY_ENTRIES_CACHE_TTL = 30
+
+# Seconds a summary button waits for the /today precompute before streaming its own summary
+SUMMARY_PRECOMPUTE_WAIT = 3
+
+# /today menu options: (callback key, label)
+TODAY_MENU_OPTIONS = [
+    ("relief", "Today's Relief"),
+    ("weekly_bulletin", "Today@Weekly Bulletin"),
+    ("student_movement", "Today's Student Movement"),
+    ("this_week_ctss", "This Week@CTSS"),
+    ("event", "Today's Event"),
+]
+TODAY_MENU_LABELS = dict(TODAY_MENU_OPTIONS)
+
+# /today buttons are built once and reused across requests
+TODAY_FULL_SUMMARY_BUTTON = InlineKeyboardButton("📝 Full Summary (All)", callback_data="summary_ALL")
+
+
+@lru_cache(maxsize=256)
+def today_menu_button(key, count):
+    """/today menu button for a category; buttons are immutable, so equal labels reuse one instance."""
+    emoji = "📋" if count > 0 else "⚪️"
+    return InlineKeyboardButton(f"{emoji} {TODAY_MENU_LABELS[key]} ({count})", callback_data=f"summary_{key}")
+
+
+# Admin cancel buttons: callback_data -> (reply, whether to clear pending user_data)
+ADMIN_CANCEL_MESSAGES = {
+    "admin_add_cancel": ("👍 Add user cancelled.", True),
+    "admin_remove_cancel": ("👍 Remove user cancelled.", False),
+    "admin_promote_cancel": ("👍 Role change cancelled.", True),
+}
+
+# Confirm button label and shared (static) cancel button per admin action
+ADMIN_CONFIRM_LABELS = {"add": "✅ Confirm Add", "remove": "✅ Confirm Remove", "promote": "✅ Confirm Change"}
+ADMIN_CANCEL_BUTTONS = {
+    action: InlineKeyboardButton("❌ Cancel", callback_data=f"admin_{action}_cancel")
+    for action in ADMIN_CONFIRM_LABELS
+}
+
+
+def admin_confirm_keyboard(action, payload):
+    """Confirm/cancel keyboard for an admin action; confirm carries admin_<action>_confirm_<payload>."""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(ADMIN_CONFIRM_LABELS[action], callback_data=f"admin_{action}_confirm_{payload}")],
+        [ADMIN_CANCEL_BUTTONS[action]],
+    ])
+
+# Admin confirm/result messages (Markdown); fill with escape_md()'d values via .format()
+CONFIRM_ADD_TEMPLATE = (
+    "⚠️ *CONFIRM ADD USER*\n\n"
+    "You are about to add:\n\n"
+    "*Name:* {name}\n"
+    "*ID:* `{id}`\n"
+    "*Role:* VIEWER\n\n"
+    "Do you want to proceed?"
+)
+CONFIRM_REMOVE_TEMPLATE = (
+    "⚠️ *CONFIRM REMOVE USER*\n\n"
+    "You are about to remove:\n\n"
+    "*Name:* {name}\n"
+    "*ID:* `{id}`\n"
+    "*Role:* {role}\n\n"
+    "⚠️ This action cannot be undone.\n\n"
+    "Do you want to proceed?"
+)
+CONFIRM_PROMOTE_TEMPLATE = (
+    "⚠️ *CONFIRM ROLE CHANGE*\n\n"
+    "You are about to change:\n\n"
+    "*Name:* {name}\n"
+    "*ID:* `{id}`\n"
+    "*Current Role:* {old_role}\n"
+    "*New Role:* {new_role}\n\n"
+    "Do you want to proceed?"
+)
+USER_ADDED_TEMPLATE = (
+    "✅ *USER ADDED*\n\n"
+    "*Name:* {name}\n"
+    "*ID:* `{id}`\n"
+    "*Role:* VIEWER\n\n"
+    "They can now use /start to access the bot."
+)
+USER_REMOVED_TEMPLATE = (
+    "✅ *USER REMOVED*\n\n"
+    "*Name:* {name}\n"
+    "*ID:* `{id}`"
+)
+ROLE_CHANGED_TEMPLATE = (
+    "✅ *ROLE CHANGED*\n\n"
+    "*Name:* {name}\n"
+    "*ID:* `{id}`\n"
+    "*Previous Role:* {old_role}\n"
+    "*New Role:* {new_role}"
+)
+
+
+def escape_md(value):
+    """Escape user-supplied text (names, role names with underscores) for parse_mode="Markdown"."""
+    return escape_markdown(str(value), version=1)
+
+
+# Seconds the /add "not yet registered" check is trusted when the confirm button is pressed
+ADD_USER_PRECHECK_TTL = 30
+
+# Role groups for permission checks
+SUPERADMIN_ROLES = frozenset({"superadmin"})
+ADMIN_ROLES = frozenset({"admin", "superadmin"})
+RELIEF_ROLES = frozenset({"relief_member", "admin", "superadmin"})
+UPLOAD_ROLES = frozenset({"admin", "superadmin", "student_admin"})
+
+# Roles that can be assigned through /promote and /massupload
+ASSIGNABLE_ROLES = frozenset({"viewer", "relief_member", "admin", "student_admin"})
+
+# Display order of role groups in /list
+ROLE_ORDER = {"superadmin": 0, "admin": 1, "relief_member": 2, "student_admin": 3, "viewer": 4}
+
+# PDFs: a text layer longer than this is used as-is (no page OCR); embedded images with a side
+# under PDF_OCR_MIN_IMAGE_SIDE px (logos, crests, icons) are not sent for OCR
+PDF_TEXT_MIN_CHARS = 100
+PDF_OCR_MIN_IMAGE_SIDE = 150
+
+# Drive sync: entries written to the database per batch
+DRIVE_ENTRY_BATCH_SIZE = 100
+
+# Drive sync: error messages kept per sync (the total is still counted)
+SYNC_ERRORS_KEPT = 10
+
+
+class SyncErrors(deque):
+    """The latest SYNC_ERRORS_KEPT sync error messages, plus a count of every error recorded"""
+
+    def __init__(self):
+        super().__init__(maxlen=SYNC_ERRORS_KEPT)
+        self.total = 0
+
+    def append(self, error):
+        self.total += 1
+        super().append(error)
+
+    def extend(self, errors):
+        # Merging another SyncErrors carries over its full count, not just the messages it kept
+        self.total += getattr(errors, "total", len(errors))
+        super().extend(errors)
+
+    def summary(self):
+        """Kept messages joined for drive_sync_log, or None if there were no errors"""
+        return "; ".join(self) if self else None
+
+# Drive push channels: requested lifetime (Drive caps it at a week) and how early to renew
+DRIVE_WEBHOOK_TTL = timedelta(days=7)
+DRIVE_WEBHOOK_RENEW_BEFORE = timedelta(days=1)
+
+# Drive sends several notifications per edit: sync once the channel has been quiet this long (seconds)
+DRIVE_CHANGES_DEBOUNCE = 2.0
+
+# Drive change syncs that fail are retried this many times, DRIVE_CHANGES_RETRY_DELAY seconds apart (x attempt)
+DRIVE_CHANGES_MAX_ATTEMPTS = 3
+DRIVE_CHANGES_RETRY_DELAY = 60
+
+# Leading bytes of the file types we route on; Drive's mimeType is only a hint
+# (uploads often arrive as application/octet-stream, exported Docs are PDFs)
+MAGIC_MIME_TYPES = (
+    (b"%PDF", "application/pdf"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_mime_type(data, default=""):
+    """MIME type from the file's magic bytes, or default when the signature isn't one we know"""
+    for signature, mime_type in MAGIC_MIME_TYPES:
+        if data.startswith(signature):
+            return mime_type
+    return default
+
+
+# How a synced Drive file is read, by MIME type: exact type first, then its "major/" prefix
+DRIVE_MIME_HANDLERS = {
+    "application/pdf": "pdf",
+    "image/": "image",
+    "text/": "text",
+}
+
+
+def mime_handler(mime_type, default="binary"):
+    """DRIVE_MIME_HANDLERS entry for mime_type (one or two dict lookups), or default"""
+    handler = DRIVE_MIME_HANDLERS.get(mime_type)
+    if handler is None:
+        handler = DRIVE_MIME_HANDLERS.get(mime_type.partition("/")[0] + "/", default)
+    return handler
+
+
+def misdecoded(text):
+    """
+    True when more than 1 in 1000 characters of text are U+FFFD (and more than one in all), i.e. it
+    probably wasn't UTF-8; a single stray byte in a short file doesn't count
+    """
+    return text.count("\ufffd") > max(1, len(text) // 1000)
+
+
+def decode_text(data, strict=False):
+    """
+    Decode file bytes as UTF-8 text (BOM stripped) in one pass, replacing any invalid bytes.
+    Text that comes out mostly mangled (e.g. a Windows-1252 CSV saved by Excel) is re-decoded in
+    the encoding charset_normalizer detects.
+    With strict=True, returns None for content that isn't UTF-8 text (NUL bytes or invalid UTF-8).
+    """
+    if not strict:
+        text = data.decode("utf-8-sig", errors="replace")
+        if misdecoded(text):
+            best = detect_charset(bytes(data)).best()
+            if best is not None:
+                return str(best)
+        return text
+    if b"\x00" in data[:1024]:
+        return None
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return None
+
+# Streaming summaries: edit the Telegram message at most this often (flood limit is ~1 edit/sec)
+STREAM_EDIT_MIN_INTERVAL = 0.8
+STREAM_EDIT_MIN_CHARS = 24
+# Telegram rejects messages over 4096 characters; keep some room to spare
+TELEGRAM_TEXT_LIMIT = 4000
+
+
+def fit_message(header, text):
+    """header + text, with text cut short (ending in '…') so the message fits TELEGRAM_TEXT_LIMIT"""
+    room = TELEGRAM_TEXT_LIMIT - len(header)
+    if len(text) > room:
+        text = text[:room - 1] + "…"
+    return f"{header}{text}"
+
 # Initialize database
 db = Database()
 
-# Initialize Claude client
+# Initialize Claude clients (async client for calls made from the event loop)
 claude_client = anthropic.Anthropic(api_key=CLAUDE_API_KEY)
+async_claude_client = anthropic.AsyncAnthropic(api_key=CLAUDE_API_KEY)
+
+# Caps concurrent vision calls from the sync threads, which fan out per file and per PDF image
+claude_vision_slots = threading.BoundedSemaphore(CLAUDE_MAX_CONCURRENCY)
+
+
+def require_role(roles, denial="❌ You don't have permission to use this command.", denied_return=None):
+    """Only run a command handler for users whose role is in roles (a frozenset); the user is passed as user=."""
+
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+            # A cache miss queries the database: keep it off the event loop
+            user = await asyncio.to_thread(db.get_user, update.effective_user.id)
+            if not user or user["role"] not in roles:
+                await update.message.reply_text(denial)
+                return denied_return
+            return await handler(self, update, context, user=user)
+
+        return wrapper
+
+    return decorator
+
+
+def parse_command(message):
+    """
+    (command, args) for a message starting with /command or /command@this_bot, like CommandHandler
+    parses it; (None, []) for anything else, including commands addressed to another bot.
+    """
+    text = message.text or ""
+    if not text.startswith("/"):
+        return None, []
+    first, *args = text.split()
+    command, _, bot_username = first[1:].partition("@")
+    if bot_username and bot_username.lower() != (message.get_bot().username or "").lower():
+        return None, []
+    return command.lower(), args
+
+
+class CommandsFilter(filters.MessageFilter):
+    """Bot commands in the given set, matched with one parse and a set lookup"""
+
+    def __init__(self, commands):
+        self.commands = frozenset(commands)
+        super().__init__(name=f"CommandsFilter({len(self.commands)} commands)")
+
+    def filter(self, message):
+        return parse_command(message)[0] in self.commands
 
 
 class SchoolAdminBot:
@@ -73,6 +387,40 @@ class SchoolAdminBot:
         # Initialize Drive sync (optional, only if configured)
         self.drive_sync = None
         self.drive_agent = None  # Lazy-init on first /drive use
+        # Drive push notifications: one change sync at a time per channel, bursts coalesced
+        self._drive_change_locks = defaultdict(asyncio.Lock)
+        self._drive_change_deadlines = {}  # channel_id -> monotonic time the debounce window ends
+        self._drive_change_waiting = set()  # channels with a debounced sync pending
+        self._drive_change_counts = Counter()  # channel_id -> notifications in the current window
+        self._webhook_server = None
+        # Long-lived Drive sync workers, shared by /sync, scheduled syncs and change notifications.
+        # Threads (and the Drive connection each one keeps) are reused instead of rebuilt per sync,
+        # and the file pool caps downloads/analyses in flight across every concurrent sync.
+        self._drive_folder_pool = ThreadPoolExecutor(
+            max_workers=DRIVE_SYNC_CONCURRENCY, thread_name_prefix="drive-folder"
+        )
+        self._drive_file_pool = ThreadPoolExecutor(
+            max_workers=DRIVE_SYNC_CONCURRENCY * DRIVE_FILE_WORKERS, thread_name_prefix="drive-file"
+        )
+        # Claude vision calls for PDF pages/images, fanned out from the file workers; no more than
+        # claude_vision_slots lets run at once
+        self._claude_vision_pool = ThreadPoolExecutor(
+            max_workers=CLAUDE_MAX_CONCURRENCY, thread_name_prefix="claude-vision"
+        )
+        # Short-lived cache of today's entries: (date, fetched_at, entries)
+        self._entries_cache = None
+        self._entries_cache_generation = 0
+        self._entries_cache_lock = asyncio.Lock()
+        # /today category summaries, shared by every user who can see the same entries.
+        # Keyed by the category's entry IDs; both are dropped with the entries cache.
+        self._summary_cache = {}  # frozenset(entry ids) -> summary text
+        self._summary_pending = {}  # frozenset(entry ids) -> task generating that summary
+        # handle_admin_callback dispatch: callback prefix -> handler(payload, query, context, user)
+        self._admin_confirm_handlers = {
+            "admin_add_confirm_": self._confirm_add_user,
+            "admin_remove_confirm_": self._confirm_remove_user,
+            "admin_promote_confirm_": self._confirm_promote_user,
+        }
         try:
             if GOOGLE_DRIVE_ROOT_FOLDER_ID:
                 self.drive_sync = DriveSync()
@@ -80,52 +428,63 @@ class SchoolAdminBot:
         except Exception as e:
             logger.warning(f"Google Drive sync not available: {e}")
 
-    def analyze_image(self, image_data: bytes, category: str) -> str:
-        """Analyze image using Claude's vision API and extract text/information"""
+    def analyze_image(self, image_data: bytes, category: str) -> tuple:
+        """
+        Analyze image using Claude's vision API and extract text/information.
+        Returns (text, failed): on failure the text is a placeholder and failed is True.
+        """
         try:
             # Convert image to base64
             base64_image = base64.b64encode(image_data).decode('utf-8')
             
-            # Determine media type (assume JPEG/PNG for photos)
-            media_type = "image/png"
-            if image_data[:2] == b'\xff\xd8':
-                media_type = "image/jpeg"
-            
-            response = claude_client.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=1500,
-                timeout=30.0,  # 30 second timeout
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": media_type,
-                                    "data": base64_image,
+            # Determine media type (assume PNG when the signature isn't recognised)
+            media_type = sniff_mime_type(image_data, "image/png")
+            
+            with claude_vision_slots:
+                response = claude_client.messages.create(
+                    model="claude-haiku-4-5-20251001",
+                    max_tokens=1500,
+                    timeout=30.0,  # 30 second timeout
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "image",
+                                    "source": {
+                                        "type": "base64",
+                                        "media_type": media_type,
+                                        "data": base64_image,
+                                    },
                                 },
-                            },
-                            {
-                                "type": "text",
-                                "text": f"""Extract ALL text from this "{category}" image. Include names, classes, times, rooms. Be concise."""
-                            }
-                        ],
-                    }
-                ],
-            )
+                                {
+                                    "type": "text",
+                                    "text": f"""Extract ALL text from this "{category}" image. Include names, classes, times, rooms. Be concise."""
+                                }
+                            ],
+                        }
+                    ],
+                )
             
             extracted_text = response.content[0].text
             logger.info(f"Extracted text from image: {extracted_text[:200]}...")
-            return extracted_text
+            return extracted_text, False
             
         except Exception as e:
             logger.error(f"Image analysis error: {e}")
-            return f"[Image analysis failed: {str(e)}]"
+            return f"[Image analysis failed: {str(e)}]", True
+
+    def _analyze_images(self, images: list, category: str) -> list:
+        """analyze_image over several images at once; (text, failed) results come back in input order"""
+        if len(images) <= 1:
+            return [self.analyze_image(image, category) for image in images]
+        return list(self._claude_vision_pool.map(lambda image: self.analyze_image(image, category), images))
 
-    def analyze_pdf(self, pdf_data: bytes, category: str) -> str:
-        """Analyze PDF - extract text and OCR embedded images when possible"""
+    def analyze_pdf(self, pdf_data: bytes, category: str) -> tuple:
+        """
+        Analyze PDF - extract text and OCR embedded images when possible.
+        Returns (text, failed): failed is True if the PDF or any image in it couldn't be analysed.
+        """
         try:
             # Open PDF from bytes
             pdf_document = fitz.open(stream=pdf_data, filetype="pdf")
@@ -145,34 +504,42 @@ class SchoolAdminBot:
             
             # If we got text directly, keep it and also OCR embedded images (if any)
             combined_text = "\n\n".join(all_extracted_text)
-            image_texts = []
-            max_pages_for_ocr = min(len(pdf_document), 2)
-            for page_num in range(max_pages_for_ocr):
-                page = pdf_document[page_num]
-                images = page.get_images(full=True) or []
-                for img_index, img in enumerate(images):
-                    try:
-                        xref = img[0]
-                        base_image = pdf_document.extract_image(xref)
-                        img_bytes = base_image.get("image")
-                        if not img_bytes:
+            if has_text and len(combined_text) > PDF_TEXT_MIN_CHARS:
+                embedded_images = []  # (label, image bytes)
+                max_pages_for_ocr = min(len(pdf_document), 2)
+                for page_num in range(max_pages_for_ocr):
+                    page = pdf_document[page_num]
+                    images = page.get_images(full=True) or []
+                    for img_index, img in enumerate(images):
+                        # img = (xref, smask, width, height, ...): skip logos/icons before extracting
+                        if min(img[2], img[3]) < PDF_OCR_MIN_IMAGE_SIDE:
                             continue
-                        # OCR embedded image
-                        img_text = self.analyze_image(img_bytes, category)
-                        image_texts.append(f"--- Page {page_num + 1} Image {img_index + 1} ---\n{img_text}")
-                    except Exception as e:
-                        logger.debug(f"PDF image OCR error (page {page_num + 1}): {e}")
-
-            if has_text and len(combined_text) > 100:
+                        try:
+                            xref = img[0]
+                            base_image = pdf_document.extract_image(xref)
+                            img_bytes = base_image.get("image")
+                            if not img_bytes:
+                                continue
+                            embedded_images.append((f"Page {page_num + 1} Image {img_index + 1}", img_bytes))
+                        except Exception as e:
+                            logger.debug(f"PDF image extraction error (page {page_num + 1}): {e}")
+                # The images are extracted: free the document before the (slow) OCR calls
                 pdf_document.close()
+                
+                # OCR embedded images - a text-only PDF never reaches Claude
+                image_results = self._analyze_images([img for _, img in embedded_images], category)
+                image_texts = [
+                    f"--- {label} ---\n{img_text}"
+                    for (label, _), (img_text, _) in zip(embedded_images, image_results)
+                ]
                 if image_texts:
                     combined_text = combined_text + "\n\n" + "\n\n".join(image_texts)
                 logger.info(f"Extracted text directly from PDF ({max_pages} pages): {combined_text[:200]}...")
-                return combined_text
+                return combined_text, any(failed for _, failed in image_results)
             
             # Otherwise, fall back to image analysis (for scanned PDFs)
             # Only analyze first 2 pages to avoid timeout
-            all_extracted_text = []
+            page_images = []
             max_pages_for_ocr = min(len(pdf_document), 2)
             
             for page_num in range(max_pages_for_ocr):
@@ -183,21 +550,24 @@ class SchoolAdminBot:
                 pix = page.get_pixmap(matrix=mat)
                 
                 # Convert to PNG bytes
-                img_bytes = pix.tobytes("png")
-                
-                # Analyze this page image
-                page_text = self.analyze_image(img_bytes, category)
-                all_extracted_text.append(f"--- Page {page_num + 1} ---\n{page_text}")
+                page_images.append(pix.tobytes("png"))
             
             pdf_document.close()
             
+            # Analyze the page images together
+            page_results = self._analyze_images(page_images, category)
+            all_extracted_text = [
+                f"--- Page {page_num + 1} ---\n{page_text}"
+                for page_num, (page_text, _) in enumerate(page_results)
+            ]
+            
             combined_text = "\n\n".join(all_extracted_text)
             logger.info(f"Extracted text from PDF via OCR ({max_pages_for_ocr} pages): {combined_text[:200]}...")
-            return combined_text
+            return combined_text, any(failed for _, failed in page_results)
             
         except Exception as e:
             logger.error(f"PDF analysis error: {e}")
-            return f"[PDF analysis failed: {str(e)}]"
+            return f"[PDF analysis failed: {str(e)}]", True
 
     def parse_relief_data(self, extracted_text: str) -> list:
         """
@@ -403,8 +773,8 @@ Text to parse:
         # Get pending reminders that are due
         pending = db.get_pending_relief_reminders(current_time)
         
-        for reminder in pending:
-            await self.send_relief_reminder(context, reminder)
+        # Reminders go to different teachers, so send them concurrently
+        await asyncio.gather(*[self.send_relief_reminder(context, reminder) for reminder in pending])
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command - register user"""
@@ -465,7 +835,7 @@ Text to parse:
         elif role == "relief_member":
             help_text += "*Additional Help:*\n"
             help_text += "/helprelief - Relief member specific commands\n"
-        elif role in ["admin", "superadmin"]:
+        elif role in ADMIN_ROLES:
             help_text += "*Additional Help:*\n"
             help_text += "/helprelief - Relief management commands\n"
             help_text += "/helpadmin - Admin and management commands\n"
@@ -545,7 +915,7 @@ Text to parse:
                 return
 
             # Show help to all users, but indicate if they don't have access
-            has_access = user["role"] in ["relief_member", "admin", "superadmin"]
+            has_access = user["role"] in RELIEF_ROLES
             
             if not has_access:
                 help_text = "🔄 *RELIEF HELP - RELIEF MANAGEMENT*\n\n"
@@ -574,7 +944,7 @@ Text to parse:
             help_text += "*General Commands:*\n"
             help_text += "/help - View general help commands\n"
             
-            if user["role"] in ["admin", "superadmin"]:
+            if user["role"] in ADMIN_ROLES:
                 help_text += "/helpadmin - View admin management commands\n"
 
             try:
@@ -605,7 +975,7 @@ Text to parse:
                 return
 
             # Show help to all users, but indicate if they don't have access
-            has_access = user["role"] in ["admin", "superadmin"]
+            has_access = user["role"] in ADMIN_ROLES
             
             if not has_access:
                 help_text = "🔧 *ADMIN HELP - MANAGEMENT COMMANDS*\n\n"
@@ -715,7 +1085,8 @@ Text to parse:
             help_text += "  • Available roles: viewer, relief\\_member, admin, superadmin\n"
             help_text += "/listfolders - View all folders and their access configuration\n"
             help_text += "  • Relief Committee 6pm, Relief Timetable/Weekly Bulletin 7:45am\n"
-            help_text += "  • Today's Event 7am (PDFs: dd\\_mm\\_yy\\_eventname)\n\n"
+            help_text += "  • Today's Event 7am (PDFs: dd\\_mm\\_yy\\_eventname)\n"
+            help_text += "/registerwebhook - Sync Drive changes as they happen (needs WEBHOOK\\_URL)\n\n"
             help_text += "*Testing & Debugging:*\n"
             help_text += "/assume [role] - Assume a different role for testing\n"
             help_text += "  • Roles: viewer, relief\\_member, admin, student\\_admin\n"
@@ -746,14 +1117,10 @@ Text to parse:
             except:
                 pass
 
-    async def upload_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_role(UPLOAD_ROLES, denial="❌ You don't have upload permissions.", denied_return=ConversationHandler.END)
+    async def upload_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
         """Start upload process - show initial menu"""
         user_id = update.effective_user.id
-        user = db.get_user(user_id)
-
-        if not user or user["role"] not in ["admin", "superadmin", "student_admin"]:
-            await update.message.reply_text("❌ You don't have upload permissions.")
-            return ConversationHandler.END
 
         # Check user's uploads count today (student_admin sees Student Movement remove option)
         is_student_admin = user["role"] == "student_admin"
@@ -880,6 +1247,7 @@ Text to parse:
         
         elif choice == "confirm_remove_student_movement":
             deleted_count = db.delete_student_movement_entries_today()
+            self._invalidate_entries_cache()
             await query.edit_message_text(f"✅ Removed *{deleted_count}* Student Movement entry/entries.", parse_mode="Markdown")
             context.user_data.clear()
             return ConversationHandler.END
@@ -937,6 +1305,7 @@ Text to parse:
         
         elif choice == "confirm_remove_all":
             deleted_count = db.delete_all_user_uploads_today(user_id)
+            self._invalidate_entries_cache()
             await query.edit_message_text(f"✅ Removed *{deleted_count}* upload(s).", parse_mode="Markdown")
             context.user_data.clear()
             return ConversationHandler.END
@@ -998,7 +1367,7 @@ Text to parse:
             return ConversationHandler.END
         
         elif choice.startswith("delete_entry_"):
-            entry_id = int(choice.replace("delete_entry_", ""))
+            entry_id = int(choice.removeprefix("delete_entry_"))
             
             # Confirm before deleting
             context.user_data["pending_delete_id"] = entry_id
@@ -1027,6 +1396,7 @@ Text to parse:
                 else:
                     deleted = db.delete_entry_by_id(entry_id, user_id)
                 if deleted:
+                    self._invalidate_entries_cache()
                     await query.edit_message_text("✅ Entry deleted successfully.")
                 else:
                     await query.edit_message_text("❌ Could not delete entry. It may have already been removed.")
@@ -1107,7 +1477,7 @@ Text to parse:
 
             # Analyze image with Claude Vision
             await update.message.reply_text("🔍 Analyzing image content...")
-            extracted_text = self.analyze_image(bytes(image_bytes), selected_tag)
+            extracted_text, _ = await asyncio.to_thread(self.analyze_image, image_bytes, selected_tag)
 
             content_data = {
                 "type": "photo",
@@ -1131,19 +1501,15 @@ Text to parse:
             # Check if it's a PDF and analyze it
             if file_name.lower().endswith('.pdf') or doc_bytes[:4] == b'%PDF':
                 await update.message.reply_text("🔍 Analyzing PDF content... This may take a few seconds.")
-                extracted_text = self.analyze_pdf(bytes(doc_bytes), selected_tag)
+                extracted_text, _ = await asyncio.to_thread(self.analyze_pdf, doc_bytes, selected_tag)
             # Check if it's an image document
             elif file_name.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')):
                 await update.message.reply_text("🔍 Analyzing image content...")
-                extracted_text = self.analyze_image(bytes(doc_bytes), selected_tag)
+                extracted_text, _ = await asyncio.to_thread(self.analyze_image, doc_bytes, selected_tag)
             # Check if it's a text file
             elif file_name.lower().endswith(('.txt', '.csv', '.text')):
-                try:
-                    extracted_text = doc_bytes.decode('utf-8')
-                    logger.info(f"Read text file: {len(extracted_text)} chars")
-                except UnicodeDecodeError:
-                    extracted_text = doc_bytes.decode('latin-1')
-                    logger.info(f"Read text file (latin-1): {len(extracted_text)} chars")
+                extracted_text = decode_text(doc_bytes)
+                logger.info(f"Read text file: {len(extracted_text)} chars")
 
             content_data = {
                 "type": "document",
@@ -1168,17 +1534,18 @@ Text to parse:
         
         # Save to database
         db.add_entry(user_id, selected_tag, content_data)
+        self._invalidate_entries_cache()
 
         # If this is a RELIEF upload and user is admin/superadmin, offer to set up reminders
         if selected_tag == "RELIEF":
             user = db.get_user(user_id)
-            if user and user["role"] in ["admin", "superadmin"]:
+            if user and user["role"] in ADMIN_ROLES:
                 try:
                     await update.message.reply_text("🔍 Parsing relief information for reminders...")
                     
                     # Parse relief data from extracted text
                     logger.info(f"Parsing relief data from text ({len(extracted_text)} chars)")
-                    relief_data = self.parse_relief_data(extracted_text)
+                    relief_data = await asyncio.to_thread(self.parse_relief_data, extracted_text)
                     logger.info(f"Parsed relief data: {relief_data}")
                     
                     if relief_data:
@@ -1393,7 +1760,7 @@ Text to parse:
             return ConversationHandler.END
             
         elif action.startswith("relief_toggle_"):
-            reminder_id = int(action.replace("relief_toggle_", ""))
+            reminder_id = int(action.removeprefix("relief_toggle_"))
             
             # Toggle the reminder activation
             reminder = db.get_relief_reminder_by_id(reminder_id)
@@ -1419,15 +1786,9 @@ Text to parse:
         
         return SELECTING_RELIEF_REMINDERS
 
-    async def relief_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_role(RELIEF_ROLES, denial="❌ This command is for relief members and admins only.")
+    async def relief_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
         """Show current relief reminder status"""
-        user_id = update.effective_user.id
-        user = db.get_user(user_id)
-        
-        if not user or user["role"] not in ["relief_member", "admin", "superadmin"]:
-            await update.message.reply_text("❌ This command is for relief members and admins only.")
-            return
-        
         reminders = db.get_today_relief_reminders()
         
         if not reminders:
@@ -1438,7 +1799,7 @@ Text to parse:
             )
             return
         
-        message = "📋 *Today's Relief Reminders:*\n\n"
+        parts = ["📋 *Today's Relief Reminders:*\n\n"]
         
         active_count = 0
         for r in reminders:
@@ -1449,15 +1810,16 @@ Text to parse:
             if r["activated"]:
                 active_count += 1
             
-            message += f"{status} [{matched}] {r['teacher_name']} - P{r['period']} ({r['relief_time']}){sent}\n"
+            parts.append(f"{status} [{matched}] {r['teacher_name']} - P{r['period']} ({r['relief_time']}){sent}\n")
             if r['class_info']:
-                message += f"   └ {r['class_info']}"
+                parts.append(f"   └ {r['class_info']}")
                 if r['room']:
-                    message += f" @ {r['room']}"
-                message += "\n"
+                    parts.append(f" @ {r['room']}")
+                parts.append("\n")
         
-        message += f"\n*Active:* {active_count}/{len(reminders)}\n"
-        message += f"_✓ = matched to user, ? = not matched_"
+        parts.append(f"\n*Active:* {active_count}/{len(reminders)}\n")
+        parts.append("_✓ = matched to user, ? = not matched_")
+        message = "".join(parts)
         
         # Add action buttons
         keyboard = [
@@ -1489,15 +1851,9 @@ Text to parse:
                 f"❌ Deactivated {deactivated} relief reminders.",
             )
 
-    async def cancel_relief(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_role(RELIEF_ROLES, denial="❌ This command is for relief members and admins only.")
+    async def cancel_relief(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
         """Cancel all relief reminders for today"""
-        user_id = update.effective_user.id
-        user = db.get_user(user_id)
-        
-        if not user or user["role"] not in ["relief_member", "admin", "superadmin"]:
-            await update.message.reply_text("❌ This command is for relief members and admins only.")
-            return
-        
         deactivated = db.deactivate_all_reminders_today()
         
         await update.message.reply_text(
@@ -1508,16 +1864,10 @@ Text to parse:
 
     # ===== GOOGLE DRIVE SYNC =====
 
-    async def set_folder(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_role(SUPERADMIN_ROLES, denial="❌ Only super admins can configure folders.")
+    async def set_folder(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
         """Set folder-role access mapping (superadmin only)"""
         try:
-            user_id = update.effective_user.id
-            user = db.get_user(user_id)
-            
-            if not user or user["role"] != "superadmin":
-                await update.message.reply_text("❌ Only super admins can configure folders.")
-                return
-            
             if not self.drive_sync:
                 await update.message.reply_text("❌ Google Drive is not configured.")
                 return
@@ -1573,7 +1923,7 @@ Text to parse:
                 return
             
             # Find folder in Drive
-            folder = self.drive_sync.get_folder_by_name(folder_name)
+            folder = await asyncio.to_thread(self.drive_sync.get_folder_by_name, folder_name)
             if not folder:
                 await update.message.reply_text(
                     f"❌ Folder '{folder_name}' not found in Google Drive.\n\n"
@@ -1610,53 +1960,47 @@ Text to parse:
                 f"• Google Drive API access"
             )
 
-    async def list_folders(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_role(ADMIN_ROLES, denial="❌ This command is for admins only.")
+    async def list_folders(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
         """List all folders and their role access"""
         try:
-            user_id = update.effective_user.id
-            user = db.get_user(user_id)
-            
-            if not user or user["role"] not in ["admin", "superadmin"]:
-                await update.message.reply_text("❌ This command is for admins only.")
-                return
-            
             if not self.drive_sync:
                 await update.message.reply_text("❌ Google Drive is not configured.")
                 return
             
             # Get folders from Drive
-            drive_folders = self.drive_sync.list_folders()
-            db_folders = db.get_all_folders()
+            drive_folders = await asyncio.to_thread(self.drive_sync.list_folders)
             
             if not drive_folders:
                 await update.message.reply_text("📁 No folders found in Google Drive.")
                 return
             
+            # Configured folders with their roles, in one query
+            db_folders = await asyncio.to_thread(
+                db.get_folders_with_roles_by_drive_ids, [folder['id'] for folder in drive_folders]
+            )
+            
             # Use HTML parse mode to avoid Markdown parsing issues
-            message = "📁 <b>Google Drive Folders:</b>\n\n"
+            parts = ["📁 <b>Google Drive Folders:</b>\n\n"]
             
             for folder in drive_folders:
                 folder_name = folder['name']
                 # Escape HTML special characters in folder name
-                folder_name_escaped = folder_name.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+                folder_name_escaped = html.escape(folder_name, quote=False)
                 
                 # Check if configured in database
-                db_folder = db.get_folder_by_drive_id(folder['id'])
+                db_folder = db_folders.get(folder['id'])
                 
                 if db_folder:
-                    folder_with_roles = db.get_folder_with_roles(db_folder['id'])
-                    roles = folder_with_roles.get('roles', [])
+                    roles = db_folder['roles']
                     if roles:
-                        message += f"✅ <b>{folder_name_escaped}</b>\n"
-                        message += f"   └ Roles: {', '.join(roles)}\n\n"
+                        parts.append(f"✅ <b>{folder_name_escaped}</b>\n   └ Roles: {', '.join(roles)}\n\n")
                     else:
-                        message += f"⚠️ <b>{folder_name_escaped}</b>\n"
-                        message += f"   └ No roles configured\n\n"
+                        parts.append(f"⚠️ <b>{folder_name_escaped}</b>\n   └ No roles configured\n\n")
                 else:
-                    message += f"❌ <b>{folder_name_escaped}</b>\n"
-                    message += f"   └ Not configured (use /setfolder)\n\n"
+                    parts.append(f"❌ <b>{folder_name_escaped}</b>\n   └ Not configured (use /setfolder)\n\n")
             
-            await update.message.reply_text(message, parse_mode="HTML")
+            await update.message.reply_text("".join(parts), parse_mode="HTML")
         except Exception as e:
             logger.error(f"Error in list_folders command: {e}", exc_info=True)
             await update.message.reply_text(
@@ -1682,7 +2026,7 @@ Text to parse:
         await update.message.reply_text("🔄 Syncing files from Google Drive...")
         
         # Check role access (student_admin syncs Student Movement via Telegram only, not Drive)
-        if user["role"] not in ["relief_member", "admin", "superadmin"]:
+        if user["role"] not in RELIEF_ROLES:
             await update.message.reply_text(
                 f"❌ Only relief_member, admin, and superadmin can sync Google Drive folders.\n"
                 f"Viewers and student_admin can only query data."
@@ -1690,12 +2034,12 @@ Text to parse:
             return
         
         # Get folders from database
-        all_folders = db.get_all_folders()
+        all_folders = await asyncio.to_thread(db.get_all_folders)
         
         # If no folders in database, auto-discover from Google Drive
         if not all_folders:
             await update.message.reply_text("📁 Discovering folders from Google Drive...")
-            drive_folders = self.drive_sync.list_folders()
+            drive_folders = await asyncio.to_thread(self.drive_sync.list_folders)
             
             if not drive_folders:
                 await update.message.reply_text("❌ No folders found in Google Drive.")
@@ -1703,13 +2047,14 @@ Text to parse:
             
             # Auto-add all discovered folders to database
             for drive_folder in drive_folders:
-                db.add_or_update_drive_folder(
+                await asyncio.to_thread(
+                    db.add_or_update_drive_folder,
                     folder_name=drive_folder['name'],
                     drive_folder_id=drive_folder['id'],
                     parent_folder_id=GOOGLE_DRIVE_ROOT_FOLDER_ID
                 )
             
-            all_folders = db.get_all_folders()
+            all_folders = await asyncio.to_thread(db.get_all_folders)
             await update.message.reply_text(
                 f"✅ Discovered {len(all_folders)} folders. Starting sync...\n"
                 f"💡 Use /setfolder to configure role access if needed."
@@ -1718,133 +2063,45 @@ Text to parse:
         # All folders except Student Movement (Telegram-only) are synced from Drive
         accessible_folders = [f for f in all_folders if f['folder_name'] != 'Student Movement']
         
+        # One batched Drive request lists every folder; downloads still happen per file
+        files_by_folder = await asyncio.to_thread(
+            self.drive_sync.list_files_in_folders,
+            [f['drive_folder_id'] for f in accessible_folders],
+        )
+        
+        semaphore = asyncio.Semaphore(DRIVE_SYNC_CONCURRENCY)
+        
+        async def _sync_one(folder):
+            async with semaphore:
+                await update.message.reply_text(f"📂 Processing folder: {folder['folder_name']}...")
+                result = await asyncio.to_thread(
+                    self._sync_drive_folder, folder, user_id, files_by_folder.get(folder['drive_folder_id'])
+                )
+                if result[3]:
+                    await update.message.reply_text(result[3])
+                return result
+        
+        # Folders are independent, so sync them concurrently (bounded by the semaphore)
+        results = await asyncio.gather(
+            *[_sync_one(folder) for folder in accessible_folders],
+            return_exceptions=True,
+        )
+        
         total_files = 0
         total_processed = 0
-        errors = []
+        errors = SyncErrors()
         
-        for folder in accessible_folders:
-            try:
-                folder_name = folder['folder_name']
-                drive_folder_id = folder['drive_folder_id']
-                
-                await update.message.reply_text(f"📂 Processing folder: {folder_name}...")
-                
-                # List files in folder
-                files = self.drive_sync.list_files_in_folder(drive_folder_id)
-                
-                # Today's Event: only PDFs named dd_mm_yy_eventname.pdf where date = today
-                if folder_name == "Today's Event" and files:
-                    today = get_singapore_now().date()
-                    filtered = []
-                    for f in files:
-                        is_match, event_name = self._is_todays_event_pdf(f.get('name', ''))
-                        if is_match:
-                            f['_event_name'] = event_name
-                            filtered.append(f)
-                    files = filtered
-                    if not files:
-                        await update.message.reply_text(
-                            f"📂 {folder_name}: No PDFs with today's date ({today.strftime('%d/%m/%Y')}) found. Skipping."
-                        )
-                        continue
-                
-                if not files:
-                    continue
-                
-                files_synced = len(files)
-                files_processed_count = 0
-                
-                for file in files:
-                    try:
-                        # Get file content
-                        file_content = self.drive_sync.get_file_content(file)
-                        
-                        if not file_content:
-                            errors.append(f"{file['name']}: Failed to download")
-                            continue
-                        
-                        # Detect category
-                        category = self.drive_sync.detect_file_category(file['name'], folder_name)
-                        
-                        # Process based on file type
-                        extracted_text = ""
-                        file_type = "document"
-                        
-                        if file.get('mimeType', '').startswith('image/'):
-                            # Image file
-                            extracted_text = self.analyze_image(file_content, category)
-                            file_type = "photo"
-                        elif file.get('mimeType', '') == 'application/pdf' or file['name'].lower().endswith('.pdf'):
-                            # PDF file
-                            extracted_text = self.analyze_pdf(file_content, category)
-                            file_type = "document"
-                        elif file.get('mimeType', '') == 'application/vnd.google-apps.spreadsheet':
-                            # Google Sheets exported as CSV - read directly
-                            try:
-                                extracted_text = file_content.decode('utf-8')
-                                logger.info(f"Read Google Sheets as CSV: {len(extracted_text)} chars")
-                            except:
-                                extracted_text = file_content.decode('latin-1')
-                            file_type = "document"
-                        elif file.get('mimeType', '').startswith('text/'):
-                            # Text file (including CSV)
-                            try:
-                                extracted_text = file_content.decode('utf-8')
-                            except:
-                                extracted_text = file_content.decode('latin-1')
-                            file_type = "document"
-                        else:
-                            # Try to extract text from PDF (if exported from Google Docs)
-                            if file_content[:4] == b'%PDF':
-                                extracted_text = self.analyze_pdf(file_content, category)
-                            else:
-                                # Try as text
-                                try:
-                                    extracted_text = file_content.decode('utf-8')
-                                except:
-                                    extracted_text = f"[Binary file: {file['name']}]"
-                        
-                        # Save to database (upsert by drive_file_id: one entry per file per day)
-                        content_data = {
-                            "type": file_type,
-                            "file_name": file['name'],
-                            "extracted_text": extracted_text,
-                            "source": "google_drive",
-                            "folder": folder_name,
-                            "drive_folder_id": drive_folder_id,  # Store for access control
-                            "drive_file_id": file.get('id'),  # For upsert
-                        }
-                        if folder_name == "Today's Event" and file.get('_event_name'):
-                            content_data["event_name"] = file['_event_name']
-                        if content_data.get("drive_file_id"):
-                            db.add_or_update_drive_entry(user_id, category, content_data)
-                        else:
-                            db.add_entry(user_id, category, content_data)
-                        files_processed_count += 1
-                        
-                    except Exception as e:
-                        logger.error(f"Error processing file {file['name']}: {e}")
-                        errors.append(f"{file['name']}: {str(e)}")
-                
-                # Update sync time
-                db.update_folder_sync_time(folder['id'])
-                
-                # Log sync
-                error_str = "; ".join(errors[-10:]) if errors else None  # Last 10 errors
-                db.log_sync(
-                    folder_id=folder['id'],
-                    files_synced=files_synced,
-                    files_processed=files_processed_count,
-                    errors=error_str,
-                    synced_by=user_id
-                )
-                
-                total_files += files_synced
-                total_processed += files_processed_count
-                
-            except Exception as e:
-                logger.error(f"Error syncing folder {folder.get('folder_name', 'unknown')}: {e}")
-                errors.append(f"Folder {folder.get('folder_name', 'unknown')}: {str(e)}")
+        for folder, result in zip(accessible_folders, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Error syncing folder {folder.get('folder_name', 'unknown')}: {result}")
+                errors.append(f"Folder {folder.get('folder_name', 'unknown')}: {str(result)}")
+                continue
+            files_synced, files_processed_count, folder_errors, _ = result
+            total_files += files_synced
+            total_processed += files_processed_count
+            errors.extend(folder_errors)
+        
+        self._invalidate_entries_cache()
         
         # Report results
         message = f"✅ *Sync Complete!*\n\n"
@@ -1853,24 +2110,252 @@ Text to parse:
         message += f"*Files processed:* {total_processed}\n"
         
         if errors:
-            message += f"\n*Errors:* {len(errors)}\n"
-            if len(errors) <= 5:
-                message += "\n".join([f"• {e}" for e in errors])
-            else:
-                message += "\n".join([f"• {e}" for e in errors[:5]])
-                message += f"\n... and {len(errors) - 5} more"
+            message += f"\n*Errors:* {errors.total}\n"
+            message += "\n".join([f"• {e}" for e in islice(errors, 5)])
+            if errors.total > 5:
+                message += f"\n... and {errors.total - 5} more"
         
         await update.message.reply_text(message, parse_mode="Markdown")
 
-    async def drive_folder_info(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Show connected Google Drive folder info"""
-        user_id = update.effective_user.id
-        user = db.get_user(user_id)
+    def _sync_drive_folder(self, folder, synced_by, files=None):
+        """
+        Download, analyse and store every file in one Drive folder.
+        Blocking - /sync runs it in a worker thread per folder.
+        files: listing already fetched by a batch request (listed here if None).
+        Returns (files_synced, files_processed, errors, skip_notice).
+        """
+        folder_name = folder['folder_name']
+        drive_folder_id = folder['drive_folder_id']
+        errors = SyncErrors()
         
-        if not user or user["role"] not in ["admin", "superadmin"]:
-            await update.message.reply_text("❌ This command is for admins only.")
-            return
+        # List files in folder
+        if files is None:
+            files = self.drive_sync.list_files_in_folder(drive_folder_id)
+        
+        # Today's Event: only PDFs named dd_mm_yy_eventname.pdf where date = today
+        if folder_name == "Today's Event" and files:
+            today = get_singapore_now().date()
+            files = self._filter_todays_event_files(files)
+            if not files:
+                return 0, 0, errors, (
+                    f"📂 {folder_name}: No PDFs with today's date ({today.strftime('%d/%m/%Y')}) found. Skipping."
+                )
+        
+        if not files:
+            return 0, 0, errors, None
+        
+        files_synced = len(files)
+        files_processed_count, file_errors = self._process_drive_files(
+            files, folder_name, drive_folder_id, "google_drive", synced_by
+        )
+        errors.extend(file_errors)
+        
+        # Update sync time and log the sync
+        db.finalize_folder_sync(
+            folder_id=folder['id'],
+            files_synced=files_synced,
+            files_processed=files_processed_count,
+            errors=errors.summary(),
+            synced_by=synced_by,
+            errors_total=errors.total,
+        )
+        
+        return files_synced, files_processed_count, errors, None
+
+    def _process_drive_files(self, files, folder_name, drive_folder_id, source, synced_by):
+        """
+        Download and analyse files concurrently on the shared file pool, then store
+        the resulting entries in batches of DRIVE_ENTRY_BATCH_SIZE.
+        Files unchanged since their last analysis (same md5/modifiedTime) reuse the cached
+        result without being downloaded.
+        Returns (files_processed, errors as SyncErrors).
+        """
+        files_processed_count = 0
+        errors = SyncErrors()
+        pending = []
+        new_cache_rows = []
         
+        def flush():
+            nonlocal files_processed_count
+            try:
+                db.add_or_update_drive_entries(synced_by, pending)
+                files_processed_count += len(pending)
+            except Exception as e:
+                logger.error(f"Error saving {len(pending)} entries from {folder_name}: {e}")
+                errors.append(f"Saving {len(pending)} file(s): {str(e)}")
+            pending.clear()
+            # Cache the analyses batch by batch: a run that dies part-way is replayed from the
+            # same page token, and then only re-analyses the files it hadn't reached
+            if new_cache_rows:
+                try:
+                    db.save_drive_file_cache(new_cache_rows)
+                except Exception as e:
+                    logger.error(f"Error caching analyses for {folder_name}: {e}")
+                new_cache_rows.clear()
+        
+        # Shortcut targets in one batch request: gives shortcuts a version for the cache check
+        # and saves get_file_content two files.get calls per shortcut
+        self.drive_sync.attach_shortcut_targets(files)
+        
+        cache = db.get_drive_file_cache([f['id'] for f in files if f.get('id')])
+        to_analyse = []
+        reused_ids = []
+        for file in files:
+            cached = cache.get(file.get('id'))
+            version = DriveSync.file_version(file)
+            if cached and version and cached['version'] == version:
+                pending.append(self._cached_drive_entry(cached, file, folder_name, drive_folder_id, source))
+                reused_ids.append(file['id'])
+            else:
+                to_analyse.append(file)
+        if reused_ids:
+            logger.info(f"{folder_name}: {len(reused_ids)} unchanged file(s) reused from cache")
+            db.touch_drive_file_cache(reused_ids)
+        
+        # Remember shortcut targets so edits to the target file (outside this folder) trigger a re-sync
+        db.save_shortcut_targets([
+            (file['id'], file['name'], file['shortcutDetails']['targetId'],
+             file.get('_target', {}).get('name'), drive_folder_id)
+            for file in files
+            if (file.get('shortcutDetails') or {}).get('targetId')
+        ])
+        
+        futures = {
+            self._drive_file_pool.submit(
+                self._process_drive_file, file, folder_name, drive_folder_id, source, cache.get(file.get('id'))
+            ): file
+            for file in to_analyse
+        }
+        try:
+            for future in as_completed(futures):
+                file = futures[future]
+                try:
+                    entry, error = future.result()
+                except Exception as e:
+                    logger.error(f"Error processing file {file['name']}: {e}")
+                    entry, error = None, f"{file['name']}: {str(e)}"
+                if error:
+                    errors.append(error)
+                    continue
+                pending.append(entry)
+                version = DriveSync.file_version(file)
+                category, content_data = entry
+                # Failed analyses are retried next sync rather than cached
+                if version and file.get('id') and not file.get('_analysis_failed'):
+                    new_cache_rows.append((file['id'], version, file.get('_content_hash'), category, content_data))
+                if len(pending) >= DRIVE_ENTRY_BATCH_SIZE:
+                    flush()
+        finally:
+            # If a flush fails, don't leave this folder's files running in the shared pool
+            wait(futures)
+        
+        if pending:
+            flush()
+        
+        return files_processed_count, errors
+
+    def _cached_drive_entry(self, cached, file, folder_name, drive_folder_id, source):
+        """
+        (category, content_data) for a file from its drive_file_cache row, with this sync's details.
+        Only the analysis is reused: the category follows the file's current name and folder.
+        """
+        content_data = dict(cached['content_data'])
+        content_data.update(
+            file_name=file['name'],
+            source=source,
+            folder=folder_name,
+            drive_folder_id=drive_folder_id,
+        )
+        if folder_name == "Today's Event" and file.get('_event_name'):
+            content_data["event_name"] = file['_event_name']
+        return self.drive_sync.detect_file_category(file['name'], folder_name), content_data
+
+    def _process_drive_file(self, file, folder_name, drive_folder_id, source, cached=None):
+        """
+        Download and analyse one Drive file.
+        cached is the file's drive_file_cache row (for an older version), if any: when the downloaded
+        bytes hash the same, its analysis is reused. The hash is left in file['_content_hash'], and
+        file['_analysis_failed'] is set when Claude couldn't analyse a PDF or image (so it isn't cached).
+        Returns ((category, content_data), None), or (None, error) if the download failed.
+        """
+        file_name = file['name']
+        # A shortcut is processed as its target (e.g. a shortcut to a Sheet is exported as CSV)
+        target = file.get('_target', file)
+        drive_mime_type = target.get('mimeType', '')
+        
+        # Detect category
+        category = self.drive_sync.detect_file_category(file_name, folder_name)
+        file_type = "document"
+        
+        extracted_text = None
+        if drive_mime_type == 'application/vnd.google-apps.spreadsheet':
+            # Google Sheets exported as CSV - decoded while it downloads
+            extracted_text = self.drive_sync.export_sheet_as_text(target['id'])
+            if extracted_text is None:
+                return None, f"{file_name}: Failed to download"
+            logger.info(f"Read Google Sheets as CSV: {len(extracted_text)} chars")
+        elif drive_mime_type.startswith('text/'):
+            # Plain text/CSV - also decoded while it downloads
+            downloaded = self.drive_sync.download_text_file(target['id'])
+            if downloaded is None:
+                return None, f"{file_name}: Failed to download"
+            text, head = downloaded
+            # ...unless its first bytes show it's really a PDF or image, or it isn't UTF-8: then it's
+            # fetched as bytes below
+            if not sniff_mime_type(head) and not misdecoded(text):
+                extracted_text = text
+        
+        if extracted_text is None:
+            # Get file content
+            file_content = self.drive_sync.get_file_content(file)
+            
+            if not file_content:
+                return None, f"{file_name}: Failed to download"
+            
+            # New version, same bytes (e.g. a Google Doc renamed or re-shared): nothing to re-analyse
+            file['_content_hash'] = hashlib.sha256(file_content).hexdigest()
+            if cached and cached['content_hash'] == file['_content_hash']:
+                logger.info(f"{file_name}: content unchanged, reusing cached analysis")
+                return self._cached_drive_entry(cached, file, folder_name, drive_folder_id, source), None
+            
+            # Process based on file type: the content's signature wins over Drive's mimeType
+            mime_type = sniff_mime_type(file_content, drive_mime_type)
+            handler = mime_handler(mime_type)
+            if mime_type == drive_mime_type and file_name.lower().endswith('.pdf'):
+                # No signature to go on - trust the extension
+                handler = "pdf"
+            
+            if handler == "pdf":
+                # PDF file (including Google Docs/Slides exported as PDF)
+                extracted_text, file['_analysis_failed'] = self.analyze_pdf(file_content, category)
+            elif handler == "image":
+                # Image file
+                extracted_text, file['_analysis_failed'] = self.analyze_image(file_content, category)
+                file_type = "photo"
+            elif handler == "text":
+                # Text file (including CSV)
+                extracted_text = decode_text(file_content)
+            else:
+                # Try as text
+                extracted_text = decode_text(file_content, strict=True) or f"[Binary file: {file_name}]"
+        
+        # Stored by _process_drive_files (upsert by drive_file_id: one entry per file per day)
+        content_data = {
+            "type": file_type,
+            "file_name": file_name,
+            "extracted_text": extracted_text,
+            "source": source,
+            "folder": folder_name,
+            "drive_folder_id": drive_folder_id,  # Store for access control
+            "drive_file_id": file.get('id'),  # For upsert
+        }
+        if folder_name == "Today's Event" and file.get('_event_name'):
+            content_data["event_name"] = file['_event_name']
+        return (category, content_data), None
+
+    @require_role(ADMIN_ROLES, denial="❌ This command is for admins only.")
+    async def drive_folder_info(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
+        """Show connected Google Drive folder info"""
         if not self.drive_sync:
             await update.message.reply_text("❌ Google Drive is not configured.")
             return
@@ -1879,7 +2364,7 @@ Text to parse:
         message += f"*Root Folder ID:* `{GOOGLE_DRIVE_ROOT_FOLDER_ID}`\n\n"
         
         # List folders
-        folders = self.drive_sync.list_folders()
+        folders = await asyncio.to_thread(self.drive_sync.list_folders)
         message += f"*Folders found:* {len(folders)}\n"
         
         if folders:
@@ -1895,15 +2380,9 @@ Text to parse:
         
         await update.message.reply_text(message, parse_mode="Markdown")
 
-    async def drive_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_role(ADMIN_ROLES, denial="❌ This command is for admins and superadmins only.")
+    async def drive_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
         """Natural language Drive management via Claude agent"""
-        user_id = update.effective_user.id
-        user = db.get_user(user_id)
-
-        if not user or user["role"] not in ["admin", "superadmin"]:
-            await update.message.reply_text("❌ This command is for admins and superadmins only.")
-            return
-
         if not GOOGLE_DRIVE_ROOT_FOLDER_ID:
             await update.message.reply_text("❌ Google Drive is not configured.")
             return
@@ -1948,15 +2427,14 @@ Text to parse:
         is_protected_superadmin = user_id in SUPER_ADMIN_IDS
         
         # Get actual role from database (not assumed role)
-        conn = db.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
-        cursor.execute(
-            "SELECT role FROM users WHERE telegram_id = %s",
-            (user_id,)
-        )
-        user_row = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        with db.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+            cursor.execute(
+                "SELECT role FROM users WHERE telegram_id = %s",
+                (user_id,)
+            )
+            user_row = cursor.fetchone()
+            cursor.close()
         
         is_superadmin_role = user_row and user_row['role'] == 'superadmin' if user_row else False
         
@@ -2004,15 +2482,14 @@ Text to parse:
                 await update.message.reply_text("❌ User not found in database.")
                 return
             # Get the actual role from database (not the effective role)
-            conn = db.get_connection()
-            cursor = conn.cursor(row_factory=dict_row)
-            cursor.execute(
-                "SELECT role FROM users WHERE telegram_id = %s",
-                (user_id,)
-            )
-            user_row = cursor.fetchone()
-            cursor.close()
-            conn.close()
+            with db.get_connection() as conn:
+                cursor = conn.cursor(row_factory=dict_row)
+                cursor.execute(
+                    "SELECT role FROM users WHERE telegram_id = %s",
+                    (user_id,)
+                )
+                user_row = cursor.fetchone()
+                cursor.close()
             original_role = user_row['role'] if user_row else 'superadmin'
         
         # Store assumption
@@ -2047,15 +2524,14 @@ Text to parse:
         original_role = assumption['original_role']
         
         # Verify user is actually a superadmin (check database role, not assumed)
-        conn = db.get_connection()
-        cursor = conn.cursor(row_factory=dict_row)
-        cursor.execute(
-            "SELECT role FROM users WHERE telegram_id = %s",
-            (user_id,)
-        )
-        user_row = cursor.fetchone()
-        cursor.close()
-        conn.close()
+        with db.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+            cursor.execute(
+                "SELECT role FROM users WHERE telegram_id = %s",
+                (user_id,)
+            )
+            user_row = cursor.fetchone()
+            cursor.close()
         
         actual_role = user_row['role'] if user_row else None
         is_superadmin_role = actual_role == 'superadmin'
@@ -2091,20 +2567,20 @@ Text to parse:
             await update.message.reply_text("📊 *No syncs today.*\n\nUse /sync to sync files.", parse_mode="Markdown")
             return
         
-        message = "📊 *Today's Sync Status:*\n\n"
+        parts = ["📊 *Today's Sync Status:*\n\n"]
         
         for log in logs[:10]:
             folder_name = log.get('folder_name', 'Unknown')
-            message += f"*{folder_name}* ({log.get('synced_at', '?')})\n"
-            message += f"  Files: {log.get('files_synced', 0)} found, {log.get('files_processed', 0)} processed\n"
+            parts.append(f"*{folder_name}* ({log.get('synced_at', '?')})\n")
+            parts.append(f"  Files: {log.get('files_synced', 0)} found, {log.get('files_processed', 0)} processed\n")
             if log.get('errors'):
-                message += f"  ⚠️ Errors: {log['errors'][:50]}...\n"
-            message += "\n"
+                parts.append(f"  ⚠️ Errors ({log.get('errors_total') or 1}): {log['errors'][:50]}...\n")
+            parts.append("\n")
         
         if len(logs) > 10:
-            message += f"... and {len(logs) - 10} more syncs"
+            parts.append(f"... and {len(logs) - 10} more syncs")
         
-        await update.message.reply_text(message, parse_mode="Markdown")
+        await update.message.reply_text("".join(parts), parse_mode="Markdown")
 
     async def ask_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle queries with Claude"""
@@ -2129,7 +2605,7 @@ Text to parse:
         await update.message.reply_text("🔍 Searching today's information...")
 
         # Get today's entries
-        all_entries = db.get_today_entries()
+        all_entries = await self._get_today_entries_cached()
         logger.debug(f"Retrieved {len(all_entries)} total entries from database")
 
         # Filter entries based on folder access rules
@@ -2157,7 +2633,7 @@ Text to parse:
         # Query Claude (include Singapore time so "today" is clear)
         sgt_str = get_singapore_date_time_str()
         try:
-            response = claude_client.messages.create(
+            response = await async_claude_client.messages.create(
                 model="claude-haiku-4-5-20251001",
                 max_tokens=1000,
                 messages=[
@@ -2189,6 +2665,34 @@ Provide a direct, concise answer based only on the information above. If the doc
                 f"Raw entries found: {len(entries)}"
             )
 
+    async def _get_today_entries_cached(self):
+        """
+        Return today's entries, reusing a fetch younger than TODAY_ENTRIES_CACHE_TTL seconds.
+        The list is a copy, so callers can filter or sort it without touching the cache.
+        """
+        async with self._entries_cache_lock:
+            today = get_singapore_now().date()
+            cached = self._entries_cache
+            if cached and cached[0] == today and monotonic() - cached[1] < TODAY_ENTRIES_CACHE_TTL:
+                return list(cached[2])
+
+            generation = self._entries_cache_generation
+            entries = await asyncio.to_thread(db.get_today_entries)
+            # Don't store a result that an upload/purge invalidated while we were fetching
+            if generation == self._entries_cache_generation:
+                self._entries_cache = (today, monotonic(), entries)
+            return list(entries)
+
+    def _invalidate_entries_cache(self):
+        """Drop cached entries after uploads, deletes, syncs and purges."""
+        self._entries_cache = None
+        self._entries_cache_generation += 1
+        # Entries are updated in place (same ID), so their summaries go too
+        for task in set(self._summary_pending.values()):
+            task.cancel()
+        self._summary_pending.clear()
+        self._summary_cache.clear()
+
     def _is_student_movement_entry(self, entry):
         """Check if entry is Student Movement (tag or folder)."""
         tag = entry.get('tag', '')
@@ -2234,6 +2738,7 @@ Provide a direct, concise answer based only on the information above. If the doc
             'role_denied': 0
         }
         
+        entry_folder_ids = []  # (entry, drive_folder_id or None)
         for entry in entries:
             # Handle content field - it might be a dict (from JSONB) or a string
             content = entry.get('content', {})
@@ -2242,9 +2747,16 @@ Provide a direct, concise answer based only on the information above. If the doc
                     content = json.loads(content)
                 except (json.JSONDecodeError, TypeError):
                     content = {}
-            
-            drive_folder_id = content.get('drive_folder_id') if isinstance(content, dict) else None
-            
+            entry_folder_ids.append(
+                (entry, content.get('drive_folder_id') if isinstance(content, dict) else None)
+            )
+        
+        # Every folder the entries come from, with its roles, in one query
+        folders = db.get_folders_with_roles_by_drive_ids(
+            {drive_folder_id for _, drive_folder_id in entry_folder_ids if drive_folder_id}
+        )
+        
+        for entry, drive_folder_id in entry_folder_ids:
             if not drive_folder_id:
                 # Entry doesn't have folder info (e.g., manual upload)
                 # relief_member, admin have access; viewers do not (manual uploads)
@@ -2255,8 +2767,7 @@ Provide a direct, concise answer based only on the information above. If the doc
                     stats['role_denied'] += 1
                 continue
             
-            # Get folder from database
-            folder = db.get_folder_by_drive_id(drive_folder_id)
+            folder = folders.get(drive_folder_id)
             if not folder:
                 # Folder not in DB (e.g. legacy): allow viewer, relief_member, admin
                 if user_role in ['viewer', 'relief_member', 'admin']:
@@ -2273,8 +2784,7 @@ Provide a direct, concise answer based only on the information above. If the doc
                 continue
             
             # Check if user's role has access to this folder
-            folder_with_roles = db.get_folder_with_roles(folder['id'])
-            if not folder_with_roles or not folder_with_roles.get('roles'):
+            if not folder['roles']:
                 # No roles set = default: viewers can read all synced folder content
                 if user_role in ['viewer', 'relief_member', 'admin']:
                     filtered_entries.append(entry)
@@ -2283,8 +2793,7 @@ Provide a direct, concise answer based only on the information above. If the doc
                     stats['role_denied'] += 1
                 continue
             
-            allowed_roles = folder_with_roles.get('roles', [])
-            if user_role in allowed_roles:
+            if user_role in folder['roles']:
                 filtered_entries.append(entry)
                 stats['role_allowed'] += 1
             else:
@@ -2321,31 +2830,35 @@ Provide a direct, concise answer based only on the information above. If the doc
 
         return "\n\n".join(context_parts)
 
-    def _filter_entries_by_today_menu(self, entries, menu_key):
-        """Filter entries for a specific /today menu option."""
-        if menu_key == "relief":
-            return [e for e in entries if e.get("tag") == "RELIEF" or self._entry_folder_contains(e, "Relief")]
-        if menu_key == "weekly_bulletin":
-            return [e for e in entries if self._entry_folder_contains(e, "Weekly Bulletin")]
-        if menu_key == "student_movement":
-            return [e for e in entries if self._is_student_movement_entry(e)]
-        if menu_key == "this_week_ctss":
-            # This Week@CTSS: Weekly Bulletin content (same as weekly bulletin)
-            return [e for e in entries if self._entry_folder_contains(e, "Weekly Bulletin")]
-        if menu_key == "event":
-            return [e for e in entries if e.get("tag") == "EVENT" or self._entry_folder_contains(e, "Today's Event")]
-        return entries
-
-    def _entry_folder_contains(self, entry, folder_substring):
-        """Check if entry's folder contains the given substring."""
+    def _today_menu_keys(self, entry):
+        """Return the set of /today menu options an entry belongs to (parses its content once)."""
         content = entry.get("content", {})
         if isinstance(content, str):
             try:
                 content = json.loads(content)
             except (json.JSONDecodeError, TypeError):
                 content = {}
-        folder = content.get("folder", "") if isinstance(content, dict) else ""
-        return folder_substring.lower() in (folder or "").lower()
+        folder = (content.get("folder", "") if isinstance(content, dict) else "") or ""
+        folder_lower = folder.lower()
+        tag = entry.get("tag")
+
+        keys = set()
+        if tag == "RELIEF" or "relief" in folder_lower:
+            keys.add("relief")
+        if "weekly bulletin" in folder_lower:
+            # This Week@CTSS: Weekly Bulletin content (same as weekly bulletin)
+            keys.update(("weekly_bulletin", "this_week_ctss"))
+        if tag == "STUDENT_MOVEMENT" or "Student Movement" in folder:
+            keys.add("student_movement")
+        if tag == "EVENT" or "today's event" in folder_lower:
+            keys.add("event")
+        return keys
+
+    def _filter_entries_by_today_menu(self, entries, menu_key):
+        """Filter entries for a specific /today menu option."""
+        if menu_key not in TODAY_MENU_LABELS:
+            return entries
+        return [e for e in entries if menu_key in self._today_menu_keys(e)]
 
     async def today_summary(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show today's menu with clickable options: Relief, Weekly Bulletin, Student Movement, This Week@CTSS, Event"""
@@ -2356,7 +2869,7 @@ Provide a direct, concise answer based only on the information above. If the doc
             await update.message.reply_text("❌ Not registered. Use /start first.")
             return
 
-        all_entries = db.get_today_entries()
+        all_entries = await self._get_today_entries_cached()
         user_role = user.get("role", "viewer")
         entries = self._filter_entries_by_folder_access(all_entries, user_role)
 
@@ -2365,80 +2878,172 @@ Provide a direct, concise answer based only on the information above. If the doc
             return
 
         sgt_str = get_singapore_date_time_str()
-        message = f"📊 *TODAY'S INFORMATION* ({sgt_str})\n\n"
-        message += "Select a category for more details:\n\n"
-
-        # Menu options: Today's Relief, Today@Weekly Bulletin, Today's Student Movement, This Week@CTSS, Today's Event
-        menu_options = [
-            ("relief", "Today's Relief"),
-            ("weekly_bulletin", "Today@Weekly Bulletin"),
-            ("student_movement", "Today's Student Movement"),
-            ("this_week_ctss", "This Week@CTSS"),
-            ("event", "Today's Event"),
-        ]
+        message = f"📊 *TODAY'S INFORMATION* ({sgt_str})\n\nSelect a category for more details:\n\n"
 
-        buttons = []
-        for key, label in menu_options:
-            filtered = self._filter_entries_by_today_menu(entries, key)
-            count = len(filtered)
-            emoji = "📋" if count > 0 else "⚪️"
-            buttons.append([InlineKeyboardButton(f"{emoji} {label} ({count})", callback_data=f"summary_{key}")])
+        # One pass over the entries counts every menu option at once
+        menu_counts = Counter(key for e in entries for key in self._today_menu_keys(e))
 
-        buttons.append([InlineKeyboardButton("📝 Full Summary (All)", callback_data="summary_ALL")])
+        buttons = [[today_menu_button(key, menu_counts[key])] for key, _ in TODAY_MENU_OPTIONS]
+        buttons.append([TODAY_FULL_SUMMARY_BUTTON])
 
         keyboard = InlineKeyboardMarkup(buttons)
         await update.message.reply_text(message, parse_mode="Markdown", reply_markup=keyboard)
 
-    async def handle_summary_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle callback when user clicks a summary button"""
-        query = update.callback_query
-        await query.answer()
-        
-        user_id = query.from_user.id
-        user = db.get_user(user_id)
-        
-        if not user:
-            await query.edit_message_text("❌ Not registered.")
+        # Summarise every category in the background so button taps can be answered from cache
+        self._start_summary_precompute(entries)
+
+    def _start_summary_precompute(self, entries):
+        """
+        Start one Claude call for the /today categories whose entries have no summary yet.
+        Categories already cached or being generated (e.g. by another user's /today) are skipped.
+        """
+        groups = defaultdict(list)
+        for e in entries:
+            for key in self._today_menu_keys(e):
+                groups[key].append(e)
+
+        # Categories with identical entries (e.g. Weekly Bulletin / This Week@CTSS) share one summary
+        missing = {}  # entry ids -> (category key, entries)
+        for key, group in groups.items():
+            ids = frozenset(e["id"] for e in group)
+            if ids not in self._summary_cache and ids not in self._summary_pending and ids not in missing:
+                missing[ids] = (key, group)
+        if not missing:
             return
+
+        task = asyncio.create_task(self._precompute_summaries(missing, self._entries_cache_generation))
+        for ids in missing:
+            self._summary_pending[ids] = task
+
+        def done(task):
+            for ids in missing:
+                if self._summary_pending.get(ids) is task:
+                    del self._summary_pending[ids]
+
+        task.add_done_callback(done)
+
+    async def _precompute_summaries(self, missing, generation):
+        """Generate the summaries for missing ({entry ids: (key, entries)}) with one Claude call and cache them"""
+        sections = "\n\n".join(
+            f"=== {key} ({TODAY_MENU_LABELS.get(key, key)}) ===\n{self._build_context_for_claude(group, 'summary')}"
+            for key, group in missing.values()
+        )
+
+        sgt_str = get_singapore_date_time_str()
+        try:
+            response = await async_claude_client.messages.create(
+                model="claude-haiku-4-5-20251001",
+                max_tokens=4000,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": f"""Current date/time (Singapore): {sgt_str}. "Today" refers to this date.
+
+Below are today's school information entries, split into sections by category key.
+For EACH section, provide a clear and organized summary of the MAIN POINTS as bullet points.
+Focus on key information like: names, times, classes, rooms, and any important details.
+Be concise but comprehensive.
+
+Return ONLY a valid JSON object mapping each category key to its summary text. No explanation.
+Format: {{"relief": "• ...", "event": "• ..."}}
+
+{sections}"""
+                    }
+                ],
+            )
+            if response.stop_reason == "max_tokens":
+                # The JSON is cut off; the buttons stream their own summaries instead
+                logger.warning(f"/today summaries truncated at max_tokens ({len(missing)} categories)")
+                return
+
+            result_text = response.content[0].text.strip()
+            if "```json" in result_text:
+                result_text = result_text.split("```json")[1].split("```")[0].strip()
+            elif "```" in result_text:
+                result_text = result_text.split("```")[1].split("```")[0].strip()
+            summaries = json.loads(result_text)
+            # Anything but a JSON object (e.g. a list) fails here, not in a button handler later
+            results = {
+                ids: summaries[key]
+                for ids, (key, _) in missing.items()
+                if summaries.get(key)
+            }
+        except Exception as e:
+            logger.warning(f"Could not precompute /today summaries: {e}")
+            return
+
+        # Don't store summaries of entries that an upload/sync/purge changed while we were generating
+        if generation == self._entries_cache_generation:
+            self._summary_cache.update(results)
+
+    async def _get_precomputed_summary(self, entries):
+        """Return the cached summary for a /today category's entries, else None."""
+        ids = frozenset(e["id"] for e in entries)
+        task = self._summary_pending.get(ids)
+        if task:
+            # Still generating: wait a moment, then let the caller stream its own summary
+            await asyncio.wait({task}, timeout=SUMMARY_PRECOMPUTE_WAIT)
+        return self._summary_cache.get(ids)
+
+    async def handle_summary_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle callback when user clicks a summary button"""
+        query = update.callback_query
+        await query.answer()
+        
+        user_id = query.from_user.id
+        user = db.get_user(user_id)
+        
+        if not user:
+            await query.edit_message_text("❌ Not registered.")
+            return
+        
+        # Extract category from callback data
+        callback_data = query.data
+        category = callback_data.removeprefix("summary_")
+        
+        await query.edit_message_text("🔍 Generating summary... Please wait.")
+        
+        # Get entries and filter by folder access
+        all_entries = await self._get_today_entries_cached()
+        user_role = user.get("role", "viewer")
+        entries = self._filter_entries_by_folder_access(all_entries, user_role)
+        
+        # The /today keyboard only offers its menu categories and "ALL"
+        if category in TODAY_MENU_LABELS:
+            entries = self._filter_entries_by_today_menu(entries, category)
+        elif category != "ALL":
+            entries = []
         
-        # Extract category from callback data
-        callback_data = query.data
-        category = callback_data.replace("summary_", "")
-        
-        await query.edit_message_text("🔍 Generating summary... Please wait.")
-        
-        # Get entries and filter by folder access
-        all_entries = db.get_today_entries()
-        user_role = user.get("role", "viewer")
-        entries = self._filter_entries_by_folder_access(all_entries, user_role)
-        
-        if category != "ALL":
-            if category in ("relief", "weekly_bulletin", "student_movement", "this_week_ctss", "event"):
-                entries = self._filter_entries_by_today_menu(entries, category)
-            elif category in TAGS:
-                entries = [e for e in entries if e.get("tag") == category]
-            else:
-                entries = []
-        
         if not entries:
-            category_label = {
-                "relief": "Today's Relief",
-                "weekly_bulletin": "Today@Weekly Bulletin",
-                "student_movement": "Today's Student Movement",
-                "this_week_ctss": "This Week@CTSS",
-                "event": "Today's Event",
-            }.get(category, category)
+            category_label = TODAY_MENU_LABELS.get(category, category)
             await query.edit_message_text(f"📭 No entries found for {category_label}.")
             return
         
+        if category == "ALL":
+            header = "📝 *FULL SUMMARY - ALL CATEGORIES*\n\n"
+        else:
+            header = f"📋 *{TODAY_MENU_LABELS.get(category, category)}*\n\n"
+        
+        # Served from the summaries precomputed when /today was shown, if they are still current
+        if category in TODAY_MENU_LABELS:
+            summary_text = await self._get_precomputed_summary(entries)
+            if summary_text:
+                try:
+                    await query.edit_message_text(fit_message(header, summary_text), parse_mode="Markdown")
+                except Exception:
+                    # Fallback to plain text if Markdown fails
+                    await query.edit_message_text(fit_message(header.replace('*', ''), summary_text))
+                return
+        
         # Build context for Claude
         context_text = self._build_context_for_claude(entries, "summary")
         
         # Generate summary with Claude (include Singapore time for "today" context)
         sgt_str = get_singapore_date_time_str()
         try:
-            response = claude_client.messages.create(
-                model="claude-haiku-4-5-20251001",
+            summary_text = await self._stream_reply_to_message(
+                query,
+                header,
                 max_tokens=1500,
                 messages=[
                     {
@@ -2459,39 +3064,51 @@ Provide a summary of the main points:"""
                 ],
             )
             
-            summary_text = response.content[0].text
-            
-            # Format response
-            category_labels = {
-                "relief": "Today's Relief",
-                "weekly_bulletin": "Today@Weekly Bulletin",
-                "student_movement": "Today's Student Movement",
-                "this_week_ctss": "This Week@CTSS",
-                "event": "Today's Event",
-            }
-            if category == "ALL":
-                header = "📝 *FULL SUMMARY - ALL CATEGORIES*\n\n"
-            else:
-                header = f"📋 *{category_labels.get(category, category)}*\n\n"
-            
-            await query.edit_message_text(
-                f"{header}{summary_text}",
-                parse_mode="Markdown"
-            )
+            try:
+                await query.edit_message_text(
+                    fit_message(header, summary_text),
+                    parse_mode="Markdown"
+                )
+            except Exception:
+                # Fallback to plain text if Markdown fails
+                await query.edit_message_text(fit_message(header.replace('*', ''), summary_text))
             
         except Exception as e:
             logger.error(f"Summary generation error: {e}")
             await query.edit_message_text(f"❌ Error generating summary: {str(e)[:100]}")
 
-    async def get_upload_code(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Show today's upload code to authorized users"""
-        user_id = update.effective_user.id
-        user = db.get_user(user_id)
+    async def _stream_reply_to_message(self, query, header, max_tokens, messages):
+        """Stream a Claude reply into the callback's message as it is generated. Returns the full text."""
+        # Partial Markdown is often unbalanced, so progress edits are plain text; the caller does the final edit
+        plain_header = header.replace("*", "")
+        buffer = ""
+        last_edit_len = 0
+        last_edit_at = monotonic()
+
+        async with async_claude_client.messages.stream(
+            model="claude-haiku-4-5-20251001",
+            max_tokens=max_tokens,
+            messages=messages,
+        ) as stream:
+            async for text in stream.text_stream:
+                buffer += text
+                if (
+                    len(buffer) - last_edit_len >= STREAM_EDIT_MIN_CHARS
+                    and monotonic() - last_edit_at >= STREAM_EDIT_MIN_INTERVAL
+                    and len(plain_header) + len(buffer) < TELEGRAM_TEXT_LIMIT
+                ):
+                    try:
+                        await query.edit_message_text(f"{plain_header}{buffer} ▌")
+                    except Exception as e:
+                        logger.debug(f"Skipped streaming edit: {e}")
+                    last_edit_len = len(buffer)
+                    last_edit_at = monotonic()
 
-        if not user or user["role"] not in ["admin", "superadmin"]:
-            await update.message.reply_text("❌ You don't have upload permissions.")
-            return
+        return buffer
 
+    @require_role(ADMIN_ROLES, denial="❌ You don't have upload permissions.")
+    async def get_upload_code(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
+        """Show today's upload code to authorized users"""
         code = db.get_daily_code()
         await update.message.reply_text(
             f"🔐 *Today's Upload Code:*\n\n`{code}`\n\n"
@@ -2499,15 +3116,9 @@ Provide a summary of the main points:"""
             parse_mode="Markdown",
         )
 
-    async def add_user(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_role(ADMIN_ROLES, denial="❌ You don't have permission to add users.")
+    async def add_user(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
         """Add a new viewer - with confirmation"""
-        user_id = update.effective_user.id
-        user = db.get_user(user_id)
-
-        if not user or user["role"] not in ["admin", "superadmin"]:
-            await update.message.reply_text("❌ You don't have permission to add users.")
-            return
-
         if len(context.args) < 2:
             await update.message.reply_text(
                 "Usage: /add [telegram_id] [name]\n\n"
@@ -2529,23 +3140,15 @@ Provide a summary of the main points:"""
                 return
 
             # Store pending action and ask for confirmation
-            buttons = [
-                [InlineKeyboardButton("✅ Confirm Add", callback_data=f"admin_add_confirm_{new_user_id}")],
-                [InlineKeyboardButton("❌ Cancel", callback_data="admin_add_cancel")],
-            ]
-            keyboard = InlineKeyboardMarkup(buttons)
-            
+            keyboard = admin_confirm_keyboard("add", new_user_id)
+
             # Store display name in context for later
             context.user_data["pending_add_name"] = display_name
             context.user_data["pending_add_id"] = new_user_id
+            context.user_data["pending_add_precheck_ts"] = monotonic()
 
             await update.message.reply_text(
-                f"⚠️ *CONFIRM ADD USER*\n\n"
-                f"You are about to add:\n\n"
-                f"*Name:* {display_name}\n"
-                f"*ID:* `{new_user_id}`\n"
-                f"*Role:* VIEWER\n\n"
-                f"Do you want to proceed?",
+                CONFIRM_ADD_TEMPLATE.format(name=escape_md(display_name), id=new_user_id),
                 parse_mode="Markdown",
                 reply_markup=keyboard,
             )
@@ -2553,17 +3156,9 @@ Provide a summary of the main points:"""
         except ValueError:
             await update.message.reply_text("❌ Invalid user ID. Must be a number.")
 
-    async def remove_user(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_role(ADMIN_ROLES, denial="❌ You don't have permission to remove users.")
+    async def remove_user(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
         """Remove a user - with confirmation"""
-        user_id = update.effective_user.id
-        user = db.get_user(user_id)
-
-        if not user or user["role"] not in ["admin", "superadmin"]:
-            await update.message.reply_text(
-                "❌ You don't have permission to remove users."
-            )
-            return
-
         if not context.args:
             await update.message.reply_text(
                 "Usage: /remove [telegram_id]\n\n" "Example: /remove 123456789"
@@ -2585,20 +3180,14 @@ Provide a summary of the main points:"""
                 return
 
             # Store pending action and ask for confirmation
-            buttons = [
-                [InlineKeyboardButton("✅ Confirm Remove", callback_data=f"admin_remove_confirm_{target_user_id}")],
-                [InlineKeyboardButton("❌ Cancel", callback_data="admin_remove_cancel")],
-            ]
-            keyboard = InlineKeyboardMarkup(buttons)
+            keyboard = admin_confirm_keyboard("remove", target_user_id)
 
             await update.message.reply_text(
-                f"⚠️ *CONFIRM REMOVE USER*\n\n"
-                f"You are about to remove:\n\n"
-                f"*Name:* {target_user['display_name']}\n"
-                f"*ID:* `{target_user_id}`\n"
-                f"*Role:* {target_user['role'].upper()}\n\n"
-                f"⚠️ This action cannot be undone.\n\n"
-                f"Do you want to proceed?",
+                CONFIRM_REMOVE_TEMPLATE.format(
+                    name=escape_md(target_user['display_name']),
+                    id=target_user_id,
+                    role=escape_md(target_user['role'].upper()),
+                ),
                 parse_mode="Markdown",
                 reply_markup=keyboard,
             )
@@ -2614,18 +3203,33 @@ Provide a summary of the main points:"""
         user_id = query.from_user.id
         user = db.get_user(user_id)
         
-        if not user or user["role"] not in ["admin", "superadmin"]:
+        if not user or user["role"] not in ADMIN_ROLES:
             await query.edit_message_text("❌ You don't have permission for this action.")
             return
         
         callback_data = query.data
         
-        # Handle ADD confirmations
-        if callback_data.startswith("admin_add_confirm_"):
-            new_user_id = int(callback_data.replace("admin_add_confirm_", ""))
-            display_name = context.user_data.get("pending_add_name", "Unknown")
-            
-            # Check if user still doesn't exist
+        # Confirmations carry their payload after the prefix (e.g. admin_add_confirm_<id>)
+        for prefix, handler in self._admin_confirm_handlers.items():
+            if callback_data.startswith(prefix):
+                await handler(callback_data.removeprefix(prefix), query, context, user)
+                return
+        
+        if callback_data in ADMIN_CANCEL_MESSAGES:
+            message, clear_pending = ADMIN_CANCEL_MESSAGES[callback_data]
+            await query.edit_message_text(message)
+            if clear_pending:
+                context.user_data.clear()
+
+    async def _confirm_add_user(self, payload, query, context, user):
+        """Add the user confirmed via admin_add_confirm_<id>"""
+        new_user_id = int(payload)
+        display_name = context.user_data.get("pending_add_name", "Unknown")
+        precheck_ts = context.user_data.get("pending_add_precheck_ts")
+        
+        # /add already checked the ID moments ago; only re-check if that result is stale.
+        # The insert itself ignores existing IDs, so a race is still reported below.
+        if precheck_ts is None or monotonic() - precheck_ts >= ADD_USER_PRECHECK_TTL:
             existing = db.get_user(new_user_id)
             if existing:
                 await query.edit_message_text(
@@ -2633,122 +3237,94 @@ Provide a summary of the main points:"""
                 )
                 context.user_data.clear()
                 return
-            
-            db.add_user(new_user_id, display_name, "viewer", user_id)
-            
-            await query.edit_message_text(
-                f"✅ *USER ADDED*\n\n"
-                f"*Name:* {display_name}\n"
-                f"*ID:* `{new_user_id}`\n"
-                f"*Role:* VIEWER\n\n"
-                f"They can now use /start to access the bot.",
-                parse_mode="Markdown",
-            )
-            context.user_data.clear()
         
-        elif callback_data == "admin_add_cancel":
-            await query.edit_message_text("👍 Add user cancelled.")
+        added = await asyncio.to_thread(db.add_user, new_user_id, display_name, "viewer", user["telegram_id"])
+        if not added:
+            await query.edit_message_text(f"❌ User {new_user_id} is already registered.")
             context.user_data.clear()
+            return
         
-        # Handle REMOVE confirmations
-        elif callback_data.startswith("admin_remove_confirm_"):
-            target_user_id = int(callback_data.replace("admin_remove_confirm_", ""))
-            
-            # Can't remove super admins
-            if target_user_id in SUPER_ADMIN_IDS:
-                await query.edit_message_text("❌ Cannot remove super admins.")
-                return
-            
-            target_user = db.get_user(target_user_id)
-            if target_user:
-                db.remove_user(target_user_id)
-                await query.edit_message_text(
-                    f"✅ *USER REMOVED*\n\n"
-                    f"*Name:* {target_user['display_name']}\n"
-                    f"*ID:* `{target_user_id}`",
-                    parse_mode="Markdown",
-                )
-            else:
-                await query.edit_message_text(f"❌ User {target_user_id} not found.")
-        
-        elif callback_data == "admin_remove_cancel":
-            await query.edit_message_text("👍 Remove user cancelled.")
+        await query.edit_message_text(
+            USER_ADDED_TEMPLATE.format(name=escape_md(display_name), id=new_user_id),
+            parse_mode="Markdown",
+        )
+        context.user_data.clear()
+
+    async def _confirm_remove_user(self, payload, query, context, user):
+        """Remove the user confirmed via admin_remove_confirm_<id>"""
+        target_user_id = int(payload)
         
-        # Handle PROMOTE confirmations
-        elif callback_data.startswith("admin_promote_confirm_"):
-            parts = callback_data.replace("admin_promote_confirm_", "").split("_")
-            target_user_id = int(parts[0])
-            new_role = parts[1]
-            
-            # Only superadmin can promote
-            if user["role"] != "superadmin":
-                await query.edit_message_text("❌ Only super admins can change user roles.")
-                return
-            
-            target_user = db.get_user(target_user_id)
-            if target_user:
-                old_role = target_user['role']
-                db.update_user_role(target_user_id, new_role)
-                await query.edit_message_text(
-                    f"✅ *ROLE CHANGED*\n\n"
-                    f"*Name:* {target_user['display_name']}\n"
-                    f"*ID:* `{target_user_id}`\n"
-                    f"*Previous Role:* {old_role.upper()}\n"
-                    f"*New Role:* {new_role.upper()}",
-                    parse_mode="Markdown",
-                )
-            else:
-                await query.edit_message_text(f"❌ User {target_user_id} not found.")
-            context.user_data.clear()
+        # Can't remove super admins
+        if target_user_id in SUPER_ADMIN_IDS:
+            await query.edit_message_text("❌ Cannot remove super admins.")
+            return
         
-        elif callback_data == "admin_promote_cancel":
-            await query.edit_message_text("👍 Role change cancelled.")
-            context.user_data.clear()
-
-    async def list_users(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """List all users"""
-        user_id = update.effective_user.id
-        user = db.get_user(user_id)
+        target_user = db.get_user(target_user_id)
+        if target_user:
+            await asyncio.to_thread(db.remove_user, target_user_id)
+            await query.edit_message_text(
+                USER_REMOVED_TEMPLATE.format(name=escape_md(target_user['display_name']), id=target_user_id),
+                parse_mode="Markdown",
+            )
+        else:
+            await query.edit_message_text(f"❌ User {target_user_id} not found.")
 
-        if not user or user["role"] not in ["admin", "superadmin"]:
-            await update.message.reply_text("❌ You don't have permission to list users.")
+    async def _confirm_promote_user(self, payload, query, context, user):
+        """Apply the role change confirmed via admin_promote_confirm_<id>_<role>"""
+        # Roles contain underscores (relief_member, student_admin), so only split off the ID
+        target_id_str, new_role = payload.split("_", 1)
+        target_user_id = int(target_id_str)
+        
+        # Only superadmin can promote
+        if user["role"] != "superadmin":
+            await query.edit_message_text("❌ Only super admins can change user roles.")
             return
+        
+        target_user = db.get_user(target_user_id)
+        if target_user:
+            old_role = target_user['role']
+            await asyncio.to_thread(db.update_user_role, target_user_id, new_role)
+            await query.edit_message_text(
+                ROLE_CHANGED_TEMPLATE.format(
+                    name=escape_md(target_user['display_name']),
+                    id=target_user_id,
+                    old_role=escape_md(old_role.upper()),
+                    new_role=escape_md(new_role.upper()),
+                ),
+                parse_mode="Markdown",
+            )
+        else:
+            await query.edit_message_text(f"❌ User {target_user_id} not found.")
+        context.user_data.clear()
 
-        users = db.get_all_users()
+    @require_role(ADMIN_ROLES, denial="❌ You don't have permission to list users.")
+    async def list_users(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
+        """List all users"""
+        users = await asyncio.to_thread(db.get_all_users)
 
         if not users:
             await update.message.reply_text("No users registered.")
             return
 
-        # Group by role
-        role_groups = {}
-        for u in users:
-            role = u["role"]
-            if role not in role_groups:
-                role_groups[role] = []
-            role_groups[role].append(u)
+        # Group by role in display order (stable sort keeps the name order from the query)
+        listed = sorted((u for u in users if u["role"] in ROLE_ORDER), key=lambda u: ROLE_ORDER[u["role"]])
 
-        message = "👥 <b>REGISTERED USERS</b>\n\n"
+        parts = ["👥 <b>REGISTERED USERS</b>\n\n"]
 
-        for role in ["superadmin", "admin", "relief_member", "student_admin", "viewer"]:
-            if role in role_groups:
-                message += f"<b>{role.upper()}:</b>\n"
-                for u in role_groups[role]:
-                    # Escape HTML special characters in display name
-                    safe_name = str(u['display_name']).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                    message += f"• {safe_name} ({u['telegram_id']})\n"
-                message += "\n"
+        for role, group in groupby(listed, key=itemgetter("role")):
+            parts.append(f"<b>{role.upper()}:</b>\n")
+            for u in group:
+                # Escape HTML special characters in display name
+                safe_name = html.escape(str(u['display_name']), quote=False)
+                parts.append(f"• {safe_name} ({u['telegram_id']})\n")
+            parts.append("\n")
 
-        await update.message.reply_text(message, parse_mode="HTML")
+        await update.message.reply_text("".join(parts), parse_mode="HTML")
 
-    async def promote_user(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_role(SUPERADMIN_ROLES, denial="❌ Only super admins can promote users.")
+    async def promote_user(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
         """Promote user to uploader or uploadadmin (superadmin only) - with confirmation"""
         user_id = update.effective_user.id
-        user = db.get_user(user_id)
-
-        if not user or user["role"] != "superadmin":
-            await update.message.reply_text("❌ Only super admins can promote users.")
-            return
 
         if len(context.args) < 2:
             await update.message.reply_text(
@@ -2762,7 +3338,7 @@ Provide a summary of the main points:"""
             target_user_id = int(context.args[0])
             new_role = context.args[1].lower()
 
-            if new_role not in ["viewer", "relief_member", "admin", "student_admin"]:
+            if new_role not in ASSIGNABLE_ROLES:
                 await update.message.reply_text(
                     "❌ Invalid role. Use: viewer, uploader, or uploadadmin"
                 )
@@ -2779,20 +3355,15 @@ Provide a summary of the main points:"""
             context.user_data["pending_promote_id"] = target_user_id
             context.user_data["pending_promote_role"] = new_role
 
-            buttons = [
-                [InlineKeyboardButton("✅ Confirm Change", callback_data=f"admin_promote_confirm_{target_user_id}_{new_role}")],
-                [InlineKeyboardButton("❌ Cancel", callback_data="admin_promote_cancel")],
-            ]
-            keyboard = InlineKeyboardMarkup(buttons)
+            keyboard = admin_confirm_keyboard("promote", f"{target_user_id}_{new_role}")
 
             await update.message.reply_text(
-                f"⚠️ *CONFIRM ROLE CHANGE*\n\n"
-                f"You are about to change:\n\n"
-                f"*Name:* {target_user['display_name']}\n"
-                f"*ID:* `{target_user_id}`\n"
-                f"*Current Role:* {target_user['role'].upper()}\n"
-                f"*New Role:* {new_role.upper()}\n\n"
-                f"Do you want to proceed?",
+                CONFIRM_PROMOTE_TEMPLATE.format(
+                    name=escape_md(target_user['display_name']),
+                    id=target_user_id,
+                    old_role=escape_md(target_user['role'].upper()),
+                    new_role=escape_md(new_role.upper()),
+                ),
                 parse_mode="Markdown",
                 reply_markup=keyboard,
             )
@@ -2800,17 +3371,11 @@ Provide a summary of the main points:"""
         except ValueError:
             await update.message.reply_text("❌ Invalid user ID.")
 
+    @require_role(SUPERADMIN_ROLES, denial="❌ Only super admins can generate codes.")
     async def generate_new_code(
-        self, update: Update, context: ContextTypes.DEFAULT_TYPE
+        self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict
     ):
         """Generate new daily code (superadmin only)"""
-        user_id = update.effective_user.id
-        user = db.get_user(user_id)
-
-        if not user or user["role"] != "superadmin":
-            await update.message.reply_text("❌ Only super admins can generate codes.")
-            return
-
         new_code = db.generate_new_daily_code()
 
         await update.message.reply_text(
@@ -2819,69 +3384,56 @@ Provide a summary of the main points:"""
             parse_mode="Markdown",
         )
 
-    async def show_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_role(SUPERADMIN_ROLES, denial="❌ Only super admins can view stats.")
+    async def show_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
         """Show usage statistics (superadmin only)"""
-        user_id = update.effective_user.id
-        user = db.get_user(user_id)
-
-        if not user or user["role"] != "superadmin":
-            await update.message.reply_text("❌ Only super admins can view stats.")
-            return
-
-        stats = db.get_stats()
-
-        message = "📊 *BOT STATISTICS*\n\n"
-        message += f"Total Users: {stats['total_users']}\n"
-        message += f"• Super Admins: {stats['superadmins']}\n"
-        message += f"• Admins: {stats.get('admin', 0)}\n"
-        message += f"• Relief Members: {stats.get('relief_member', 0)}\n"
-        message += f"• Student Admins: {stats.get('student_admin', 0)}\n"
-        message += f"• Viewers: {stats['viewers']}\n\n"
-        message += f"Today's Entries: {stats['today_entries']}"
+        stats = await asyncio.to_thread(db.get_stats)
+
+        parts = [
+            "📊 *BOT STATISTICS*\n\n",
+            f"Total Users: {stats['total_users']}\n",
+            f"• Super Admins: {stats['superadmins']}\n",
+            f"• Admins: {stats.get('admin', 0)}\n",
+            f"• Relief Members: {stats.get('relief_member', 0)}\n",
+            f"• Student Admins: {stats.get('student_admin', 0)}\n",
+            f"• Viewers: {stats['viewers']}\n\n",
+            f"Today's Entries: {stats['today_entries']}",
+        ]
 
-        await update.message.reply_text(message, parse_mode="Markdown")
+        await update.message.reply_text("".join(parts), parse_mode="Markdown")
 
-    async def manual_purge(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_role(SUPERADMIN_ROLES, denial="❌ Only super admins can purge data.")
+    async def manual_purge(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
         """Manually trigger data purge (superadmin only)"""
-        user_id = update.effective_user.id
-        user = db.get_user(user_id)
-
-        if not user or user["role"] != "superadmin":
-            await update.message.reply_text("❌ Only super admins can purge data.")
-            return
-
-        deleted_count = db.purge_old_data()
+        deleted_count = await asyncio.to_thread(db.purge_old_data)
+        self._invalidate_entries_cache()
 
         await update.message.reply_text(
             f"🗑️ Purged {deleted_count} old entries.",
             parse_mode="Markdown",
         )
 
-    async def my_uploads(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_role(ADMIN_ROLES, denial="❌ You don't have upload permissions.")
+    async def my_uploads(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
         """Show user's uploads for today"""
         user_id = update.effective_user.id
-        user = db.get_user(user_id)
-
-        if not user or user["role"] not in ["admin", "superadmin"]:
-            await update.message.reply_text("❌ You don't have upload permissions.")
-            return
 
-        entries = db.get_user_uploads_today(user_id)
+        entries = await asyncio.to_thread(db.get_user_uploads_today, user_id)
 
         if not entries:
             await update.message.reply_text("You haven't uploaded anything today.")
             return
 
-        message = "📤 *YOUR UPLOADS TODAY:*\n\n"
+        parts = ["📤 *YOUR UPLOADS TODAY:*\n\n"]
 
         for i, entry in enumerate(entries, 1):
             tag = entry["tag"]
             timestamp = entry["timestamp"]
             content_type = entry["content"]["type"]
 
-            message += f"{i}. [{tag}] - {content_type} at {timestamp}\n"
+            parts.append(f"{i}. [{tag}] - {content_type} at {timestamp}\n")
 
-        await update.message.reply_text(message, parse_mode="Markdown")
+        await update.message.reply_text("".join(parts), parse_mode="Markdown")
 
     # ============ SUPER ADMIN HIDDEN COMMANDS ============
 
@@ -2903,7 +3455,7 @@ Provide a summary of the main points:"""
             "111222333,Bob Relief,relief_member\n"
             "```\n\n"
             "⚠️ *Warning:* This will REPLACE all existing users except super admins.\n\n"
-            "Valid roles: `viewer`, `relief_member`, `admin`\n\n"
+            "Valid roles: `viewer`, `relief_member`, `admin`, `student_admin`\n\n"
             "Send /cancel to abort.",
             parse_mode="Markdown"
         )
@@ -2927,22 +3479,20 @@ Provide a summary of the main points:"""
         file_bytes = await file.download_as_bytearray()
         
         try:
-            # Parse CSV
-            csv_content = file_bytes.decode('utf-8')
-            lines = csv_content.strip().split('\n')
-            
-            # Skip header if present
-            if lines[0].lower().startswith('telegram_id') or lines[0].lower().startswith('id'):
-                lines = lines[1:]
+            # Parse CSV row by row (utf-8-sig also accepts Excel's byte-order mark)
+            reader = csv.reader(io.TextIOWrapper(io.BytesIO(file_bytes), encoding='utf-8-sig', newline=''))
             
             new_users = []
             errors = []
+            seen_ids = set()
             
-            for i, line in enumerate(lines, 1):
-                if not line.strip():
+            for i, parts in enumerate(reader, 1):
+                # Skip header if present
+                if i == 1 and parts and parts[0].strip().lower().startswith(('telegram_id', 'id')):
                     continue
-                    
-                parts = line.strip().split(',')
+                if not any(part.strip() for part in parts):
+                    continue
+                
                 if len(parts) < 3:
                     errors.append(f"Line {i}: Invalid format")
                     continue
@@ -2953,7 +3503,7 @@ Provide a summary of the main points:"""
                     role = parts[2].strip().lower()
                     
                     # Validate role
-                    if role not in ['viewer', 'relief_member', 'admin', 'student_admin']:
+                    if role not in ASSIGNABLE_ROLES:
                         errors.append(f"Line {i}: Invalid role '{role}'")
                         continue
                     
@@ -2962,6 +3512,12 @@ Provide a summary of the main points:"""
                         errors.append(f"Line {i}: Cannot modify super admin {tid}")
                         continue
                     
+                    # The first row for an ID wins; later ones would be dropped by the insert anyway
+                    if tid in seen_ids:
+                        errors.append(f"Line {i}: Duplicate telegram ID {tid}")
+                        continue
+                    seen_ids.add(tid)
+                    
                     new_users.append({'telegram_id': tid, 'name': name, 'role': role})
                     
                 except ValueError:
@@ -2977,14 +3533,18 @@ Provide a summary of the main points:"""
             # Delete all non-superadmin users
             db.delete_non_superadmin_users(SUPER_ADMIN_IDS)
             
-            # Add new users
-            added = 0
-            for u in new_users:
-                try:
-                    db.add_user(u['telegram_id'], u['name'], u['role'], user_id)
-                    added += 1
-                except Exception as e:
-                    errors.append(f"Failed to add {u['telegram_id']}: {e}")
+            # Add new users in one transaction; retry row by row only if the batch is rejected
+            try:
+                added = db.add_users_bulk(new_users, user_id)
+            except psycopg.IntegrityError as e:
+                logger.warning(f"Bulk user insert failed, retrying row by row: {e}")
+                added = 0
+                for u in new_users:
+                    try:
+                        if db.add_user(u['telegram_id'], u['name'], u['role'], user_id):
+                            added += 1
+                    except Exception as e:
+                        errors.append(f"Failed to add {u['telegram_id']}: {e}")
             
             result_msg = f"✅ *Mass Upload Complete*\n\n"
             result_msg += f"Added: {added} users\n"
@@ -3083,38 +3643,51 @@ Provide a summary of the main points:"""
         if user_id not in SUPER_ADMIN_IDS:
             return  # Silently ignore
         
-        users = db.get_all_users()
+        users = await asyncio.to_thread(db.get_all_users)
         superadmins = [u for u in users if u['role'] == 'superadmin']
         
-        message = "👑 *SUPER ADMINS*\n\n"
+        parts = ["👑 *SUPER ADMINS*\n\n"]
         
         for u in superadmins:
             protected = "🔒" if u['telegram_id'] in SUPER_ADMIN_IDS else ""
-            message += f"• {u['display_name']} ({u['telegram_id']}) {protected}\n"
+            parts.append(f"• {u['display_name']} ({u['telegram_id']}) {protected}\n")
         
-        message += "\n🔒 = Protected (in config file)"
+        parts.append("\n🔒 = Protected (in config file)")
         
-        await update.message.reply_text(message, parse_mode="Markdown")
+        await update.message.reply_text("".join(parts), parse_mode="Markdown")
 
     async def daily_purge_job(self, context: ContextTypes.DEFAULT_TYPE):
         """Daily job to purge old data"""
         logger.info("Running daily purge job...")
 
-        deleted_count = db.purge_old_data()
+        deleted_count = await asyncio.to_thread(db.purge_old_data)
+        self._invalidate_entries_cache()
 
         logger.info(f"Purged {deleted_count} entries.")
 
-        # Notify super admins
-        for admin_id in SUPER_ADMIN_IDS:
-            try:
-                await context.bot.send_message(
-                    chat_id=admin_id,
-                    text=f"🔄 *Daily Reset Complete*\n\n"
-                    f"Purged: {deleted_count} entries",
-                    parse_mode="Markdown",
-                )
-            except Exception as e:
-                logger.error(f"Failed to notify admin {admin_id}: {e}")
+        # Notify super admins (in parallel; one failure shouldn't block the rest)
+        admin_ids = SUPER_ADMIN_IDS_LIST
+        text = f"🔄 *Daily Reset Complete*\n\nPurged: {deleted_count} entries"
+        results = await asyncio.gather(
+            *[
+                context.bot.send_message(chat_id=admin_id, text=text, parse_mode="Markdown")
+                for admin_id in admin_ids
+            ],
+            return_exceptions=True,
+        )
+        for admin_id, result in zip(admin_ids, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to notify admin {admin_id}: {result}")
+
+    def _filter_todays_event_files(self, files):
+        """Today's Event files worth syncing: PDFs dated today, tagged with their '_event_name'"""
+        todays_files = []
+        for f in files:
+            is_match, event_name = self._is_todays_event_pdf(f.get('name', ''))
+            if is_match:
+                f['_event_name'] = event_name
+                todays_files.append(f)
+        return todays_files
 
     def _is_todays_event_pdf(self, filename: str):
         """
@@ -3122,7 +3695,6 @@ Provide a summary of the main points:"""
         and the date in the filename matches today.
         Returns (is_match, event_name or None).
         """
-        import re
         if not filename or not filename.lower().endswith('.pdf'):
             return False, None
         m = re.match(r'^(\d{2})_(\d{2})_(\d{2,4})_(.+)\.pdf$', filename, re.IGNORECASE)
@@ -3153,10 +3725,15 @@ Provide a summary of the main points:"""
             logger.warning("sync_folder_job: no folder_name in job data")
             return
         
-        sync_user_id = SUPER_ADMIN_IDS[0] if SUPER_ADMIN_IDS else None
+        sync_user_id = SUPER_ADMIN_IDS_LIST[0] if SUPER_ADMIN_IDS_LIST else None
         if not sync_user_id:
             return
         
+        await asyncio.to_thread(self._run_scheduled_folder_sync, folder_name, sync_user_id)
+        self._invalidate_entries_cache()
+
+    def _run_scheduled_folder_sync(self, folder_name, sync_user_id):
+        """Blocking body of sync_folder_job (Drive, Claude and DB calls); runs in a worker thread."""
         folder = db.get_folder_by_name(folder_name)
         if not folder:
             # Try to discover folder from Drive
@@ -3179,93 +3756,347 @@ Provide a summary of the main points:"""
         try:
             files = self.drive_sync.list_files_in_folder(drive_folder_id)
             if not files:
-                db.update_folder_sync_time(folder['id'])
-                db.log_sync(folder_id=folder['id'], files_synced=0, files_processed=0, errors=None, synced_by=sync_user_id)
+                db.finalize_folder_sync(folder_id=folder['id'], files_synced=0, files_processed=0, errors=None, synced_by=sync_user_id)
                 return
             
             # Today's Event: only process PDFs with dd_mm_yy_eventname.pdf where date = today
             if folder_name == "Today's Event":
                 today = get_singapore_now().date()
-                filtered_files = []
-                for f in files:
-                    name = f.get('name', '')
-                    is_match, event_name = self._is_todays_event_pdf(name)
-                    if is_match:
-                        f['_event_name'] = event_name
-                        filtered_files.append(f)
-                files = filtered_files
-                logger.info(f"Today's Event: {len(filtered_files)} PDF(s) match today's date ({today})")
-            
-            files_processed_count = 0
-            errors = []
-            for file in files:
-                try:
-                    file_content = self.drive_sync.get_file_content(file)
-                    if not file_content:
-                        errors.append(f"{file['name']}: Failed to download")
-                        continue
-                    
-                    category = self.drive_sync.detect_file_category(file['name'], folder_name)
-                    extracted_text = ""
-                    file_type = "document"
-                    
-                    if file.get('mimeType', '').startswith('image/'):
-                        extracted_text = self.analyze_image(file_content, category)
-                        file_type = "photo"
-                    elif file.get('mimeType', '') == 'application/pdf' or file['name'].lower().endswith('.pdf'):
-                        extracted_text = self.analyze_pdf(file_content, category)
-                    elif file.get('mimeType', '').startswith('text/'):
-                        try:
-                            extracted_text = file_content.decode('utf-8')
-                        except:
-                            extracted_text = file_content.decode('latin-1')
-                    elif file.get('mimeType', '') == 'application/vnd.google-apps.spreadsheet':
-                        try:
-                            extracted_text = file_content.decode('utf-8')
-                        except:
-                            extracted_text = file_content.decode('latin-1')
-                    else:
-                        if file_content[:4] == b'%PDF':
-                            extracted_text = self.analyze_pdf(file_content, category)
-                        else:
-                            try:
-                                extracted_text = file_content.decode('utf-8')
-                            except:
-                                extracted_text = f"[Binary file: {file['name']}]"
-                    
-                    content_data = {
-                        "type": file_type,
-                        "file_name": file['name'],
-                        "extracted_text": extracted_text,
-                        "source": "google_drive_scheduled",
-                        "folder": folder_name,
-                        "drive_folder_id": drive_folder_id,
-                        "drive_file_id": file.get('id'),
-                    }
-                    if folder_name == "Today's Event" and file.get('_event_name'):
-                        content_data["event_name"] = file['_event_name']
-                    if content_data.get("drive_file_id"):
-                        db.add_or_update_drive_entry(sync_user_id, category, content_data)
-                    else:
-                        db.add_entry(sync_user_id, category, content_data)
-                    files_processed_count += 1
-                except Exception as e:
-                    logger.error(f"Error processing file {file['name']}: {e}")
-                    errors.append(f"{file['name']}: {str(e)}")
+                files = self._filter_todays_event_files(files)
+                logger.info(f"Today's Event: {len(files)} PDF(s) match today's date ({today})")
             
-            db.update_folder_sync_time(folder['id'])
-            error_str = "; ".join(errors[-10:]) if errors else None
-            db.log_sync(
+            files_processed_count, errors = self._process_drive_files(
+                files, folder_name, drive_folder_id, "google_drive_scheduled", sync_user_id
+            )
+            
+            db.finalize_folder_sync(
                 folder_id=folder['id'],
                 files_synced=len(files),
                 files_processed=files_processed_count,
-                errors=error_str,
-                synced_by=sync_user_id
+                errors=errors.summary(),
+                synced_by=sync_user_id,
+                errors_total=errors.total,
             )
             logger.info(f"Scheduled sync complete for {folder_name}: {files_processed_count}/{len(files)} files")
         except Exception as e:
             logger.error(f"Error syncing folder {folder_name}: {e}", exc_info=True)
 
+    # ===== DRIVE PUSH NOTIFICATIONS =====
+
+    @require_role(SUPERADMIN_ROLES, denial="❌ Only super admins can register the Drive webhook.")
+    async def register_webhook(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
+        """Register (or renew) the Drive changes webhook so edited files sync straight away"""
+        if not self.drive_sync:
+            await update.message.reply_text("❌ Google Drive is not configured.")
+            return
+        
+        if not WEBHOOK_URL:
+            await update.message.reply_text(
+                "❌ WEBHOOK_URL is not set.\n\n"
+                "Set it to this service's public URL (Drive will post to WEBHOOK_URL/drive) and restart."
+            )
+            return
+        
+        try:
+            _, expires_at = await asyncio.to_thread(self._register_drive_webhook)
+        except Exception as e:
+            logger.error(f"Error registering Drive webhook: {e}", exc_info=True)
+            await update.message.reply_text(f"❌ Could not register the Drive webhook: {str(e)}")
+            return
+        
+        await update.message.reply_text(
+            f"✅ *Drive webhook registered*\n\n"
+            f"Files changed in synced folders are now picked up automatically.\n"
+            f"*Channel expires:* {expires_at.strftime('%d/%m/%Y %H:%M')} UTC (renewed automatically)",
+            parse_mode="Markdown",
+        )
+
+    def _register_drive_webhook(self):
+        """
+        Open a new changes.watch channel and retire the previous one.
+        The previous channel's page token is carried over so no change is missed across renewals.
+        Blocking. Returns (channel_id, expires_at as naive UTC).
+        """
+        previous = db.get_all_active_webhooks()
+        page_token = next((w['page_token'] for w in previous if w.get('page_token')), None)
+        if not page_token:
+            page_token = self.drive_sync.get_start_page_token()
+        if not page_token:
+            raise RuntimeError("Drive did not return a start page token")
+        
+        channel_id = str(uuid.uuid4())
+        expiration = datetime.now(timezone.utc) + DRIVE_WEBHOOK_TTL
+        channel = self.drive_sync.watch_changes(
+            page_token,
+            channel_id,
+            f"{WEBHOOK_URL}/drive",
+            token=drive_channel_token(channel_id),
+            expiration_ms=int(expiration.timestamp() * 1000),
+        )
+        if not channel:
+            raise RuntimeError("Drive rejected the watch request")
+        
+        # Drive may shorten the lifetime we asked for
+        if channel.get('expiration'):
+            expiration = datetime.fromtimestamp(int(channel['expiration']) / 1000, tz=timezone.utc)
+        expires_at = expiration.replace(tzinfo=None)
+        
+        db.save_webhook(
+            folder_id=GOOGLE_DRIVE_ROOT_FOLDER_ID,
+            channel_id=channel_id,
+            resource_id=channel.get('resourceId'),
+            webhook_url=WEBHOOK_URL,
+            page_token=page_token,
+            expires_at=expires_at,
+        )
+        
+        # Only stop the old channels once the new one is live
+        for webhook in previous:
+            self.drive_sync.stop_channel(webhook['channel_id'], webhook['resource_id'])
+            db.deactivate_webhook(webhook['channel_id'])
+        
+        logger.info(f"Drive webhook channel {channel_id} registered until {expires_at} UTC")
+        return channel_id, expires_at
+
+    async def webhook_renewal_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Scheduled job: renew the Drive webhook before its channel expires"""
+        webhooks = await asyncio.to_thread(db.get_all_active_webhooks)
+        if not webhooks:
+            return
+        
+        renew_by = datetime.now(timezone.utc).replace(tzinfo=None) + DRIVE_WEBHOOK_RENEW_BEFORE
+        if all(w['expires_at'] and w['expires_at'] > renew_by for w in webhooks):
+            return
+        
+        try:
+            await asyncio.to_thread(self._register_drive_webhook)
+        except Exception as e:
+            logger.error(f"Error renewing Drive webhook: {e}", exc_info=True)
+
+    def schedule_drive_changes(self, channel_id):
+        """
+        Queue a sync for a Drive notification (called by webhook_handler). Notifications for the
+        same channel within DRIVE_CHANGES_DEBOUNCE seconds of each other share a single sync, and
+        so do all notifications that arrive while an earlier sync runs: a channel has at most one
+        sync running plus one pending.
+        """
+        self._drive_change_deadlines[channel_id] = monotonic() + DRIVE_CHANGES_DEBOUNCE
+        self._drive_change_counts[channel_id] += 1
+        if channel_id not in self._drive_change_waiting:
+            self._drive_change_waiting.add(channel_id)
+            self.app.create_task(self._debounced_drive_changes(channel_id))
+
+    async def _debounced_drive_changes(self, channel_id):
+        """
+        Wait out the channel's debounce window (pushed back by each new notification) and any
+        sync already running, then sync. The channel stays pending until this run holds the lock.
+        """
+        lock = self._drive_change_locks[channel_id]
+        try:
+            while (delay := self._drive_change_deadlines[channel_id] - monotonic()) > 0:
+                await asyncio.sleep(delay)
+            await lock.acquire()
+        except BaseException:
+            self._drive_change_waiting.discard(channel_id)
+            self._drive_change_counts.pop(channel_id, None)
+            raise
+        try:
+            # Notifications from here on start a new pending sync (it queues behind this one)
+            self._drive_change_waiting.discard(channel_id)
+            notifications = self._drive_change_counts.pop(channel_id, 0)
+            if notifications > 1:
+                logger.info(f"Coalesced {notifications} Drive notifications for channel {channel_id} into one sync")
+            await self._sync_drive_changes(channel_id)
+        finally:
+            lock.release()
+
+    async def process_drive_changes(self, channel_id, attempt=1):
+        """Sync the files behind a Drive change notification, once no other sync of the channel is running"""
+        async with self._drive_change_locks[channel_id]:
+            await self._sync_drive_changes(channel_id, attempt)
+
+    async def _sync_drive_changes(self, channel_id, attempt=1):
+        """
+        Sync the channel's changes (see schedule_drive_changes); the caller holds the channel's lock.
+        A failed run is retried from the same page token, up to DRIVE_CHANGES_MAX_ATTEMPTS times.
+        A large backlog is worked through a slice at a time until the feed is caught up.
+        """
+        caught_up = False
+        while not caught_up:
+            webhook = await asyncio.to_thread(db.get_webhook_by_channel_id, channel_id)
+            if not webhook:
+                logger.warning(f"Drive notification for unknown or inactive channel {channel_id}")
+                return
+            
+            try:
+                files_processed, errors, caught_up = await asyncio.to_thread(self._apply_drive_changes, webhook)
+            except Exception as e:
+                logger.error(
+                    f"Error processing Drive changes for channel {channel_id} "
+                    f"(attempt {attempt}/{DRIVE_CHANGES_MAX_ATTEMPTS}): {e}",
+                    exc_info=True,
+                )
+                retry_name = f"drive_changes_retry_{channel_id}"
+                # One pending retry per channel: it resumes from the same page token either way
+                if attempt < DRIVE_CHANGES_MAX_ATTEMPTS and not self.app.job_queue.get_jobs_by_name(retry_name):
+                    self.app.job_queue.run_once(
+                        self._retry_drive_changes_job,
+                        when=DRIVE_CHANGES_RETRY_DELAY * attempt,
+                        data={"channel_id": channel_id, "attempt": attempt + 1},
+                        name=retry_name,
+                    )
+                return
+            
+            if files_processed:
+                self._invalidate_entries_cache()
+            if errors:
+                logger.warning(f"Drive change sync finished with {errors.total} error(s): {errors.summary()}")
+
+    async def _retry_drive_changes_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Scheduled job: retry a Drive change sync that failed"""
+        await self.process_drive_changes(context.job.data["channel_id"], context.job.data["attempt"])
+
+    def _apply_drive_changes(self, webhook):
+        """
+        Fetch the changes since the channel's page token and sync the changed files that sit
+        in a synced folder (or are the target of a shortcut in one). The token only advances
+        once the files are stored, so a failed run can be retried from the same point.
+        A run covers at most CHANGES_MAX_PAGES pages of changes; caught_up is False if more remain.
+        Blocking. Returns (files_processed, errors as SyncErrors, caught_up); raises if the changes can't be listed.
+        """
+        errors = SyncErrors()
+        changes, new_page_token, caught_up = self.drive_sync.get_changes(webhook['page_token'])
+        if new_page_token is None:
+            raise RuntimeError("Could not list Drive changes")
+        
+        # Same folders as /sync: everything except Student Movement (Telegram-only)
+        folders = {
+            f['drive_folder_id']: f
+            for f in db.get_all_folders()
+            if f['folder_name'] != 'Student Movement'
+        }
+        
+        # A file can appear several times in one run (e.g. renamed then edited): only its last
+        # change counts, so a file edited and then trashed isn't synced from the earlier one
+        latest = {change['fileId']: change for change in changes if change.get('fileId')}
+        if len(latest) < len(changes):
+            logger.info(f"Drive changes: {len(changes) - len(latest)} superseded change(s) skipped")
+        
+        files_by_folder = defaultdict(dict)  # drive_folder_id -> {file_id: file}
+        changed = {}  # file_id -> file, for every live (non-folder) change
+        for change in latest.values():
+            file = change.get('file') or {}
+            if change.get('removed') or file.get('trashed'):
+                continue
+            if file.get('mimeType') == 'application/vnd.google-apps.folder':
+                continue
+            
+            changed[change['fileId']] = file
+            folder_id = next((p for p in file.get('parents', []) if p in folders), None)
+            if folder_id:
+                files_by_folder[folder_id][file['id']] = file
+        
+        # Any changed file - in a synced folder or not - may also be the target of shortcuts in
+        # synced folders, whose entries hold a copy of its content (one query for all of them)
+        for target_id, shortcuts in db.get_shortcuts_by_targets(changed).items():
+            for shortcut in shortcuts:
+                if shortcut['watched_folder_id'] not in folders:
+                    continue
+                files_by_folder[shortcut['watched_folder_id']][shortcut['shortcut_id']] = {
+                    'id': shortcut['shortcut_id'],
+                    'name': shortcut['shortcut_name'],
+                    'mimeType': 'application/vnd.google-apps.shortcut',
+                    'shortcutDetails': {'targetId': target_id},
+                    '_target': changed[target_id],  # The change already carries the target's metadata
+                }
+        
+        sync_user_id = SUPER_ADMIN_IDS_LIST[0] if SUPER_ADMIN_IDS_LIST else None
+        folder_jobs = []  # (folder, files)
+        for folder_id, files_by_id in files_by_folder.items():
+            folder = folders[folder_id]
+            files = list(files_by_id.values())
+            if folder['folder_name'] == "Today's Event":
+                files = self._filter_todays_event_files(files)
+            if files:
+                folder_jobs.append((folder, files))
+        
+        # Folders are independent: sync them side by side (their files share the file pool)
+        total_processed = 0
+        futures = [
+            self._drive_folder_pool.submit(self._sync_changed_folder, folder, files, sync_user_id)
+            for folder, files in folder_jobs
+        ]
+        # The pool outlives this call: let every folder finish before returning (or raising), so
+        # nothing is still writing once the channel's lock is released
+        wait(futures)
+        for future in futures:
+            files_processed, folder_errors = future.result()
+            total_processed += files_processed
+            errors.extend(folder_errors)
+        
+        db.update_webhook_page_token(webhook['channel_id'], new_page_token)
+        return total_processed, errors, caught_up
+
+    def _sync_changed_folder(self, folder, files, sync_user_id):
+        """Process one folder's changed files and log the sync. Blocking. Returns (files_processed, errors)."""
+        files_processed, errors = self._process_drive_files(
+            files, folder['folder_name'], folder['drive_folder_id'], "google_drive_webhook", sync_user_id
+        )
+        db.finalize_folder_sync(
+            folder_id=folder['id'],
+            files_synced=len(files),
+            files_processed=files_processed,
+            errors=errors.summary(),
+            synced_by=sync_user_id,
+            errors_total=errors.total,
+        )
+        logger.info(f"Webhook sync for {folder['folder_name']}: {files_processed}/{len(files)} files")
+        return files_processed, errors
+
+    async def _run_webhook_mode(self):
+        """
+        Run the bot off webhooks: Telegram posts updates to WEBHOOK_URL/telegram and Drive
+        posts change notifications to WEBHOOK_URL/drive, both served on this event loop.
+        Returns when the process gets SIGINT/SIGTERM; raises if the webhook receiver stops on its own.
+        """
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        
+        async with self.app:
+            self._webhook_server = start_webhook_server(self, WEBHOOK_PORT, on_failure=stop.set)
+            try:
+                await self.app.bot.set_webhook(
+                    url=f"{WEBHOOK_URL}/telegram",
+                    secret_token=WEBHOOK_SECRET,
+                    allowed_updates=Update.ALL_TYPES,
+                    drop_pending_updates=True,  # Same as polling: skip what arrived while down
+                )
+                await self.app.start()
+                logger.info(f"Telegram webhook set to {WEBHOOK_URL}/telegram")
+                
+                # Drive doesn't replay notifications sent while we were down, but the stored
+                # page tokens still point at the last change we processed - catch up from them
+                if self.drive_sync:
+                    for webhook in await asyncio.to_thread(db.get_all_active_webhooks):
+                        self.app.create_task(self.process_drive_changes(webhook['channel_id']))
+                
+                await stop.wait()
+                await self.app.stop()
+                # Exit with an error (so the platform restarts the bot) rather than run deaf to webhooks
+                if self._webhook_server.done():
+                    raise RuntimeError("Webhook receiver stopped unexpectedly")
+            finally:
+                await stop_webhook_server()
+                self._webhook_server = None
+                await self._close_clients()
+
+    async def _close_clients(self, application=None):
+        """Close long-lived async clients before the event loop goes away"""
+        if self.drive_agent:
+            await self.drive_agent.aclose()
+
     def setup_handlers(self):
         """Setup all command and message handlers"""
 
@@ -3320,51 +4151,77 @@ Provide a summary of the main points:"""
             fallbacks=[CommandHandler("cancel", self.cancel_upload)],
         )
 
-        self.app.add_handler(CommandHandler("start", self.start))
-        self.app.add_handler(CommandHandler("help", self.help_command))
-        self.app.add_handler(CommandHandler("helprelief", self.helprelief))
-        self.app.add_handler(CommandHandler("helpadmin", self.helpadmin))
-        self.app.add_handler(CommandHandler("helpstudent", self.helpstudent))
-        self.app.add_handler(CommandHandler("helpsuper", self.helpsuper))
+        # Help commands go ahead of the conversations so they still answer mid-upload
+        help_commands = (
+            ("start", self.start),
+            ("help", self.help_command),
+            ("helprelief", self.helprelief),
+            ("helpadmin", self.helpadmin),
+            ("helpstudent", self.helpstudent),
+            ("helpsuper", self.helpsuper),
+        )
+        commands = (
+            ("ask", self.ask_query),
+            ("today", self.today_summary),
+            ("myuploads", self.my_uploads),
+            ("add", self.add_user),
+            ("remove", self.remove_user),
+            ("list", self.list_users),
+            ("promote", self.promote_user),
+            ("stats", self.show_stats),
+            ("purge", self.manual_purge),
+            # Relief management commands
+            ("reliefstatus", self.relief_status),
+            ("cancelrelief", self.cancel_relief),
+            # Google Drive sync commands
+            ("setfolder", self.set_folder),
+            ("listfolders", self.list_folders),
+            ("sync", self.sync_drive),
+            ("drivefolder", self.drive_folder_info),
+            ("drive", self.drive_command),
+            ("syncstatus", self.sync_status),
+            ("registerwebhook", self.register_webhook),
+            ("assume", self.assume_role),
+            ("resume", self.resume_role),
+            # Hidden super admin commands
+            ("addsuperadmin", self.add_superadmin),
+            ("removesuperadmin", self.remove_superadmin),
+            ("listsuperadmins", self.list_superadmins),
+        )
+
+        # One router per table instead of a CommandHandler per command; the conversations keep
+        # their own CommandHandler entry points
+        self._command_routes = dict(help_commands + commands)
+        command_messages = filters.UpdateType.MESSAGES & filters.COMMAND
+        self.app.add_handler(
+            MessageHandler(command_messages & CommandsFilter(dict(help_commands)), self.route_command)
+        )
         self.app.add_handler(upload_conv)
         self.app.add_handler(mass_upload_conv)
-        self.app.add_handler(CommandHandler("ask", self.ask_query))
-        self.app.add_handler(CommandHandler("today", self.today_summary))
-        self.app.add_handler(CommandHandler("myuploads", self.my_uploads))
-        self.app.add_handler(CommandHandler("add", self.add_user))
-        self.app.add_handler(CommandHandler("remove", self.remove_user))
-        self.app.add_handler(CommandHandler("list", self.list_users))
-        self.app.add_handler(CommandHandler("promote", self.promote_user))
-        self.app.add_handler(CommandHandler("stats", self.show_stats))
-        self.app.add_handler(CommandHandler("purge", self.manual_purge))
-        # Relief management commands
-        self.app.add_handler(CommandHandler("reliefstatus", self.relief_status))
-        self.app.add_handler(CommandHandler("cancelrelief", self.cancel_relief))
-        # Google Drive sync commands
-        self.app.add_handler(CommandHandler("setfolder", self.set_folder))
-        self.app.add_handler(CommandHandler("listfolders", self.list_folders))
-        self.app.add_handler(CommandHandler("sync", self.sync_drive))
-        self.app.add_handler(CommandHandler("drivefolder", self.drive_folder_info))
-        self.app.add_handler(CommandHandler("drive", self.drive_command))
-        self.app.add_handler(CommandHandler("syncstatus", self.sync_status))
-        self.app.add_handler(CommandHandler("assume", self.assume_role))
-        self.app.add_handler(CommandHandler("resume", self.resume_role))
-        # Hidden super admin commands
-        self.app.add_handler(CommandHandler("addsuperadmin", self.add_superadmin))
-        self.app.add_handler(CommandHandler("removesuperadmin", self.remove_superadmin))
-        self.app.add_handler(CommandHandler("listsuperadmins", self.list_superadmins))
-        
-        # Callback query handler for summary buttons
-        self.app.add_handler(CallbackQueryHandler(self.handle_summary_callback, pattern="^summary_"))
-        
-        # Callback query handler for admin confirmations (add/remove/promote)
-        self.app.add_handler(CallbackQueryHandler(self.handle_admin_callback, pattern="^admin_"))
-        
-        # Callback query handler for relief command buttons
-        self.app.add_handler(CallbackQueryHandler(self.handle_relief_command_callback, pattern="^relief_cmd_"))
-        
-        # Catch-all callback handler for debugging (should not normally be triggered)
-        self.app.add_handler(CallbackQueryHandler(self.handle_unknown_callback))
+        self.app.add_handler(MessageHandler(command_messages & CommandsFilter(dict(commands)), self.route_command))
+        
+        # Callback queries outside the upload conversation, routed on their data prefix
+        self._callback_routes = {
+            "summary": self.handle_summary_callback,  # summary buttons
+            "admin": self.handle_admin_callback,  # admin confirmations (add/remove/promote)
+            "relief_cmd": self.handle_relief_command_callback,  # relief command buttons
+        }
+        self.app.add_handler(CallbackQueryHandler(self.route_callback))
+
+    async def route_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Dispatch a command message to its handler, filling context.args as CommandHandler would"""
+        command, context.args = parse_command(update.effective_message)
+        await self._command_routes[command](update, context)
+
+    async def route_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Dispatch a callback query to its handler by prefix (one dict lookup instead of a regex per handler)"""
+        data = update.callback_query.data or ""
+        prefix, _, rest = data.partition("_")
+        if prefix == "relief" and rest.startswith("cmd_"):
+            prefix = "relief_cmd"
+        # Anything unrouted falls through to the debugging handler (should not normally be triggered)
+        handler = self._callback_routes.get(prefix, self.handle_unknown_callback)
+        await handler(update, context)
 
     async def handle_unknown_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle callbacks that weren't caught by other handlers - for debugging"""
@@ -3394,7 +4251,8 @@ Provide a summary of the main points:"""
 
     def run(self):
         """Start the bot"""
-        self.app = Application.builder().token(TELEGRAM_TOKEN).build()
+        # post_shutdown runs on the polling loop as run_polling() returns (webhook mode closes itself)
+        self.app = Application.builder().token(TELEGRAM_TOKEN).post_shutdown(self._close_clients).build()
 
         # Setup handlers
         self.setup_handlers()
@@ -3429,12 +4287,27 @@ Provide a summary of the main points:"""
                     data={"folder_name": folder_name},
                 )
                 logger.info(f"Drive sync scheduled for {folder_name} at {hour:02d}:{minute:02d} SGT")
+        
+        # Drive push notifications: keep the changes.watch channel alive (checked every 6 hours)
+        if self.drive_sync and WEBHOOK_URL:
+            job_queue.run_repeating(
+                self.webhook_renewal_job,
+                interval=6 * 60 * 60,
+                first=60,
+                name="webhook_renewal",
+            )
 
         logger.info("Bot started successfully!")
 
+        if WEBHOOK_URL:
+            logger.info("Starting Telegram bot in webhook mode...")
+            if uvloop is not None:
+                asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            asyncio.run(self._run_webhook_mode())
+            return
+
         # Start polling
-        # Add error handling for network issues (use time_module to avoid shadowing datetime.time)
-        import time as time_module
+        # Add error handling for network issues
         max_retries = 3
         retry_delay = 10
         
@@ -3464,7 +4337,7 @@ Provide a summary of the main points:"""
                 
                 if attempt < max_retries - 1:
                     logger.info(f"Waiting {retry_delay} seconds before retry...")
-                    time_module.sleep(retry_delay)
+                    sleep(retry_delay)
                 else:
                     logger.error("Max retries reached. Bot polling failed.")
                     raise
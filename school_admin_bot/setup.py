@@ -6,7 +6,7 @@ Initializes database and creates first super admin
 
 import sys
 from database import Database
-from config import SUPER_ADMIN_IDS
+from config import SUPER_ADMIN_IDS_LIST
 
 def main():
     print("🚀 School Admin Bot - Setup")
@@ -20,7 +20,7 @@ def main():
         
         # Create super admins
         print(f"\n👑 Creating super admin(s)...")
-        for admin_id in SUPER_ADMIN_IDS:
+        for admin_id in SUPER_ADMIN_IDS_LIST:
             db.add_user(admin_id, f"SuperAdmin_{admin_id}", "superadmin", admin_id)
             print(f"✅ Super admin {admin_id} added")
         
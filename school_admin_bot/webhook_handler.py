@@ -0,0 +1,133 @@
+"""
+Webhook receiver for Telegram updates and Google Drive push notifications (changes.watch).
+
+Telegram POSTs each update to /telegram; it is queued on the bot's update queue like a polled one.
+Drive POSTs a bodyless notification to /drive whenever something in the watched drive changes.
+The ASGI app is served by hypercorn on the bot's own event loop: the request is acknowledged
+straight away and SchoolAdminBot.schedule_drive_changes queues a (debounced) sync on that loop.
+"""
+import hmac
+import asyncio
+import hashlib
+import socket
+import logging
+import orjson
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Route
+from telegram import Update
+from config import WEBHOOK_SECRET
+
+logger = logging.getLogger(__name__)
+
+# Set by start_webhook_server
+bot_instance = None
+_shutdown_event = None
+_server_task = None
+
+
+def drive_channel_token(channel_id):
+    """
+    Token for a Drive watch channel: HMAC-SHA256 of its ID under WEBHOOK_SECRET, so each channel
+    has its own token and notifications can be checked without looking the channel up
+    """
+    return hmac.new(WEBHOOK_SECRET.encode(), channel_id.encode(), hashlib.sha256).hexdigest()
+
+
+async def handle_telegram_update(request):
+    """Telegram update: validate the secret token and hand the update to the application"""
+    secret_token = request.headers.get("X-Telegram-Bot-Api-Secret-Token") or ""
+    if not hmac.compare_digest(secret_token, WEBHOOK_SECRET):
+        logger.warning("Rejected Telegram update with bad secret token")
+        return Response(status_code=403)
+
+    if bot_instance is None:
+        return Response(status_code=503)
+
+    application = bot_instance.app
+    try:
+        # orjson.JSONDecodeError is a ValueError
+        update = Update.de_json(orjson.loads(await request.body()), application.bot)
+    except ValueError:
+        return Response(status_code=400)
+    await application.update_queue.put(update)
+    return Response(status_code=200)
+
+
+async def handle_drive_webhook(request):
+    """Drive change notification: validate the channel token and start a sync for the channel"""
+    channel_id = request.headers.get("X-Goog-Channel-ID")
+    resource_state = request.headers.get("X-Goog-Resource-State")
+    channel_token = request.headers.get("X-Goog-Channel-Token") or ""
+
+    if not channel_id:
+        return Response(status_code=200)
+
+    # Checked before anything else touches the database or Drive
+    if not hmac.compare_digest(channel_token, drive_channel_token(channel_id)):
+        logger.warning(f"Rejected Drive notification with bad token (channel {channel_id})")
+        return Response(status_code=403)
+
+    # A changes.watch channel only reports 'change'; anything else (e.g. the 'sync' handshake sent
+    # when the channel is created) is acknowledged without starting a sync
+    if resource_state != "change":
+        return Response(status_code=200)
+
+    if bot_instance is None:
+        return Response(status_code=503)
+
+    bot_instance.schedule_drive_changes(channel_id)
+    return Response(status_code=200)
+
+
+async def health(request):
+    """Liveness check for the hosting platform"""
+    return PlainTextResponse("OK")
+
+
+webhook_app = Starlette(
+    routes=[
+        Route("/telegram", handle_telegram_update, methods=["POST"]),
+        Route("/drive", handle_drive_webhook, methods=["POST"]),
+        Route("/health", health, methods=["GET"]),
+    ]
+)
+
+
+def start_webhook_server(bot, port, on_failure=None):
+    """
+    Serve webhook_app on the running event loop. The port is bound before this returns (OSError if
+    it's taken); on_failure is called if the server stops without stop_webhook_server asking it to.
+    """
+    global bot_instance, _shutdown_event, _server_task
+    bot_instance = bot
+    _shutdown_event = asyncio.Event()
+
+    # Bound here rather than inside serve(), so a port in use fails startup instead of a background task
+    sock = socket.create_server(("0.0.0.0", port))
+    config = Config.from_mapping(bind=[f"fd://{sock.detach()}"])
+    # shutdown_trigger also stops hypercorn installing its own signal handlers over the bot's
+    _server_task = asyncio.create_task(serve(webhook_app, config, shutdown_trigger=_shutdown_event.wait))
+
+    def server_done(task):
+        error = None if task.cancelled() else task.exception()
+        if _shutdown_event.is_set() and error is None:
+            return
+        logger.error("Webhook receiver stopped unexpectedly", exc_info=error)
+        if on_failure:
+            on_failure()
+
+    _server_task.add_done_callback(server_done)
+    logger.info(f"Webhook receiver listening on port {port}")
+    return _server_task
+
+
+async def stop_webhook_server():
+    """Stop accepting requests and wait for the server to close"""
+    if _server_task is None:
+        return
+    _shutdown_event.set()
+    if not _server_task.done():  # A failed server was already reported by its done-callback
+        await _server_task